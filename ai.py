@@ -1,11 +1,6 @@
-with open(".env") as f:
-    api_key = f.read()
-
 # Replace the `GOOGLE_CLOUD_PROJECT` and `GOOGLE_CLOUD_LOCATION` values
 # with appropriate values for your project.
 
-from google import genai
-
 # client = genai.Client(vertexai=True, api_key=api_key)
 
 # response = client.models.generate_content(
@@ -17,12 +12,378 @@ from google import genai
 # Example response:
 # Bubble Sort is a simple sorting algorithm that repeatedly steps through the list
 
-from google import genai
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+
+import jsonl
+from llm_cache import LLMCache, cache_key
+from ratelimit import TokenBucket
+
+MODEL = "gemini-2.5-flash"
+
+# Screening settings: prompt size, parallelism and request rate.
+TOKEN_BUDGET = 8000
+MAX_BATCH = 25
+CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", "16"))
+REQUESTS_PER_MINUTE = float(os.environ.get("GEMINI_RPM", "1000"))
+MAX_ATTEMPTS = 5
+
+# Bump whenever SCREENING_PROMPT changes, so results can tell prompts apart.
+PROMPT_VERSION = 1
+
+SCREENING_PROMPT = """\
+Jesteś asystentem rekrutera organizacji pozarządowej. Oceń każdego kandydata
+z listy poniżej na podstawie jego odpowiedzi z formularza zgłoszeniowego.
+Dla każdego kandydata zwróć obiekt z polami: "responseId" (bez zmian),
+"score" (liczba całkowita 0-100, dopasowanie do oferty) oraz "summary"
+(jedno lub dwa zdania po polsku). Zwróć tablicę JSON z jednym obiektem na
+kandydata, w tej samej kolejności.
+
+CANDIDATES:
+"""
+
+RESULT_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "responseId": {"type": "STRING"},
+            "score": {"type": "INTEGER"},
+            "summary": {"type": "STRING"},
+        },
+        "required": ["responseId", "score", "summary"],
+    },
+}
+
+
+def ask(prompt: str, model: str = MODEL, cache: LLMCache | None = None) -> str:
+    """Sends a single prompt to Gemini and returns the text of the answer."""
+    key = cache_key(model, "ask", prompt)
+    if cache is not None and (answer := cache.get(key)) is not None:
+        return answer
+
+    from google import genai
+
+    # The client gets the API key from the environment variable `GEMINI_API_KEY`.
+    client = genai.Client()
+
+    response = client.models.generate_content(model=model, contents=prompt)
+    if cache is not None:
+        cache.put(key, response.text)
+    return response.text
+
+
+class GeminiModel:
+    """Gemini through the asynchronous google-genai client, answering in JSON."""
+
+    def __init__(self, model: str = MODEL):
+        from google import genai
+        from google.genai import types
+
+        self.name = model
+        self._client = genai.Client()
+        self._config = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=RESULT_SCHEMA,
+            temperature=0.0,
+        )
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._client.aio.models.generate_content(
+            model=self.name, contents=prompt, config=self._config
+        )
+        return response.text
+
+
+class StubModelError(Exception):
+    """Transient failure injected by StubModel."""
+
+    code = 503
+
+
+def _stub_score(response_id: str) -> int:
+    return hashlib.sha256(response_id.encode("utf-8")).digest()[0] % 101
+
+
+class StubModel:
+    """
+    Local stand-in for GeminiModel, for running the pipeline offline.
+
+    Answers every screening prompt with deterministic scores derived from
+    the candidates' ids, after `latency` seconds; a `failure_rate` fraction
+    of calls raises StubModelError instead.
+    """
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, seed: int = 0):
+        self.name = "stub"
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise StubModelError("Injected failure.")
+        candidates = json.loads(prompt.split("CANDIDATES:\n", 1)[1])
+        return json.dumps(
+            [
+                {
+                    "responseId": candidate["responseId"],
+                    "score": _stub_score(candidate["responseId"]),
+                    "summary": f"Kandydat {candidate['responseId']}.",
+                }
+                for candidate in candidates
+            ],
+            ensure_ascii=False,
+        )
+
+
+def candidate_text(record: dict[str, Any]) -> str:
+    """Joins the text answers of one form response into a single string."""
+    parts = []
+    for answer in record.get("answers", {}).values():
+        values = [a.get("value", "") for a in answer.get("textAnswers", {}).get("answers", [])]
+        if values:
+            parts.append("; ".join(values))
+    return "\n".join(parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(
+    records: Iterable[dict[str, Any]],
+    token_budget: int = TOKEN_BUDGET,
+    max_batch: int = MAX_BATCH,
+) -> Iterator[list[dict[str, str]]]:
+    """
+    Groups candidates into prompts of at most `token_budget` tokens.
+
+    Each batch holds up to `max_batch` candidates as {"responseId", "text"};
+    answers longer than the budget on their own are truncated.
+    """
+    available = token_budget - estimate_tokens(SCREENING_PROMPT)
+    batch, used = [], 0
+    for record in records:
+        response_id = record.get("responseId")
+        if not response_id:
+            continue
+        text = candidate_text(record)[: available * 4]
+        # The JSON wrapping costs a few tokens on top of the text
+        tokens = estimate_tokens(text) + 10
+        if batch and (used + tokens > available or len(batch) >= max_batch):
+            yield batch
+            batch, used = [], 0
+        batch.append({"responseId": response_id, "text": text})
+        used += tokens
+    if batch:
+        yield batch
+
+
+def build_prompt(batch: list[dict[str, str]]) -> str:
+    return SCREENING_PROMPT + json.dumps(batch, ensure_ascii=False)
+
+
+def parse_results(text: str, batch: list[dict[str, str]]) -> list[dict[str, Any]]:
+    """Reads the model's JSON answer, keeping results for the batch's ids only."""
+    wanted = {candidate["responseId"] for candidate in batch}
+    results = []
+    for result in json.loads(text):
+        if result.get("responseId") in wanted:
+            results.append(
+                {
+                    "responseId": result["responseId"],
+                    "score": int(result["score"]),
+                    "summary": str(result.get("summary", "")),
+                }
+            )
+    return results
+
+
+def _is_retryable(exception: Exception) -> bool:
+    # google.genai's APIError and StubModelError carry an HTTP status code
+    code = getattr(exception, "code", None)
+    if code is not None:
+        return code == 429 or code >= 500
+    return isinstance(exception, (ValueError, KeyError, TimeoutError, ConnectionError))
+
+
+async def _screen_batch(
+    model, batch: list[dict[str, str]], limiter: TokenBucket, max_attempts: int
+) -> list[dict[str, Any]]:
+    prompt = build_prompt(batch)
+    for attempt in range(max_attempts):
+        await limiter.wait()
+        try:
+            return parse_results(await model.generate(prompt), batch)
+        except Exception as e:
+            # Malformed answers (ValueError, KeyError) are retried as well
+            if not _is_retryable(e) or attempt + 1 >= max_attempts:
+                raise
+            await asyncio.sleep(random.uniform(0, min(60, 2**attempt)))
+    return []
+
+
+async def screen_async(
+    input_file: str = "syntetic_data.jsonl",
+    output_file: str = "analysis.jsonl",
+    model=None,
+    token_budget: int = TOKEN_BUDGET,
+    max_batch: int = MAX_BATCH,
+    concurrency: int = CONCURRENCY,
+    requests_per_minute: float = REQUESTS_PER_MINUTE,
+    max_attempts: int = MAX_ATTEMPTS,
+    cache: LLMCache | None = None,
+) -> dict[str, Any]:
+    """
+    Scores every application in `input_file` and appends results to `output_file`.
+
+    Every application is identified by its responseId and the content
+    address of its input (model, PROMPT_VERSION and its normalized answers,
+    see llm_cache.cache_key). If the input lists a responseId more than
+    once, its last line wins. Applications already in `output_file` with
+    the same responseId and address are skipped, so an interrupted run
+    resumes where it stopped and only new or edited applications are
+    screened again. Those found in `cache` are written without calling the
+    model, and applications with identical answers share one model call.
+
+    The rest are streamed and packed several per prompt (see
+    `pack_batches`); up to `concurrency` prompts are in flight at once,
+    within `requests_per_minute`, and failed prompts are retried with
+    jittered exponential backoff. Results are written as JSONL keyed by
+    responseId, and stored in `cache`, as soon as each prompt returns.
+
+    Returns:
+        dict: Counts of screened, cached and failed applications and the duration.
+    """
+    model = model or GeminiModel()
+    done = set()
+    if os.path.exists(output_file):
+        done = {(row.get("responseId"), row.get("input_key")) for row in jsonl.stream_load(output_file)}
+
+    limiter = TokenBucket(requests_per_minute / 60)
+    slots = asyncio.Semaphore(concurrency)
+    stats = {"screened": 0, "cached": 0, "failed": 0, "prompts": 0, "skipped": 0}
+    tasks = set()
+    # responseId -> input key of the applications sent to the model, and
+    # input key -> every responseId waiting for that answer
+    keys: dict[str, str] = {}
+    waiting: dict[str, list[str]] = {}
+    started = time.perf_counter()
+
+    def result_row(response_id, key, result, now):
+        return {
+            "responseId": response_id,
+            "score": result["score"],
+            "summary": result["summary"],
+            "model": model.name,
+            "prompt_version": PROMPT_VERSION,
+            "input_key": key,
+            "analyzed_at": now,
+        }
+
+    def latest_records():
+        """Streams the input, keeping only the last line of every responseId."""
+        if not os.path.exists(input_file):
+            return
+        last = {}
+        for i, record in enumerate(jsonl.stream_load(input_file)):
+            if record.get("responseId"):
+                last[record["responseId"]] = i
+        for i, record in enumerate(jsonl.stream_load(input_file)):
+            if record.get("responseId") and last[record["responseId"]] == i:
+                yield record
+
+    def uncached(records, chunk_size=500):
+        """Yields the records that need the model, writing cache hits directly."""
+        chunk = []
+        for record in records:
+            response_id = record["responseId"]
+            key = cache_key(model.name, PROMPT_VERSION, candidate_text(record))
+            if (response_id, key) in done:
+                stats["skipped"] += 1
+                continue
+            chunk.append((response_id, key, record))
+            if len(chunk) >= chunk_size:
+                yield from flush(chunk)
+                chunk = []
+        yield from flush(chunk)
+
+    def flush(chunk):
+        hits = cache.get_many(key for _, key, _ in chunk) if cache is not None else {}
+        now = datetime.now(timezone.utc).isoformat()
+        for response_id, key, record in chunk:
+            if key in hits:
+                writer.write(result_row(response_id, key, json.loads(hits[key]), now))
+                stats["cached"] += 1
+            elif key in waiting:
+                # Same answers as an application already sent to the model
+                waiting[key].append(response_id)
+            else:
+                keys[response_id] = key
+                waiting[key] = [response_id]
+                yield record
+
+    with jsonl.JsonlWriter(output_file, mode="a", index_key="responseId") as writer:
+
+        async def run(batch):
+            try:
+                results = await _screen_batch(model, batch, limiter, max_attempts)
+                stats["prompts"] += 1
+            except Exception as e:
+                results = []
+                print(f"Failed to screen {len(batch)} applications: {e}")
+            finally:
+                slots.release()
+                batch_keys = {c["responseId"]: keys.pop(c["responseId"]) for c in batch}
+            now = datetime.now(timezone.utc).isoformat()
+            rows, answers = [], []
+            for result in results:
+                key = batch_keys.pop(result["responseId"], None)
+                if key is None:
+                    continue
+                rows.extend(result_row(response_id, key, result, now) for response_id in waiting.pop(key))
+                answers.append((key, json.dumps({"score": result["score"], "summary": result["summary"]},
+                                                ensure_ascii=False)))
+            writer.write_many(rows)
+            if cache is not None:
+                cache.put_many(answers)
+            # Applications the model did not answer for
+            stats["failed"] += sum(len(waiting.pop(key)) for key in batch_keys.values())
+            stats["screened"] += len(rows)
+
+        for batch in pack_batches(uncached(latest_records()), token_budget, max_batch):
+            # Waiting here keeps at most `concurrency` batches in memory
+            await slots.acquire()
+            task = asyncio.create_task(run(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def screen(*args, **kwargs) -> dict[str, Any]:
+    """Synchronous entry point of `screen_async`."""
+    stats = asyncio.run(screen_async(*args, **kwargs))
+    print(
+        f"Screened {stats['screened']} applications in {stats['prompts']} prompts "
+        f"({stats['cached']} from cache, {stats['failed']} failed, "
+        f"{stats['skipped']} already done) in {stats['seconds']}s"
+    )
+    return stats
 
-# The client gets the API key from the environment variable `GEMINI_API_KEY`.
-client = genai.Client()
 
-response = client.models.generate_content(
-    model="gemini-2.5-flash", contents="Explain how AI works in a few words"
-)
-print(response.text)
\ No newline at end of file
+if __name__ == "__main__":
+    print(ask("Explain how AI works in a few words"))
@@ -0,0 +1,472 @@
+"""
+Benchmarks of the data paths: jsonl, combine_data, the API dataclasses and
+provisioning against the local fake Google APIs.
+
+Corpora are generated with Faker from a fixed seed, at several sizes. Every
+case is timed `--repeat` times and the results are saved as JSON, so a later
+run can be compared against them. Run from the project root:
+
+    python benchmarks/bench.py --sizes 100 1000 10000
+    python benchmarks/bench.py --only jsonl --compare benchmarks/results/before.json
+    python benchmarks/bench.py --memory   # also record peak allocations
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+SEED = 2025
+# Latency of every request to the fake Google APIs, in seconds (--latency).
+FAKE_API_LATENCY = 0.005
+
+
+# Corpora
+
+
+def _faker(seed: int):
+    from faker import Faker
+
+    fake = Faker("pl_PL")
+    fake.seed_instance(seed)
+    return fake
+
+
+def _time(fake) -> str:
+    return fake.date_time_between("-1y", "now", tzinfo=timezone.utc).isoformat()
+
+
+def make_responses(n: int, seed: int = SEED) -> list[dict]:
+    """Form responses shaped like the files the watcher writes to data/."""
+    fake = _faker(seed)
+    form_ids = [fake.uuid4() for _ in range(max(1, n // 100))]
+    responses = []
+    for i in range(n):
+        submitted = _time(fake)
+        answers = {
+            f"q{j}": {
+                "questionId": f"q{j}",
+                "textAnswers": {"answers": [{"value": value}]},
+            }
+            for j, value in enumerate(
+                [fake.name(), str(fake.random_int(16, 70)), fake.email(), fake.text(300)]
+            )
+        }
+        responses.append(
+            {
+                "responseId": f"r{i:08d}",
+                "formId": fake.random_element(form_ids),
+                "createTime": submitted,
+                "lastSubmittedTime": submitted,
+                "answers": answers,
+            }
+        )
+    return responses
+
+
+def make_forms(n: int, seed: int = SEED) -> list[dict]:
+    """forms.get results with choice questions, as GoogleForm.from_dict expects."""
+    fake = _faker(seed)
+    forms = []
+    for _ in range(n):
+        title = fake.catch_phrase()
+        forms.append(
+            {
+                "formId": fake.uuid4(),
+                "info": {"title": title, "documentTitle": title},
+                "settings": {"emailCollectionType": "DO_NOT_COLLECT"},
+                "revisionId": f"{fake.random_int(1, 99):08x}",
+                "responderUri": fake.url(),
+                "items": [
+                    {
+                        "itemId": fake.hexify("^^^^^^^^"),
+                        "title": fake.sentence(),
+                        "questionItem": {
+                            "question": {
+                                "questionId": fake.hexify("^^^^^^^^"),
+                                "required": fake.boolean(),
+                                "choiceQuestion": {
+                                    "type": "RADIO",
+                                    "options": [
+                                        {"value": fake.word()} for _ in range(4)
+                                    ],
+                                    "shuffle": fake.boolean(),
+                                },
+                            }
+                        },
+                    }
+                    for _ in range(fake.random_int(3, 10))
+                ],
+                "publishSettings": {
+                    "publishState": {"isPublished": True, "isAcceptingResponses": True}
+                },
+            }
+        )
+    return forms
+
+
+def make_events_page(n: int, seed: int = SEED) -> dict:
+    """One events.list page with `n` events."""
+    fake = _faker(seed)
+    owner = fake.email()
+    items = []
+    for _ in range(n):
+        start = fake.date_time_between("now", "+1y", tzinfo=timezone.utc)
+        event_id = fake.hexify("^" * 26)
+        items.append(
+            {
+                "kind": "calendar#event",
+                "etag": f'"{fake.random_number(16)}"',
+                "id": event_id,
+                "status": "confirmed",
+                "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}",
+                "created": _time(fake),
+                "updated": _time(fake),
+                "summary": fake.catch_phrase(),
+                "description": fake.text(200),
+                "creator": {"email": owner, "self": True},
+                "organizer": {"email": owner, "self": True},
+                "start": {"dateTime": start.isoformat(), "timeZone": "Europe/Warsaw"},
+                "end": {
+                    "dateTime": (start + timedelta(hours=2)).isoformat(),
+                    "timeZone": "Europe/Warsaw",
+                },
+                "iCalUID": f"{event_id}@google.com",
+                "sequence": 0,
+                "attendees": [
+                    {"email": fake.email(), "responseStatus": "needsAction"}
+                    for _ in range(fake.random_int(0, 5))
+                ],
+                "reminders": {"useDefault": True},
+                "eventType": "default",
+            }
+        )
+    return {
+        "kind": "calendar#events",
+        "etag": f'"{fake.random_number(16)}"',
+        "summary": owner,
+        "updated": _time(fake),
+        "timeZone": "Europe/Warsaw",
+        "accessRole": "owner",
+        "defaultReminders": [{"method": "popup", "minutes": 30}],
+        "items": items,
+    }
+
+
+# Cases. Each takes (size, workdir), does its untimed setup and returns the
+# function to time; `scale` converts the global sizes to the case's own.
+
+CASES = {}
+
+
+def case(name: str, scale: float = 1.0):
+    def register(prepare):
+        CASES[name] = (prepare, scale)
+        return prepare
+
+    return register
+
+
+@case("jsonl.dump")
+def bench_dump(size, workdir):
+    import jsonl
+
+    records, path = make_responses(size), str(workdir / "dump.jsonl")
+    return lambda: jsonl.dump(records, path)
+
+
+@case("jsonl.add")
+def bench_add(size, workdir):
+    import jsonl
+
+    records, path = make_responses(size), str(workdir / "add.jsonl")
+
+    def run():
+        with open(path, "w"):
+            pass
+        for record in records:
+            jsonl.add(record, path)
+
+    return run
+
+
+@case("jsonl.load")
+def bench_load(size, workdir):
+    import jsonl
+
+    path = str(workdir / "load.jsonl")
+    jsonl.dump(make_responses(size), path)
+    return lambda: jsonl.load(path)
+
+
+@case("jsonl.stream_load")
+def bench_stream_load(size, workdir):
+    import jsonl
+
+    path = str(workdir / "stream.jsonl")
+    jsonl.dump(make_responses(size), path)
+    return lambda: sum(1 for _ in jsonl.stream_load(path))
+
+
+def _write_response_files(size, directory):
+    directory.mkdir()
+    for record in make_responses(size):
+        with open(directory / f"{record['responseId']}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+
+
+@case("combine.full")
+def bench_combine_full(size, workdir):
+    import combine_data
+
+    _write_response_files(size, workdir / "data")
+    output = str(workdir / "combined.jsonl")
+    return lambda: combine_data.combine_json_to_jsonl(str(workdir / "data"), output)
+
+
+@case("combine.incremental_noop")
+def bench_combine_noop(size, workdir):
+    import combine_data
+
+    _write_response_files(size, workdir / "data")
+    output = str(workdir / "combined.jsonl")
+    combine_data.combine_json_to_jsonl(str(workdir / "data"), output, incremental=True)
+    return lambda: combine_data.combine_json_to_jsonl(
+        str(workdir / "data"), output, incremental=True
+    )
+
+
+@case("GoogleForm.from_dict", scale=0.1)
+def bench_form_from_dict(size, workdir):
+    from src.google_dataclases import GoogleForm
+
+    forms = make_forms(size)
+    return lambda: [GoogleForm.from_dict(form) for form in forms]
+
+
+@case("CalendarEvents.from_dict", scale=0.25)
+def bench_events_from_dict(size, workdir):
+    from src.google_calendar_dataclasses import CalendarEvents
+
+    page = make_events_page(size)
+    return lambda: CalendarEvents.from_dict(page)
+
+
+@case("GoogleForm.from_dict.lazy", scale=0.1)
+def bench_form_from_dict_lazy(size, workdir):
+    from src.google_dataclases import GoogleForm
+
+    forms = make_forms(size)
+    return lambda: GoogleForm.from_dicts(forms, lazy=True)
+
+
+@case("CalendarEvents.from_dict.lazy", scale=0.25)
+def bench_events_from_dict_lazy(size, workdir):
+    from src.google_calendar_dataclasses import CalendarEvents
+
+    page = make_events_page(size)
+    # Lists every event's id, as most callers do, without touching the rest
+    return lambda: [event.id for event in CalendarEvents.from_dict(page, lazy=True).items]
+
+
+_fake_server = None
+
+
+def _fake_google(latency: float):
+    """Starts the fake API server once per process and points the clients at it."""
+    global _fake_server
+    if _fake_server is None:
+        from fake_google import FakeGoogle, FakeGoogleServer
+
+        _fake_server = FakeGoogleServer(FakeGoogle(latency=latency)).start()
+        os.environ["GOOGLE_API_ROOT"] = _fake_server.url
+        import google_clients
+
+        if google_clients.API_ROOT != _fake_server.url:
+            raise RuntimeError("google_clients was imported before the fake started.")
+    return _fake_server
+
+
+@case("provision", scale=0.01)
+def bench_provision(size, workdir):
+    _fake_google(FAKE_API_LATENCY)
+    import create_google_form
+
+    specs = create_google_form.build_form_specs(max(1, size - 1))
+    runs = iter(range(10**6))
+
+    def run():
+        # A fresh state store every time, so every run creates everything;
+        # legacy id files are looked up in the (empty) run directory, not the cwd
+        n = next(runs)
+        run_dir = workdir / f"provision{n}"
+        run_dir.mkdir()
+        create_google_form.provision(
+            specs,
+            output_file=str(run_dir / "forms.jsonl"),
+            state_db=str(run_dir / "state.db"),
+            legacy_dir=str(run_dir),
+            forms_qps=1000,
+            calendar_qps=1000,
+        )
+
+    return run
+
+
+# Runner
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(run, repeat: int, memory: bool) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    result = {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "runs": times,
+    }
+    if memory:
+        tracemalloc.start()
+        run()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_cases(names, sizes, repeat, memory) -> dict:
+    results = {}
+    for name in names:
+        prepare, scale = CASES[name]
+        for size in sorted({max(1, int(size * scale)) for size in sizes}):
+            key = f"{name}[{size}]"
+            with tempfile.TemporaryDirectory() as tmp:
+                # The code under test prints progress; keep the table readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run = prepare(size, Path(tmp))
+                    result = measure(run, repeat, memory)
+            result["size"] = size
+            results[key] = result
+            line = (
+                f"{key:40s} median {result['median'] * 1000:10.2f} ms"
+                f"   min {result['min'] * 1000:10.2f} ms"
+                f"   {result['median'] / size * 1e6:9.2f} us/item"
+            )
+            if memory:
+                line += f"   peak {result['peak_bytes'] / 2**20:8.2f} MiB"
+            print(line, flush=True)
+    return results
+
+
+def compare(results: dict, baseline_path: str, max_regression: float) -> int:
+    """Prints speedups against a saved run; returns how many cases regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result["median"] / baseline[key]["median"]
+        verdict = ""
+        if ratio > 1 + max_regression:
+            verdict = "SLOWER"
+            regressions += 1
+        elif ratio < 1 - max_regression:
+            verdict = "faster"
+        line = f"{key:40s} {ratio:7.2f}x time {verdict}"
+        if "peak_bytes" in result and "peak_bytes" in baseline[key]:
+            memory_ratio = result["peak_bytes"] / max(1, baseline[key]["peak_bytes"])
+            line += f"   {memory_ratio:7.2f}x memory"
+        print(line)
+    return regressions
+
+
+def main():
+    global FAKE_API_LATENCY
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="+", default=None, help="case names or prefixes to run"
+    )
+    parser.add_argument("--memory", action="store_true", help="record peak allocations")
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="fake API latency in seconds"
+    )
+    parser.add_argument("--output", default=None, help="where to save the results")
+    parser.add_argument("--compare", default=None, help="saved results to compare with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.10,
+        help="slowdown tolerated by --compare before failing",
+    )
+    args = parser.parse_args()
+    FAKE_API_LATENCY = args.latency
+
+    names = [
+        name
+        for name in CASES
+        if not args.only or any(name.startswith(prefix) for prefix in args.only)
+    ]
+    results = run_cases(names, args.sizes, args.repeat, args.memory)
+
+    commit = _git_commit()
+    output = args.output or RESULTS_DIR / (
+        f"{datetime.now():%Y%m%d-%H%M%S}{'-' + commit if commit else ''}.json"
+    )
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "commit": commit,
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "repeat": args.repeat,
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nSaved results to {output}")
+
+    if args.compare and compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
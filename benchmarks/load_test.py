@@ -0,0 +1,158 @@
+"""
+Load test of the HTTP service (server.py): many threads, each with its own
+keep-alive connection, send search, offer detail and (optionally) candidate
+submission requests for a fixed time and report throughput and latency.
+
+Start the service first, then run from the project root:
+
+    python main.py serve --workers 4
+    python benchmarks/load_test.py --threads 64 --duration 20
+    python benchmarks/load_test.py --conditional   # send If-None-Match
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+QUERIES = [
+    "wolontariat schronisko",
+    "programista",
+    "opieka nad zwierzętami",
+    "nauczyciel",
+    "kierowca",
+    "praca z dziećmi",
+    "sprzedawca",
+    "wolontariusz",
+]
+
+
+class Worker(threading.Thread):
+    """Sends requests over one connection until `deadline`, recording latencies."""
+
+    def __init__(self, url: str, deadline: float, args: argparse.Namespace, offers: list[str],
+                 seed: int):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.deadline = deadline
+        self.args = args
+        self.offers = offers
+        self.random = random.Random(seed)
+        self.latencies: list[float] = []
+        self.statuses: dict[int, int] = {}
+        self.errors = 0
+        self.etags: dict[str, str] = {}
+
+    def request(self, connection, method: str, path: str, body: bytes | None = None) -> int:
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        elif self.args.conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        if etag:
+            self.etags[path] = etag
+        return response.status
+
+    def next_request(self) -> tuple[str, str, bytes | None]:
+        roll = self.random.random()
+        if self.offers and roll < self.args.submit_ratio:
+            body = json.dumps({
+                "name": "Jan Testowy",
+                "email": "jan@example.com",
+                "age": 30,
+                "answers": {"Dlaczego chcesz do nas dołączyć?": "Lubię pomagać innym."},
+            }).encode("utf-8")
+            return "POST", f"/api/offers/{self.random.choice(self.offers)}/candidates", body
+        if self.offers and roll < self.args.submit_ratio + self.args.detail_ratio:
+            return "GET", f"/api/offers/{self.random.choice(self.offers)}", None
+        query = quote(self.random.choice(QUERIES))
+        return "GET", f"/api/offers/search?q={query}&k=10", None
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        while time.perf_counter() < self.deadline:
+            method, path, body = self.next_request()
+            started = time.perf_counter()
+            try:
+                status = self.request(connection, method, path, body)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        connection.close()
+
+
+def discover_offers(url: str) -> list[str]:
+    """Ids of a few offers, found through the search endpoint."""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    ids = set()
+    for query in QUERIES:
+        connection.request("GET", f"/api/offers/search?q={quote(query)}&k=20")
+        response = connection.getresponse()
+        if response.status == 200:
+            ids.update(result["id"] for result in json.loads(response.read())["results"])
+        else:
+            response.read()
+    connection.close()
+    return sorted(ids)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--detail-ratio", type=float, default=0.2, help="share of offer detail requests")
+    parser.add_argument("--submit-ratio", type=float, default=0.0, help="share of candidate submissions")
+    parser.add_argument("--conditional", action="store_true", help="revalidate with If-None-Match")
+    args = parser.parse_args()
+
+    offers = discover_offers(args.url)
+    deadline = time.perf_counter() + args.duration
+    workers = [Worker(args.url, deadline, args, offers, seed) for seed in range(args.threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for worker in workers for latency in worker.latencies)
+    statuses: dict[int, int] = {}
+    for worker in workers:
+        for status, count in worker.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    errors = sum(worker.errors for worker in workers)
+    if not latencies:
+        print(f"No successful requests ({errors} connection errors)")
+        return
+
+    print(f"{len(latencies)} requests in {elapsed:.1f}s with {args.threads} threads "
+          f"({len(offers)} offers found)")
+    print(f"throughput: {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency ms: mean {statistics.fmean(latencies) * 1000:.2f}, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.2f}, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f}, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}")
+    print(f"statuses: {dict(sorted(statuses.items()))}, connection errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures cold-start cost of the short-lived jobs: importing the Google client
+stack and building the Forms and Calendar clients.
+
+Every sample runs in a fresh interpreter so module and discovery caches start
+empty, just like a real job. Run from the project root:
+
+    python benchmarks/startup.py --runs 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Executed in a child interpreter; prints its timings as JSON.
+SAMPLE = """
+import json, time
+t0 = time.perf_counter()
+import google_clients
+from google.auth.credentials import AnonymousCredentials
+t1 = time.perf_counter()
+factory = google_clients.ClientFactory(credentials=AnonymousCredentials())
+factory.service("forms", "v1")
+factory.service("calendar", "v3")
+t2 = time.perf_counter()
+{library}
+print(json.dumps({{"import": t1 - t0, "build": t2 - t1, "library_build": t3 - t2}}))
+"""
+
+# The same clients built by googleapiclient's own discovery lookup.
+LIBRARY_BUILD = """
+from googleapiclient.discovery import build
+build("forms", "v1", credentials=AnonymousCredentials(), cache_discovery=False)
+build("calendar", "v3", credentials=AnonymousCredentials(), cache_discovery=False)
+t3 = time.perf_counter()
+"""
+
+
+def run_sample(python: str) -> dict:
+    code = SAMPLE.format(library=LIBRARY_BUILD)
+    output = subprocess.run(
+        [python, "-c", code], cwd=PROJECT_ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args()
+
+    samples = [run_sample(args.python) for _ in range(args.runs)]
+    for key, label in [
+        ("import", "import google client stack"),
+        ("build", "build forms+calendar (local discovery)"),
+        ("library_build", "build forms+calendar (library discovery)"),
+    ]:
+        values = [sample[key] * 1000 for sample in samples]
+        print(
+            f"{label:45s} median {statistics.median(values):8.1f} ms"
+            f"   min {min(values):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# columnar.py
+
+import gzip
+import json
+import os
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Name of the metadata file inside a columnar directory.
+META_FILE = 'meta.json'
+
+# Code stored for rows that have no value in a dictionary-encoded column.
+NULL_CODE = -1
+
+# Values that survive a float64 round trip: no leading zeros (postal codes,
+# phone numbers) or trailing fraction zeros, no locale commas, no nan/inf and
+# at most 15 integer digits.
+NUMBER_RE = re.compile(r'-?(?:0|[1-9][0-9]{0,14})(?:\.[0-9]*[1-9])?')
+
+
+class DictColumn:
+    """
+    A dictionary-encoded string column.
+
+    `codes` is a memory-mapped int32 array with one entry per row pointing into
+    `values` (or NULL_CODE for missing answers), so filtering and counting can
+    be done on the codes without materialising any strings.
+    """
+
+    def __init__(self, codes: np.ndarray, values: List[str]):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def decode(self) -> List[Optional[str]]:
+        """Materialises the column as a list of strings (None for nulls)."""
+        return [None if code == NULL_CODE else self.values[code] for code in self.codes]
+
+    def value_counts(self) -> Dict[str, int]:
+        """Counts occurrences of every distinct value, ignoring nulls."""
+        counts = np.bincount(self.codes[self.codes != NULL_CODE], minlength=len(self.values))
+        return {value: int(n) for value, n in zip(self.values, counts)}
+
+
+def flatten_record(record: Dict[str, Any], prefix: str = '') -> Dict[str, str]:
+    """
+    Flattens one response record into {column name: string value}.
+
+    Nested dictionaries get dotted column names and lists of scalars are joined
+    with newlines. Google Forms API responses (`answers` keyed by question id
+    with `textAnswers`) are mapped to one column per question id.
+    """
+    flat = {}
+    for key, value in record.items():
+        name = prefix + key
+        if key == 'answers' and isinstance(value, dict) and not prefix:
+            for question_id, answer in value.items():
+                texts = answer.get('textAnswers', {}).get('answers', [])
+                flat[question_id] = '\n'.join(str(text.get('value', '')) for text in texts)
+        elif isinstance(value, dict):
+            flat.update(flatten_record(value, name + '.'))
+        elif isinstance(value, list):
+            flat[name] = '\n'.join(
+                v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in value
+            )
+        elif value is not None:
+            flat[name] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return flat
+
+
+def _parse_numbers(values: List[str]) -> Optional[np.ndarray]:
+    """Returns the dictionary as float64 if every value is a plain number, else None."""
+    if not all(NUMBER_RE.fullmatch(v) for v in values):
+        return None
+    return np.array([float(v) for v in values], dtype=np.float64)
+
+
+def write_columns(records: Iterable[Dict[str, Any]], path: str) -> Dict[str, Any]:
+    """
+    Writes records as a columnar directory, one file set per column.
+
+    Every column is dictionary-encoded in a single pass. At the end, columns
+    whose distinct values are all numbers are stored as a float64 `.npy`
+    array (NaN for nulls); the others keep an int32 `.codes.npy` array and a
+    gzip-compressed dictionary. Only the dictionaries are compressed: the
+    `.npy` files are left uncompressed on purpose so they can be
+    memory-mapped on read instead of being inflated into memory.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): Records to encode, e.g. from
+                                            `jsonl.stream_load`.
+        path (str): Output directory (created if needed).
+
+    Returns:
+        Dict[str, Any]: The metadata written to meta.json.
+    """
+    codes: Dict[str, array] = {}
+    dictionaries: Dict[str, Dict[str, int]] = {}
+    rows = 0
+    for record in records:
+        for name, value in flatten_record(record).items():
+            column = codes.get(name)
+            if column is None:
+                column = codes[name] = array('i', [NULL_CODE]) * rows
+                dictionaries[name] = {}
+            dictionary = dictionaries[name]
+            code = dictionary.setdefault(value, len(dictionary))
+            # Pad the column if the value appears for the first time in this row
+            column.extend([NULL_CODE] * (rows - len(column)))
+            column.append(code)
+        rows += 1
+
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for i, (name, column) in enumerate(codes.items()):
+        column.extend([NULL_CODE] * (rows - len(column)))
+        column_codes = np.frombuffer(column, dtype=np.int32)
+        values = list(dictionaries[name])
+        numbers = _parse_numbers(values)
+        if numbers is not None:
+            data = np.full(rows, np.nan, dtype=np.float64)
+            present = column_codes != NULL_CODE
+            data[present] = numbers[column_codes[present]]
+            np.save(os.path.join(path, f'{i}.npy'), data)
+            columns.append({"name": name, "kind": "numeric", "file": f'{i}.npy'})
+        else:
+            np.save(os.path.join(path, f'{i}.codes.npy'), column_codes)
+            with gzip.open(os.path.join(path, f'{i}.dict.json.gz'), 'wt', encoding='utf-8') as f:
+                json.dump(values, f, ensure_ascii=False)
+            columns.append({
+                "name": name,
+                "kind": "dict",
+                "file": f'{i}.codes.npy',
+                "dictionary": f'{i}.dict.json.gz',
+            })
+
+    meta = {"rows": rows, "columns": columns}
+    with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+def list_columns(path: str) -> List[str]:
+    """Returns the names of the columns stored in a columnar directory."""
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        return [column["name"] for column in json.load(f)["columns"]]
+
+
+def load_columns(path: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Loads only the requested columns from a columnar directory.
+
+    Numeric columns are returned as memory-mapped float64 arrays and string
+    columns as `DictColumn`; files of other columns are never opened.
+
+    Args:
+        path (str): Directory written by `write_columns`.
+        columns (Optional[List[str]]): Column names to load (default: all).
+
+    Returns:
+        Dict[str, Any]: Mapping of column name to its data.
+    """
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    wanted = None if columns is None else set(columns)
+
+    result = {}
+    for column in meta["columns"]:
+        if wanted is not None and column["name"] not in wanted:
+            continue
+        data = np.load(os.path.join(path, column["file"]), mmap_mode='r')
+        if column["kind"] == "dict":
+            with gzip.open(os.path.join(path, column["dictionary"]), 'rt', encoding='utf-8') as f:
+                data = DictColumn(data, json.load(f))
+        result[column["name"]] = data
+
+    if wanted is not None and len(result) != len(wanted):
+        raise KeyError(f"Unknown columns: {sorted(wanted - set(result))}")
+    return result
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    responses = [
+        {"Jak masz na imię?": "Anna", "Ile masz lat?": "23"},
+        {"Jak masz na imię?": "Piotr", "Ile masz lat?": "31", "Czy posiadasz własny laptop?": "Tak"},
+        {"Jak masz na imię?": "Anna"},
+    ]
+    write_columns(responses, 'responses.cols')
+
+    ages = load_columns('responses.cols', ["Ile masz lat?"])["Ile masz lat?"]
+    print(f"Average age: {np.nanmean(ages):.1f}")
+
+    names = load_columns('responses.cols', ["Jak masz na imię?"])["Jak masz na imię?"]
+    print(names.value_counts())
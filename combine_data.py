@@ -1,7 +1,15 @@
 import os
 import json
-import glob
-from typing import Dict, Any
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import jsonl
+
+# Suffix of the manifest kept next to the output file by incremental runs.
+MANIFEST_SUFFIX = '.manifest.json'
 
 def add_to_jsonl(item: Dict[str, Any], file_path: str) -> None:
     """
@@ -10,27 +18,252 @@ def add_to_jsonl(item: Dict[str, Any], file_path: str) -> None:
     with open(file_path, 'a', encoding='utf-8') as f:
         f.write(json.dumps(item, ensure_ascii=False) + '\n')
 
-def combine_json_to_jsonl(input_dir, output_file):
+def _empty_manifest() -> Dict[str, Any]:
+    return {"files": {}, "superseded": [], "lines": 0, "output_size": 0}
+
+def load_manifest(output_file: str) -> Dict[str, Any]:
+    """
+    Loads the manifest of already ingested files for an output JSONL file.
+
+    The manifest maps every ingested path to its size, mtime, sha256 and the
+    line number of its record in the output, and lists output lines that were
+    superseded by a newer version of the same file.
+    """
+    manifest_path = output_file + MANIFEST_SUFFIX
+    if not os.path.exists(manifest_path) or not os.path.exists(output_file):
+        return _empty_manifest()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if os.path.getsize(output_file) != manifest["output_size"]:
+        # The output was modified outside of combine_data; rebuild from scratch.
+        return _empty_manifest()
+    return manifest
+
+def save_manifest(manifest: Dict[str, Any], output_file: str) -> None:
+    """
+    Atomically replaces the manifest of an output JSONL file.
+    """
+    manifest["output_size"] = os.path.getsize(output_file)
+    manifest_path = output_file + MANIFEST_SUFFIX
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+def _sha256(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+def _iter_json_files(input_dir: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Lazily walks a directory, yielding (path, stat) of its *.json files."""
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') and entry.is_file():
+                yield entry.path, entry.stat()
+
+def _read_json_file(json_file: str) -> Tuple[str, str, Optional[bytes], Optional[str]]:
+    """
+    Worker side of `combine_json_to_jsonl`: hashes, parses and re-serializes one file.
+
+    Returns (path, sha256, JSONL line, error); the line is None on error and
+    the sha256 is None too if the file could not be read at all.
+    """
+    try:
+        with open(json_file, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        return json_file, None, None, str(e)
+    digest = _sha256(raw)
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return json_file, digest, None, str(e)
+    return json_file, digest, (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'), None
+
+def _quarantine(json_file: str, digest: str, error: str, quarantine_dir: str) -> None:
+    """Moves an invalid input file aside and records why it was rejected."""
+    os.makedirs(quarantine_dir, exist_ok=True)
+    # The content hash keeps different files of the same name apart
+    stem, ext = os.path.splitext(os.path.basename(json_file))
+    target = os.path.join(quarantine_dir, f"{stem}.{digest[:12]}{ext}")
+    os.replace(json_file, target)
+    jsonl.add({"file": json_file, "quarantined_as": target, "error": error},
+              os.path.join(quarantine_dir, 'errors.jsonl'))
+
+def _parse_in_pool(candidates: Iterator[str], workers: int,
+                   ordered: bool) -> Iterator[Tuple[str, str, Optional[bytes], Optional[str]]]:
+    """Runs `_read_json_file` over a lazy stream of paths with a bounded window."""
+    if workers == 1:
+        yield from map(_read_json_file, candidates)
+        return
+
+    max_pending = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for json_file in candidates:
+            pending.append(executor.submit(_read_json_file, json_file))
+            while len(pending) >= max_pending:
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield future.result()
+        for future in pending:
+            yield future.result()
+
+def combine_json_to_jsonl(input_dir, output_file, incremental=False, workers=None,
+                          ordered=True, quarantine_dir=None, columnar_path=None):
     """
     Combines all JSON files from a directory into a single JSONL file.
+
+    The directory is walked lazily and files are parsed on a process pool of
+    `workers` processes (default: CPU count, 1 runs inline); a single writer
+    appends the results, in directory order unless `ordered=False`. Files that
+    are not valid JSON are moved to `quarantine_dir` (default:
+    `<input_dir>/quarantine`) together with an errors.jsonl entry; files that
+    cannot be read are skipped, keeping their previous record. If
+    `columnar_path` is given, a columnar copy is exported there as well.
+
+    With `incremental=True` only files that are new or changed since the last
+    run (according to the manifest) are read and appended. Records of changed
+    or deleted files are marked as superseded and dropped by `compact`.
     """
-    json_files = glob.glob(os.path.join(input_dir, '*.json'))
-    
-    # Clear the output file
-    with open(output_file, 'w') as f:
-        pass
-
-    for json_file in json_files:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                add_to_jsonl(data, output_file)
-                print(f"Processed and added {json_file} to {output_file}")
-            except json.JSONDecodeError:
-                print(f"Skipping invalid JSON file: {json_file}")
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    quarantine_dir = quarantine_dir or os.path.join(input_dir, 'quarantine')
+
+    manifest = load_manifest(output_file) if incremental else _empty_manifest()
+    files = manifest["files"]
+    # A fresh manifest means the output is rebuilt from scratch
+    mode = 'a' if manifest["lines"] else 'w'
+
+    seen = set()
+    stats = {}
+    summary = {"files": 0, "unchanged": 0, "added": 0, "quarantined": 0, "skipped": 0, "bytes": 0}
+
+    def changed_files():
+        for json_file, stat in _iter_json_files(input_dir):
+            summary["files"] += 1
+            seen.add(json_file)
+            entry = files.get(json_file)
+            if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                summary["unchanged"] += 1
+                continue
+            stats[json_file] = stat
+            yield json_file
+
+    with jsonl.JsonlWriter(output_file, mode=mode) as writer:
+        for json_file, digest, line, error in _parse_in_pool(changed_files(), workers, ordered):
+            stat = stats.pop(json_file)
+            if digest is None:
+                print(f"Skipping {json_file}: {error}")
+                summary["skipped"] += 1
+                continue
+            entry = files.get(json_file)
+            if entry and entry["sha256"] == digest:
+                entry["mtime_ns"] = stat.st_mtime_ns
+                summary["unchanged"] += 1
+                continue
+            if line is None:
+                try:
+                    _quarantine(json_file, digest, error, quarantine_dir)
+                except OSError as e:
+                    print(f"Could not quarantine {json_file}: {e}")
+                    summary["skipped"] += 1
+                    continue
+                seen.discard(json_file)
+                summary["quarantined"] += 1
+                continue
+
+            if entry:
+                manifest["superseded"].append(entry["line"])
+            writer.write_encoded(line)
+            files[json_file] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+                "line": manifest["lines"],
+            }
+            manifest["lines"] += 1
+            summary["added"] += 1
+            summary["bytes"] += stat.st_size
+
+    # Records of files that disappeared from the input directory are stale too
+    for json_file in [path for path in files if path not in seen]:
+        manifest["superseded"].append(files.pop(json_file)["line"])
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    manifest["last_run"] = summary
+    save_manifest(manifest, output_file)
+
+    rate = summary["files"] / elapsed if elapsed else 0.0
+    print(
+        f"Scanned {summary['files']} files in {elapsed:.2f}s ({rate:.0f} files/s, "
+        f"{summary['bytes'] / 1e6 / max(elapsed, 1e-9):.1f} MB/s): "
+        f"{summary['added']} added, {summary['unchanged']} unchanged, "
+        f"{summary['quarantined']} quarantined into {quarantine_dir}, "
+        f"{summary['skipped']} skipped"
+    )
+
+    if columnar_path:
+        export_columnar(output_file, columnar_path, manifest)
+    return manifest
+
+def export_columnar(output_file, columnar_path, manifest=None):
+    """
+    Writes the live records of a combined JSONL file in the columnar format.
+
+    Superseded records listed in the manifest are skipped, so the export
+    matches what `compact` would leave in the JSONL file.
+    """
+    import columnar
+
+    manifest = manifest or load_manifest(output_file)
+    superseded = set(manifest["superseded"])
+    records = (
+        record for line_no, record in enumerate(jsonl.stream_load(output_file))
+        if line_no not in superseded
+    )
+    return columnar.write_columns(records, columnar_path)
+
+def compact(output_file):
+    """
+    Rewrites an incrementally built JSONL file without its superseded records.
+
+    Line numbers in the manifest are renumbered to match the new file, and the
+    sidecar index (if any) is rebuilt.
+    """
+    manifest = load_manifest(output_file)
+    superseded = set(manifest["superseded"])
+    if not superseded:
+        return manifest
+
+    renumbered = {}
+    tmp_file = output_file + '.tmp'
+    with open(output_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+        for line_no, line in enumerate(src):
+            if line_no in superseded:
+                continue
+            renumbered[line_no] = len(renumbered)
+            dst.write(line)
+    os.replace(tmp_file, output_file)
+
+    for entry in manifest["files"].values():
+        entry["line"] = renumbered[entry["line"]]
+    manifest["superseded"] = []
+    manifest["lines"] = len(renumbered)
+    save_manifest(manifest, output_file)
+
+    jsonl.reindex(output_file)
+    return manifest
 
 if __name__ == '__main__':
     data_directory = '/home/pietkap/projects/hackathons/HackYeah_2025/data'
     output_jsonl_file = '/home/pietkap/projects/hackathons/HackYeah_2025/syntetic_data.jsonl'
-    combine_json_to_jsonl(data_directory, output_jsonl_file)
+    columnar_directory = '/home/pietkap/projects/hackathons/HackYeah_2025/syntetic_data.cols'
+    manifest = combine_json_to_jsonl(data_directory, output_jsonl_file, incremental=True,
+                                     columnar_path=columnar_directory)
+    if len(manifest["superseded"]) * 2 > manifest["lines"]:
+        compact(output_jsonl_file)
     print(f"All JSON files from '{data_directory}' have been combined into '{output_jsonl_file}'.")
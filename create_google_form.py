@@ -1,108 +1,191 @@
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 from faker import Faker
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from google_clients import get_factory, get_service
 import jsonl
+from request_executor import RequestExecutor, classify, get_executor, OK, FATAL
+from state_store import STATE_DB, StateStore
 import random
 from datetime import datetime, timedelta
 import pytz
 
-# If modifying these SCOPES, delete the file token.json.
-SCOPES = [
-    "https://www.googleapis.com/auth/calendar",
-    "https://www.googleapis.com/auth/forms.body",
-]
+CALENDAR_ID = os.environ.get("CALENDAR_ID", "primary")
 
-from pathlib import Path
+# Provisioning concurrency and per-API request rates (requests per second).
+PROVISION_CONCURRENCY = int(os.environ.get("PROVISION_CONCURRENCY", "8"))
+FORMS_QPS = float(os.environ.get("FORMS_QPS", "5"))
+CALENDAR_QPS = float(os.environ.get("CALENDAR_QPS", "10"))
+
+# Calendar API batch requests should not carry more than 50 calls.
+CALENDAR_BATCH_SIZE = 50
+MAX_BATCH_ATTEMPTS = 4
+
+
+def _question_item(body: dict[str, Any]) -> dict[str, Any]:
+    """Builds the Forms API item for a question description from `bodies`."""
+    return {
+        "title": body["title"],
+        "questionItem": {
+            "question": {
+                "required": body.get("required", False),
+                "textQuestion": {"paragraph": body.get("paragraph", False)},
+            }
+        },
+    }
 
-cred_path = (
-    Path(os.getcwd()) / ".." / "client_secret.apps.googleusercontent.com.json"
-).resolve()
 
-CALENDAR_ID = os.environ.get("CALENDAR_ID", "primary")
+def _item_signature(item: dict[str, Any]) -> tuple[str, bool, bool] | None:
+    """Returns (title, required, paragraph) of an existing text question item."""
+    question = item.get("questionItem", {}).get("question", {})
+    if "textQuestion" not in question:
+        return None
+    return (
+        item.get("title", ""),
+        question.get("required", False),
+        question["textQuestion"].get("paragraph", False),
+    )
+
+
+def diff_form_requests(
+    form: dict[str, Any], title: str, bodies: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """
+    Computes the minimal batchUpdate requests turning `form` into `bodies`.
+
+    Questions are matched by title: matching items are moved into place and
+    updated only if their required/paragraph flags changed, missing ones are
+    created and leftovers are deleted. Returns an empty list if the form is
+    already up to date.
+    """
+    requests = []
+    if form.get("info", {}).get("title") != title:
+        requests.append(
+            {"updateFormInfo": {"info": {"title": title}, "updateMask": "title"}}
+        )
 
+    # Simulated item list, kept in sync with the requests issued so far
+    current = list(form.get("items", []))
+    for i, body in enumerate(bodies):
+        wanted = _item_signature(_question_item(body))
+        j = next(
+            (
+                k
+                for k in range(i, len(current))
+                if current[k].get("title") == body["title"]
+            ),
+            None,
+        )
+        if j is None:
+            requests.append(
+                {"createItem": {"item": _question_item(body), "location": {"index": i}}}
+            )
+            current.insert(i, _question_item(body))
+            continue
+
+        if j != i:
+            requests.append(
+                {
+                    "moveItem": {
+                        "originalLocation": {"index": j},
+                        "newLocation": {"index": i},
+                    }
+                }
+            )
+            current.insert(i, current.pop(j))
+
+        existing = current[i]
+        if _item_signature(existing) != wanted:
+            item = _question_item(body)
+            item["itemId"] = existing["itemId"]
+            question_id = (
+                existing.get("questionItem", {}).get("question", {}).get("questionId")
+            )
+            if question_id:
+                item["questionItem"]["question"]["questionId"] = question_id
+            requests.append(
+                {
+                    "updateItem": {
+                        "item": item,
+                        "location": {"index": i},
+                        "updateMask": "questionItem.question",
+                    }
+                }
+            )
+
+    # Delete from the end so earlier indexes stay valid
+    for index in range(len(current) - 1, len(bodies) - 1, -1):
+        requests.append({"deleteItem": {"location": {"index": index}}})
+    return requests
 
-def get_credentials(c_path: os.PathLike):
-    """Gets user credentials from a local file."""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(c_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return creds
+
+def form_content_hash(title: str, bodies: list[dict[str, Any]]) -> str:
+    """Hashes the desired content of a form to detect whether it needs a sync."""
+    payload = json.dumps([title, bodies], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 def create_or_update_form(
-    title: str, bodies: list[dict[str, Any]], form_id_file="form_id.txt"
+    title: str,
+    bodies: list[dict[str, Any]],
+    name: str,
+    state: StateStore,
+    executor: RequestExecutor | None = None,
 ):
-    """Creates a new Google Form or updates an existing one."""
-    creds = get_credentials(cred_path)
-    form_service = build("forms", "v1", credentials=creds)
-    form_id = None
-
-    if os.path.exists(form_id_file):
-        with open(form_id_file, "r") as f:
-            form_id = f.read().strip()
+    """
+    Creates a new Google Form or updates an existing one.
+
+    The form is looked up in `state` by its logical `name`. An existing form
+    is always read once, so that a form deleted in Google is recreated. If
+    its content hash and revision id both match the last sync, nothing is
+    written; otherwise it is brought in line with `bodies` by a single
+    diff-based batchUpdate, guarded by the revision id that was read. API
+    calls go through `executor` (default: the shared one), which throttles
+    and retries them.
+    """
+    content_hash = form_content_hash(title, bodies)
+    record = state.get(name)
+    form_id = record.form_id if record else None
+
+    form_service = get_service("forms", "v1")
+    executor = executor or get_executor()
 
     if form_id:
         try:
-            form = form_service.forms().get(formId=form_id).execute()
-            print(f"Form {form_id} already exists. Updating it.")
-
-            # Clear existing questions
-            items = form.get("items", [])
-            requests = []
-            if items:
-                for _ in range(len(items)):
-                    requests.append({"deleteItem": {"location": {"index": 0}}})
-
-            # Update title
-            requests.append(
-                {"updateFormInfo": {"info": {"title": title}, "updateMask": "title"}}
-            )
+            form = executor.execute(form_service.forms().get(formId=form_id))
+            revision_id = form["revisionId"]
 
+            # Skip the diff if neither our content nor the form changed since the last sync
+            unchanged = record.content_hash == content_hash and record.revision_id == revision_id
+            requests = [] if unchanged else diff_form_requests(form, title, bodies)
             if requests:
-                form_service.forms().batchUpdate(
-                    formId=form_id, body={"requests": requests}
-                ).execute()
-
-            # Add new questions
-            requests = []
-            for i, body in enumerate(bodies):
-                requests.append(
-                    {
-                        "createItem": {
-                            "item": {
-                                "title": body["title"],
-                                "questionItem": {
-                                    "question": {
-                                        "required": body.get("required", False),
-                                        "textQuestion": {
-                                            "paragraph": body.get("paragraph", False)
-                                        },
-                                    }
-                                },
-                            },
-                            "location": {"index": i},
-                        }
-                    }
+                print(f"Form {form_id} already exists. Applying {len(requests)} changes.")
+                result = executor.execute(
+                    form_service.forms().batchUpdate(
+                        formId=form_id,
+                        body={
+                            "requests": requests,
+                            "writeControl": {"requiredRevisionId": revision_id},
+                        },
+                    )
                 )
-
-            if requests:
-                form_service.forms().batchUpdate(
-                    formId=form_id, body={"requests": requests}
-                ).execute()
-
+                revision_id = result.get("writeControl", {}).get(
+                    "requiredRevisionId", revision_id
+                )
+            else:
+                print(f"Form {form_id} is up to date.")
+
+            state.update(
+                name,
+                form_id=form_id,
+                responder_uri=form["responderUri"],
+                revision_id=revision_id,
+                content_hash=content_hash,
+            )
             return form["responderUri"]
         except HttpError as e:
             if e.resp.status == 404:
@@ -113,50 +196,39 @@ def create_or_update_form(
 
     if not form_id:
         form = {"info": {"title": title}}
-        new_form = form_service.forms().create(body=form).execute()
+        new_form = executor.execute(form_service.forms().create(body=form))
         form_id = new_form["formId"]
+        revision_id = new_form.get("revisionId")
+
+        # Record the id right away so a crash below doesn't orphan the form
+        state.update(
+            name,
+            form_id=form_id,
+            responder_uri=new_form["responderUri"],
+            revision_id=revision_id,
+            content_hash=None,
+        )
 
-        with open(form_id_file, "w") as f:
-            f.write(form_id)
-
-        requests = []
-        for i, body in enumerate(bodies):
-            requests.append(
-                {
-                    "createItem": {
-                        "item": {
-                            "title": body["title"],
-                            "questionItem": {
-                                "question": {
-                                    "required": body.get("required", False),
-                                    "textQuestion": {
-                                        "paragraph": body.get("paragraph", False)
-                                    },
-                                }
-                            },
-                        },
-                        "location": {"index": i},
-                    }
-                }
-            )
+        requests = [
+            {"createItem": {"item": _question_item(body), "location": {"index": i}}}
+            for i, body in enumerate(bodies)
+        ]
 
         if requests:
             question_setting = {"requests": requests}
-            form_service.forms().batchUpdate(
-                formId=form_id, body=question_setting
-            ).execute()
+            result = executor.execute(
+                form_service.forms().batchUpdate(formId=form_id, body=question_setting)
+            )
+            revision_id = result.get("writeControl", {}).get(
+                "requiredRevisionId", revision_id
+            )
 
+        state.update(name, revision_id=revision_id, content_hash=content_hash)
         return new_form["responderUri"]
 
 
-def create_or_update_event(calendar_service, calendar_id, event_data, event_id_file):
-    """Creates a new Google Calendar event or updates an existing one and returns its ID."""
-    event_id = None
-    if os.path.exists(event_id_file):
-        with open(event_id_file, "r") as f:
-            event_id = f.read().strip()
-
-    event_body = {
+def _event_body(event_data: dict[str, Any]) -> dict[str, Any]:
+    return {
         "summary": event_data["title"],
         "description": event_data["description"],
         "start": {
@@ -169,151 +241,316 @@ def create_or_update_event(calendar_service, calendar_id, event_data, event_id_f
         },
     }
 
+
+def create_or_update_event(
+    calendar_service, calendar_id, event_data, name, state, executor=None
+):
+    """Creates a new Google Calendar event or updates an existing one and returns its ID."""
+    record = state.get(name)
+    event_id = record.event_id if record else None
+    executor = executor or get_executor()
+
+    event_body = _event_body(event_data)
+
     try:
         if event_id:
-            updated_event = (
-                calendar_service.events()
-                .update(calendarId=calendar_id, eventId=event_id, body=event_body)
-                .execute()
+            updated_event = executor.execute(
+                calendar_service.events().update(
+                    calendarId=calendar_id, eventId=event_id, body=event_body
+                )
             )
             print(f"Event {updated_event['id']} updated.")
             return updated_event["id"]
         else:
-            new_event = (
-                calendar_service.events()
-                .insert(calendarId=calendar_id, body=event_body)
-                .execute()
+            new_event = executor.execute(
+                calendar_service.events().insert(calendarId=calendar_id, body=event_body)
             )
             event_id = new_event["id"]
-            with open(event_id_file, "w") as f:
-                f.write(event_id)
+            state.update(name, event_id=event_id)
             print(f"Event {event_id} created.")
             return event_id
     except HttpError as e:
         if e.resp.status == 404:
             print("Event not found, creating a new one.")
-            new_event = (
-                calendar_service.events()
-                .insert(calendarId=calendar_id, body=event_body)
-                .execute()
+            new_event = executor.execute(
+                calendar_service.events().insert(calendarId=calendar_id, body=event_body)
             )
             event_id = new_event["id"]
-            with open(event_id_file, "w") as f:
-                f.write(event_id)
+            state.update(name, event_id=event_id)
             print(f"Event {event_id} created.")
             return event_id
         else:
             raise e
 
 
-if __name__ == "__main__":
-    creds = get_credentials(cred_path)
-    calendar_service = build("calendar", "v3", credentials=creds)
-
-    fake = Faker("pl_PL")
-    warsaw_tz = pytz.timezone("Europe/Warsaw")
+def execute_batch(
+    calendar_service,
+    calls: dict[str, Any],
+    executor: RequestExecutor | None = None,
+    max_attempts: int = MAX_BATCH_ATTEMPTS,
+) -> dict[str, tuple[Any, Exception | None]]:
+    """
+    Executes Calendar API requests through the HTTP batch endpoint.
+
+    `calls` maps a request id to a zero-argument function building the
+    request, so failed items can be rebuilt and retried. Requests are sent
+    CALENDAR_BATCH_SIZE at a time through `executor`, which counts every
+    item against the Calendar quota and retries failures of the batch call
+    itself. Items failing with a throttling or transient error are retried
+    in a later round, after the executor's backoff (or Retry-After) delay.
+
+    Returns:
+        dict[str, tuple[Any, Exception | None]]: (response, exception) per id.
+    """
+    executor = executor or get_executor()
+    results = {}
+    pending = dict(calls)
+    for attempt in range(max_attempts):
+        retry = {}
+        delays = [0.0]
+
+        def callback(request_id, response, exception):
+            if classify(exception) not in (OK, FATAL) and attempt + 1 < max_attempts:
+                retry[request_id] = pending[request_id]
+                delays.append(executor.record_failure("calendar", exception, attempt))
+            else:
+                results[request_id] = (response, exception)
+
+        request_ids = list(pending)
+        for start in range(0, len(request_ids), CALENDAR_BATCH_SIZE):
+            chunk = request_ids[start : start + CALENDAR_BATCH_SIZE]
+            batch = calendar_service.new_batch_http_request(callback=callback)
+            for request_id in chunk:
+                batch.add(pending[request_id](), request_id=request_id)
+            executor.execute(batch, api="calendar", tokens=len(chunk))
+
+        if not retry:
+            break
+        pending = retry
+        time.sleep(max(delays))
+    return results
+
+
+def create_or_update_events(
+    calendar_service,
+    calendar_id: str,
+    events: list[tuple[dict[str, Any], str]],
+    state: StateStore,
+    executor: RequestExecutor | None = None,
+) -> list[str | None]:
+    """
+    Batched version of `create_or_update_event` for many events at once.
+
+    `events` holds (event_data, name) pairs. Events with an id in `state`
+    are updated and the rest inserted in as few batch round trips as
+    possible; updates of events that no longer exist fall back to an insert.
+    New ids are recorded in `state` in a single transaction.
+
+    Returns:
+        list[str | None]: The event id of every pair (None if it failed).
+    """
+    event_ids: list[str | None] = []
+    for _, name in events:
+        record = state.get(name)
+        event_ids.append(record.event_id if record else None)
+
+    def update(i):
+        return lambda: calendar_service.events().update(
+            calendarId=calendar_id, eventId=event_ids[i], body=_event_body(events[i][0])
+        )
 
-    base_questions = [
-        {"title": "Jak masz na imię?", "required": True},
-        {"title": "Ile masz lat?"},
-        {"title": "Jaki jest Twój adres e-mail?", "required": True},
-    ]
+    def insert(i):
+        return lambda: calendar_service.events().insert(
+            calendarId=calendar_id, body=_event_body(events[i][0])
+        )
 
-    form_types = {
-        "Wolontariat": {
-            "title_template": "Aplikacja na wolontariat: {}",
-            "questions": [
-                {
-                    "title": "Dlaczego chcesz być wolontariuszem w naszej organizacji?",
-                    "paragraph": True,
-                    "required": True,
-                },
-                {
-                    "title": "Jakie umiejętności możesz wnieść do naszego zespołu?",
-                    "paragraph": True,
-                },
-            ],
-        },
-        "Staż": {
-            "title_template": "Aplikacja na staż: {}",
-            "questions": [
-                {"title": "Jakie jest Twoje pole studiów?", "required": True},
-                {
-                    "title": "Proszę wymienić swoje umiejętności i doświadczenie.",
-                    "paragraph": True,
-                },
-                {
-                    "title": "Jakie są Twoje cele zawodowe?",
-                    "paragraph": True,
-                    "required": True,
-                },
-            ],
-        },
-        "Praca": {
-            "title_template": "Aplikacja o pracę: {}",
-            "questions": [
-                {
-                    "title": "Jakie jest Twoje doświadczenie zawodowe?",
-                    "paragraph": True,
-                    "required": True,
-                },
-                {"title": "Jakie są Twoje oczekiwania finansowe?", "required": True},
-                {
-                    "title": "Dlaczego chcesz pracować w naszej firmie?",
-                    "paragraph": True,
-                },
-            ],
-        },
-        "Praktyki": {
-            "title_template": "Aplikacja na praktyki: {}",
-            "questions": [
-                {
-                    "title": "W jakiej dziedzinie chciałbyś/chciałabyś odbyć praktyki?",
-                    "required": True,
-                },
-                {"title": "Jaki jest Twój poziom znajomości języka angielskiego?"},
-                {"title": "Czy posiadasz własny laptop?", "required": True},
-            ],
-        },
-        "Wolontariat w schronisku dla zwierząt": {
-            "title_template": "Wolontariat w schronisku dla zwierząt",
-            "questions": [
-                {
-                    "title": "Czy masz doświadczenie w pracy ze zwierzętami?",
-                    "paragraph": True,
-                },
-                {
-                    "title": "Czy jesteś alergikiem? Jeśli tak, na co?",
-                    "paragraph": True,
-                },
-                {
-                    "title": "W jakie dni i w jakich godzinach jesteś dyspozycyjny/a?",
-                    "paragraph": True,
-                    "required": True,
-                },
-                {
-                    "title": "Czy masz jakieś obawy przed pracą ze zwierzętami po przejściach?",
-                    "paragraph": True,
-                },
-            ],
-        },
+    calls = {
+        str(i): update(i) if event_ids[i] else insert(i) for i in range(len(events))
+    }
+    results = execute_batch(calendar_service, calls, executor)
+
+    missing = {
+        str(i): insert(i)
+        for i in range(len(events))
+        if event_ids[i]
+        and isinstance(results[str(i)][1], HttpError)
+        and results[str(i)][1].resp.status in (404, 410)
+    }
+    if missing:
+        print(f"{len(missing)} events not found, creating new ones.")
+        results.update(execute_batch(calendar_service, missing, executor))
+
+    created = []
+    for i, (_, name) in enumerate(events):
+        response, exception = results[str(i)]
+        if exception is not None:
+            print(f"Failed to create or update event for '{events[i][0]['title']}': {exception}")
+            event_ids[i] = None
+            continue
+        if response["id"] != event_ids[i]:
+            created.append((name, {"event_id": response["id"]}))
+            print(f"Event {response['id']} created.")
+        else:
+            print(f"Event {response['id']} updated.")
+        event_ids[i] = response["id"]
+    state.update_many(created)
+    return event_ids
+
+
+def add_attendees(
+    calendar_service,
+    calendar_id: str,
+    event_ids: list[str],
+    attendee_email: str,
+    executor: RequestExecutor | None = None,
+) -> None:
+    """Adds an attendee to every event that does not invite them yet, in batches."""
+    gets = {
+        event_id: (
+            lambda event_id=event_id: calendar_service.events().get(
+                calendarId=calendar_id, eventId=event_id
+            )
+        )
+        for event_id in event_ids
     }
+    patches = {}
+    for event_id, (event, exception) in execute_batch(
+        calendar_service, gets, executor
+    ).items():
+        if exception is not None:
+            print(f"  - Failed to add attendee to event {event_id}: {exception}")
+            continue
+        attendees = event.get("attendees", [])
+        # Check if attendee already exists
+        if any(att["email"] == attendee_email for att in attendees):
+            print(f"  - Attendee already exists in event {event_id}")
+            continue
+        body = {"attendees": attendees + [{"email": attendee_email}]}
+        patches[event_id] = (
+            lambda event_id=event_id, body=body: calendar_service.events().patch(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body=body,
+                sendUpdates="all",
+            )
+        )
+
+    for event_id, (_, exception) in execute_batch(
+        calendar_service, patches, executor
+    ).items():
+        if exception is not None:
+            print(f"  - Failed to add attendee to event {event_id}: {exception}")
+        else:
+            print(f"  - Added attendee to event {event_id}")
 
-    output_file = "forms.jsonl"
-    with open(output_file, "w") as f:
-        pass
 
-    created_event_ids = []
+BASE_QUESTIONS = [
+    {"title": "Jak masz na imię?", "required": True},
+    {"title": "Ile masz lat?"},
+    {"title": "Jaki jest Twój adres e-mail?", "required": True},
+]
 
-    form_keys = list(form_types.keys())
-    forms_to_create = random.choices(form_keys[:-1], k=10) + [
-        "Wolontariat w schronisku dla zwierząt"
-    ]
+FORM_TYPES = {
+    "Wolontariat": {
+        "title_template": "Aplikacja na wolontariat: {}",
+        "questions": [
+            {
+                "title": "Dlaczego chcesz być wolontariuszem w naszej organizacji?",
+                "paragraph": True,
+                "required": True,
+            },
+            {
+                "title": "Jakie umiejętności możesz wnieść do naszego zespołu?",
+                "paragraph": True,
+            },
+        ],
+    },
+    "Staż": {
+        "title_template": "Aplikacja na staż: {}",
+        "questions": [
+            {"title": "Jakie jest Twoje pole studiów?", "required": True},
+            {
+                "title": "Proszę wymienić swoje umiejętności i doświadczenie.",
+                "paragraph": True,
+            },
+            {
+                "title": "Jakie są Twoje cele zawodowe?",
+                "paragraph": True,
+                "required": True,
+            },
+        ],
+    },
+    "Praca": {
+        "title_template": "Aplikacja o pracę: {}",
+        "questions": [
+            {
+                "title": "Jakie jest Twoje doświadczenie zawodowe?",
+                "paragraph": True,
+                "required": True,
+            },
+            {"title": "Jakie są Twoje oczekiwania finansowe?", "required": True},
+            {
+                "title": "Dlaczego chcesz pracować w naszej firmie?",
+                "paragraph": True,
+            },
+        ],
+    },
+    "Praktyki": {
+        "title_template": "Aplikacja na praktyki: {}",
+        "questions": [
+            {
+                "title": "W jakiej dziedzinie chciałbyś/chciałabyś odbyć praktyki?",
+                "required": True,
+            },
+            {"title": "Jaki jest Twój poziom znajomości języka angielskiego?"},
+            {"title": "Czy posiadasz własny laptop?", "required": True},
+        ],
+    },
+    "Wolontariat w schronisku dla zwierząt": {
+        "title_template": "Wolontariat w schronisku dla zwierząt",
+        "questions": [
+            {
+                "title": "Czy masz doświadczenie w pracy ze zwierzętami?",
+                "paragraph": True,
+            },
+            {
+                "title": "Czy jesteś alergikiem? Jeśli tak, na co?",
+                "paragraph": True,
+            },
+            {
+                "title": "W jakie dni i w jakich godzinach jesteś dyspozycyjny/a?",
+                "paragraph": True,
+                "required": True,
+            },
+            {
+                "title": "Czy masz jakieś obawy przed pracą ze zwierzętami po przejściach?",
+                "paragraph": True,
+            },
+        ],
+    },
+}
+
+ANIMAL_SHELTER = "Wolontariat w schronisku dla zwierząt"
+
+
+def build_form_specs(count: int = 10) -> list[dict[str, Any]]:
+    """
+    Generates `count` random recruitment forms plus the animal shelter form.
+
+    Each spec holds the form title, its questions, the logical name its ids
+    are stored under in the state store, and the event description and dates.
+    """
+    fake = Faker("pl_PL")
+    warsaw_tz = pytz.timezone("Europe/Warsaw")
+
+    form_keys = list(FORM_TYPES.keys())
+    forms_to_create = random.choices(form_keys[:-1], k=count) + [ANIMAL_SHELTER]
     random.shuffle(forms_to_create)
 
+    specs = []
     regular_form_counter = 0
     for form_key in forms_to_create:
-        form_details = form_types[form_key]
+        form_details = FORM_TYPES[form_key]
         job_title = fake.job()
 
         if "{}" in form_details["title_template"]:
@@ -321,69 +558,146 @@ if __name__ == "__main__":
         else:
             form_title = form_details["title_template"]
 
-        additional_questions = form_details["questions"]
-        all_questions = base_questions + additional_questions
-
-        if form_key == "Wolontariat w schronisku dla zwierząt":
-            form_id_file = "form_id_animal_shelter.txt"
-            event_id_file = "event_id_animal_shelter.txt"
+        if form_key == ANIMAL_SHELTER:
+            name = "animal_shelter"
         else:
-            form_id_file = f"form_id_{regular_form_counter}.txt"
-            event_id_file = f"event_id_{regular_form_counter}.txt"
+            name = str(regular_form_counter)
             regular_form_counter += 1
 
-        form_url = create_or_update_form(form_title, all_questions, form_id_file)
-
         start_date = datetime.now(warsaw_tz) + timedelta(days=random.randint(7, 30))
         end_date = start_date + timedelta(days=random.randint(60, 120))
 
-        description = (
-            f"To jest formularz aplikacyjny na: {form_title}. "
-            f"{fake.paragraph(nb_sentences=2)}"
+        specs.append(
+            {
+                "title": form_title,
+                "questions": BASE_QUESTIONS + form_details["questions"],
+                "name": name,
+                "description": (
+                    f"To jest formularz aplikacyjny na: {form_title}. "
+                    f"{fake.paragraph(nb_sentences=2)}"
+                ),
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+            }
         )
+    return specs
+
+
+def provision_form(
+    spec: dict[str, Any], state: StateStore, executor: RequestExecutor | None = None
+) -> dict[str, Any]:
+    """Creates or updates the form of one spec and returns its forms.jsonl row."""
+    form_url = create_or_update_form(
+        spec["title"], spec["questions"], spec["name"], state, executor
+    )
+    return {
+        "url": form_url,
+        "title": spec["title"],
+        "description": spec["description"],
+        "start_date": spec["start_date"],
+        "end_date": spec["end_date"],
+    }
 
-        form_data = {
-            "url": form_url,
-            "title": form_title,
-            "description": description,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-        }
-
-        jsonl.add(form_data, output_file)
-        print(f"Appended data for '{form_title}' to {output_file}")
 
-        event_id = create_or_update_event(
-            calendar_service, CALENDAR_ID, form_data, event_id_file
+def _provision_events(
+    calendar_service,
+    ready: list[tuple[dict[str, Any], dict[str, Any]]],
+    state: StateStore,
+    executor: RequestExecutor,
+    attendee_email: str | None,
+) -> None:
+    event_ids = create_or_update_events(
+        calendar_service,
+        CALENDAR_ID,
+        [(form_data, spec["name"]) for spec, form_data in ready],
+        state,
+        executor,
+    )
+    if attendee_email:
+        add_attendees(
+            calendar_service,
+            CALENDAR_ID,
+            [event_id for event_id in event_ids if event_id],
+            attendee_email,
+            executor,
         )
-        if event_id:
-            created_event_ids.append(event_id)
 
-    # Add attendee to all created events
-    attendee_email = "enter@example.com"
-    print(f"\nAdding {attendee_email} to all created events...")
-    for event_id in created_event_ids:
-        if not event_id:
-            continue
+
+def provision(
+    specs: list[dict[str, Any]],
+    output_file: str = "forms.jsonl",
+    state_db: str = STATE_DB,
+    concurrency: int = PROVISION_CONCURRENCY,
+    forms_qps: float = FORMS_QPS,
+    calendar_qps: float = CALENDAR_QPS,
+    attendee_email: str | None = "enter@example.com",
+    legacy_dir: str = ".",
+) -> list[dict[str, Any]]:
+    """
+    Provisions forms and their events.
+
+    Forms are created on a thread pool with up to `concurrency` in flight,
+    while a RequestExecutor shared by all workers keeps the Forms and
+    Calendar request rates within quota and retries throttled requests.
+    The row of every form is appended to `output_file` as soon as the form
+    is done; finished forms are then grouped into batches of
+    CALENDAR_BATCH_SIZE whose events and attendees are sent through the
+    Calendar batch endpoint. A failing form or batch is logged and skipped.
+    Form and event ids are kept in the state store at `state_db`; an empty
+    store first imports the old id files found in `legacy_dir`.
+    """
+    # Run the (possibly interactive) OAuth flow once, before the workers start
+    get_factory().credentials()
+    api_executor = RequestExecutor({"forms": forms_qps, "calendar": calendar_qps})
+    calendar_service = get_service("calendar", "v3")
+    state = StateStore(state_db)
+    if not state.all():
+        state.import_legacy_files(legacy_dir)
+
+    provisioned = []
+    ready = []
+
+    def flush_ready():
         try:
-            event = (
-                calendar_service.events()
-                .get(calendarId=CALENDAR_ID, eventId=event_id)
-                .execute()
+            _provision_events(
+                calendar_service, ready, state, api_executor, attendee_email
             )
-            attendees = event.get("attendees", [])
-            # Check if attendee already exists
-            if not any(att["email"] == attendee_email for att in attendees):
-                attendees.append({"email": attendee_email})
-                body = {"attendees": attendees}
-                calendar_service.events().patch(
-                    calendarId=CALENDAR_ID,
-                    eventId=event_id,
-                    body=body,
-                    sendUpdates="all",
-                ).execute()
-                print(f"  - Added attendee to event {event_id}")
-            else:
-                print(f"  - Attendee already exists in event {event_id}")
-        except HttpError as e:
-            print(f"  - Failed to add attendee to event {event_id}: {e}")
+        except Exception as e:
+            titles = ", ".join(f"'{spec['title']}'" for spec, _ in ready)
+            print(f"Failed to provision events for {titles}: {e}")
+        ready.clear()
+
+    with (
+        jsonl.JsonlWriter(output_file, mode="w", index_key="url") as forms_writer,
+        ThreadPoolExecutor(max_workers=concurrency) as executor,
+    ):
+        futures = {
+            executor.submit(provision_form, spec, state, api_executor): spec
+            for spec in specs
+        }
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                form_data = future.result()
+            except Exception as e:
+                print(f"Failed to provision '{spec['title']}': {e}")
+                continue
+            forms_writer.write(form_data)
+            provisioned.append(form_data)
+            print(f"Appended data for '{spec['title']}' to {output_file}")
+            ready.append((spec, form_data))
+            if len(ready) >= CALENDAR_BATCH_SIZE:
+                flush_ready()
+        if ready:
+            flush_ready()
+    state.close()
+    for api, stats in api_executor.stats().items():
+        print(
+            f"{api}: {stats['requests']} requests, {stats['retries']} retries "
+            f"({stats['throttled']} throttled), {stats['failed']} failed"
+        )
+    return provisioned
+
+
+if __name__ == "__main__":
+    provision(build_form_specs())
@@ -0,0 +1,622 @@
+"""
+Local fake of the Google Forms and Calendar REST APIs.
+
+Implements the subset of endpoints this project uses, with configurable
+latency, error injection and per-API quotas, so provisioning and the form
+watcher can be exercised and benchmarked without Google accounts or network:
+
+    python main.py fake-google --port 8085 --latency 0.05 --forms-qps 5
+    GOOGLE_API_ROOT=http://127.0.0.1:8085/ python main.py provision
+
+With GOOGLE_API_ROOT set, google_clients builds its clients against the
+fake and sends no credentials. In-process use:
+
+    with FakeGoogleServer(FakeGoogle(latency=0.01)) as server:
+        factory = ClientFactory(api_root=server.url)
+
+Forms: create, get, batchUpdate, setPublishSettings, responses.get/list and
+watches. Calendar: events insert/get/update/patch/delete. Both APIs accept
+multipart batch requests, whose parts count against the quota one by one.
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser, Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ratelimit import TokenBucket
+from request_executor import parse_time
+
+_STATUS_NAMES = {
+    400: "INVALID_ARGUMENT",
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+_REASONS = {
+    400: "badRequest",
+    404: "notFound",
+    429: "rateLimitExceeded",
+    500: "backendError",
+    503: "backendError",
+}
+
+_FORM = re.compile(r"^/v1/forms/([^/:]+)$")
+_FORM_ACTION = re.compile(r"^/v1/forms/([^/:]+):(batchUpdate|setPublishSettings)$")
+_RESPONSES = re.compile(r"^/v1/forms/([^/:]+)/responses(?:/([^/:]+))?$")
+_WATCHES = re.compile(r"^/v1/forms/([^/:]+)/watches(?:/([^/:]+))?(:renew)?$")
+_EVENTS = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+_FILTER = re.compile(r"^\s*timestamp\s*(>=|>)\s*(\S+)\s*$")
+
+
+class ApiError(Exception):
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        reason: str | None = None,
+        retry_after: int | None = None,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.reason = reason or _REASONS.get(status, "error")
+        self.retry_after = retry_after
+
+    def body(self) -> dict[str, Any]:
+        return {
+            "error": {
+                "code": self.status,
+                "message": self.message,
+                "status": _STATUS_NAMES.get(self.status, "UNKNOWN"),
+                "errors": [
+                    {"domain": "global", "reason": self.reason, "message": self.message}
+                ],
+            }
+        }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds").replace(
+        "+00:00", "Z"
+    )
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+class FakeGoogle:
+    """
+    In-memory state and request handling of the fake APIs.
+
+    Args:
+        latency (float): Seconds added to every HTTP request.
+        jitter (float): Extra random latency, uniform in [0, jitter].
+        error_rate (float): Fraction of API calls failing with `error_status`.
+        error_status (int): Status of injected errors (default 503).
+        quotas (dict[str, float] | None): Requests per second allowed per API
+            ("forms", "calendar"); calls over quota get 429 with Retry-After.
+        seed (int | None): Seed for latency and error injection.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        quotas: dict[str, float] | None = None,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.quotas = {api: TokenBucket(qps) for api, qps in (quotas or {}).items() if qps}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.forms: dict[str, dict[str, Any]] = {}
+        self.responses: dict[str, list[dict[str, Any]]] = {}
+        self.watches: dict[str, dict[str, dict[str, Any]]] = {}
+        self.events: dict[tuple[str, str], dict[str, Any]] = {}
+        self._stats: dict[str, int] = {}
+
+    # Accounting and injected failures
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def stats(self) -> dict[str, int]:
+        """Returns request counters: per API, per status and batch totals."""
+        with self._lock:
+            return dict(self._stats)
+
+    def delay(self) -> None:
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def _admit(self, api: str) -> None:
+        self._count(f"{api}.requests")
+        bucket = self.quotas.get(api)
+        if bucket is not None:
+            wait = bucket.try_acquire()
+            if wait:
+                raise ApiError(
+                    429, f"Quota exceeded for {api}.", retry_after=math.ceil(wait)
+                )
+        with self._lock:
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if failed:
+            raise ApiError(self.error_status, "Injected failure.")
+
+    # Dispatch
+
+    def handle(
+        self, method: str, path: str, query: dict[str, str], body: Any
+    ) -> tuple[int, dict[str, str], Any]:
+        """Handles one API call and returns (status, headers, JSON body)."""
+        headers = {}
+        try:
+            status, payload = self._route(method, path, query, body)
+        except ApiError as e:
+            status, payload = e.status, e.body()
+            if e.retry_after is not None:
+                headers["Retry-After"] = str(e.retry_after)
+        self._count(f"status.{status}")
+        return status, headers, payload
+
+    def _route(self, method: str, path: str, query: dict[str, str], body: Any):
+        path = unquote(path)
+        if path == "/v1/forms" and method == "POST":
+            self._admit("forms")
+            return 200, self.create_form(body or {})
+        if path.startswith("/v1/forms/"):
+            self._admit("forms")
+            if m := _FORM.match(path):
+                if method == "GET":
+                    return 200, self._form(m[1])
+            elif m := _FORM_ACTION.match(path):
+                if method == "POST" and m[2] == "batchUpdate":
+                    return 200, self.batch_update(m[1], body or {})
+                if method == "POST":
+                    return 200, self.set_publish_settings(m[1], body or {})
+            elif m := _RESPONSES.match(path):
+                if method == "GET":
+                    return 200, self.list_responses(m[1], m[2], query)
+            elif m := _WATCHES.match(path):
+                return 200, self.handle_watch(method, m[1], m[2], m[3], body or {})
+        if m := _EVENTS.match(path):
+            self._admit("calendar")
+            return self.handle_event(method, m[1], m[2], body or {})
+        raise ApiError(404, f"No fake endpoint for {method} {path}.")
+
+    # Forms
+
+    def _form(self, form_id: str) -> dict[str, Any]:
+        with self._lock:
+            if form_id not in self.forms:
+                raise ApiError(404, f"Requested entity was not found: {form_id}.")
+            return json.loads(json.dumps(self.forms[form_id]))
+
+    def create_form(self, body: dict[str, Any]) -> dict[str, Any]:
+        form_id = _new_id()
+        info = dict(body.get("info", {}))
+        info.setdefault("title", "")
+        info.setdefault("documentTitle", info["title"])
+        form = {
+            "formId": form_id,
+            "info": info,
+            "revisionId": "00000001",
+            "responderUri": f"https://docs.google.com/forms/d/e/{form_id}/viewform",
+            "items": [],
+            "publishSettings": {
+                "publishState": {"isPublished": True, "isAcceptingResponses": True}
+            },
+        }
+        with self._lock:
+            self.forms[form_id] = form
+            self.responses[form_id] = []
+            self.watches[form_id] = {}
+        return json.loads(json.dumps(form))
+
+    def batch_update(self, form_id: str, body: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            if form_id not in self.forms:
+                raise ApiError(404, f"Requested entity was not found: {form_id}.")
+            form = self.forms[form_id]
+            required = body.get("writeControl", {}).get("requiredRevisionId")
+            if required and required != form["revisionId"]:
+                raise ApiError(400, "The revision ID is stale.", "failedPrecondition")
+
+            # Applied to a copy, so an invalid request leaves the form unchanged
+            items = json.loads(json.dumps(form["items"]))
+            info = dict(form["info"])
+            replies = []
+            for request in body.get("requests", []):
+                (kind, spec), = request.items()
+                replies.append(self._apply(kind, spec, items, info))
+            form["items"] = items
+            form["info"] = info
+            form["revisionId"] = f"{int(form['revisionId'], 16) + 1:08x}"
+            result = {
+                "replies": replies,
+                "writeControl": {"requiredRevisionId": form["revisionId"]},
+            }
+            if body.get("includeFormInResponse"):
+                result["form"] = json.loads(json.dumps(form))
+            return result
+
+    @staticmethod
+    def _index(location: dict[str, Any], size: int) -> int:
+        index = location.get("index", 0)
+        if not 0 <= index < size:
+            raise ApiError(400, f"Index {index} is out of range.")
+        return index
+
+    def _apply(self, kind: str, spec: dict[str, Any], items: list, info: dict) -> dict:
+        if kind == "createItem":
+            item = dict(spec["item"], itemId=_new_id()[:8])
+            question = item.get("questionItem", {}).get("question")
+            reply = {"itemId": item["itemId"]}
+            if question is not None:
+                question["questionId"] = _new_id()[:8]
+                reply["questionId"] = [question["questionId"]]
+            index = spec.get("location", {}).get("index", len(items))
+            if not 0 <= index <= len(items):
+                raise ApiError(400, f"Index {index} is out of range.")
+            items.insert(index, item)
+            return {"createItem": reply}
+        if kind == "updateItem":
+            index = self._index(spec["location"], len(items))
+            item = dict(spec["item"], itemId=items[index]["itemId"])
+            question = item.get("questionItem", {}).get("question")
+            if question is not None and "questionId" not in question:
+                old = items[index].get("questionItem", {}).get("question", {})
+                question["questionId"] = old.get("questionId", _new_id()[:8])
+            items[index] = item
+            return {}
+        if kind == "moveItem":
+            original = self._index(spec["originalLocation"], len(items))
+            new = self._index(spec["newLocation"], len(items))
+            items.insert(new, items.pop(original))
+            return {}
+        if kind == "deleteItem":
+            items.pop(self._index(spec["location"], len(items)))
+            return {}
+        if kind == "updateFormInfo":
+            info.update(spec.get("info", {}))
+            return {}
+        raise ApiError(400, f"Unsupported request: {kind}.")
+
+    def set_publish_settings(self, form_id: str, body: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            if form_id not in self.forms:
+                raise ApiError(404, f"Requested entity was not found: {form_id}.")
+            self.forms[form_id]["publishSettings"] = body.get("publishSettings", {})
+            return {"formId": form_id, "publishSettings": body.get("publishSettings", {})}
+
+    def submit_response(
+        self, form_id: str, answers: dict[str, str] | None = None
+    ) -> dict[str, Any]:
+        """
+        Adds a response to a form, as if a candidate had submitted it.
+
+        Args:
+            form_id (str): The form to answer.
+            answers (dict[str, str] | None): Answer per question title; random
+                                             text for unanswered questions.
+        """
+        form = self._form(form_id)
+        answers = answers or {}
+        now = _now()
+        response = {
+            "formId": form_id,
+            "responseId": _new_id(),
+            "createTime": now,
+            "lastSubmittedTime": now,
+            "answers": {},
+        }
+        for item in form["items"]:
+            question = item.get("questionItem", {}).get("question")
+            if question is None:
+                continue
+            value = answers.get(item.get("title"))
+            if value is None:
+                value = f"Odpowiedź {self._random.randint(1, 10**6)}"
+            response["answers"][question["questionId"]] = {
+                "questionId": question["questionId"],
+                "textAnswers": {"answers": [{"value": value}]},
+            }
+        with self._lock:
+            self.responses[form_id].append(response)
+        return response
+
+    def list_responses(
+        self, form_id: str, response_id: str | None, query: dict[str, str]
+    ) -> dict[str, Any]:
+        self._form(form_id)
+        with self._lock:
+            responses = list(self.responses[form_id])
+        if response_id is not None:
+            for response in responses:
+                if response["responseId"] == response_id:
+                    return response
+            raise ApiError(404, f"Response {response_id} was not found.")
+
+        if query.get("filter"):
+            m = _FILTER.match(query["filter"])
+            if not m:
+                raise ApiError(400, f"Invalid filter: {query['filter']}.")
+            since = parse_time(m[2])
+            inclusive = m[1] == ">="
+            responses = [
+                r
+                for r in responses
+                if parse_time(r["lastSubmittedTime"]) > since
+                or (inclusive and parse_time(r["lastSubmittedTime"]) == since)
+            ]
+        page_size = int(query.get("pageSize") or 5000)
+        start = int(query.get("pageToken") or 0)
+        result: dict[str, Any] = {}
+        if responses[start : start + page_size]:
+            result["responses"] = responses[start : start + page_size]
+        if start + page_size < len(responses):
+            result["nextPageToken"] = str(start + page_size)
+        return result
+
+    def handle_watch(
+        self,
+        method: str,
+        form_id: str,
+        watch_id: str | None,
+        renew: str | None,
+        body: dict[str, Any],
+    ) -> dict[str, Any]:
+        self._form(form_id)
+        with self._lock:
+            watches = self.watches[form_id]
+            if watch_id is None and method == "GET":
+                return {"watches": list(watches.values())}
+            if watch_id is None and method == "POST":
+                watch = dict(
+                    body.get("watch", {}),
+                    id=body.get("watchId") or _new_id(),
+                    createTime=_now(),
+                    state="ACTIVE",
+                )
+                watches[watch["id"]] = watch
+            elif watch_id not in watches:
+                raise ApiError(404, f"Watch {watch_id} was not found.")
+            elif method == "DELETE":
+                del watches[watch_id]
+                return {}
+            elif renew and method == "POST":
+                watch = watches[watch_id]
+                watch["state"] = "ACTIVE"
+            else:
+                raise ApiError(404, f"No fake endpoint for {method} watch.")
+            expire = datetime.now(timezone.utc) + timedelta(days=7)
+            watch["expireTime"] = expire.isoformat().replace("+00:00", "Z")
+            return dict(watch)
+
+    # Calendar
+
+    def handle_event(
+        self, method: str, calendar_id: str, event_id: str | None, body: dict[str, Any]
+    ) -> tuple[int, dict[str, Any]]:
+        with self._lock:
+            if event_id is None:
+                if method != "POST":
+                    raise ApiError(404, f"No fake endpoint for {method} events.")
+                event_id = _new_id()
+                now = _now()
+                event = dict(
+                    body,
+                    id=event_id,
+                    kind="calendar#event",
+                    status="confirmed",
+                    created=now,
+                    updated=now,
+                    htmlLink=f"https://www.google.com/calendar/event?eid={event_id}",
+                )
+                self.events[calendar_id, event_id] = event
+                return 200, dict(event)
+
+            key = (calendar_id, event_id)
+            if key not in self.events:
+                raise ApiError(404, "Not Found")
+            event = self.events[key]
+            if method == "GET":
+                return 200, dict(event)
+            if method == "DELETE":
+                del self.events[key]
+                return 204, None
+            if method == "PUT":
+                fixed = {k: event[k] for k in ("id", "kind", "created", "htmlLink")}
+                event = dict(body, **fixed, status="confirmed")
+            elif method == "PATCH":
+                event = dict(event, **body)
+            else:
+                raise ApiError(404, f"No fake endpoint for {method} event.")
+            event["updated"] = _now()
+            self.events[key] = event
+            return 200, dict(event)
+
+
+def _dump(payload: Any) -> bytes:
+    return b"" if payload is None else json.dumps(payload).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, headers: dict[str, str], content: bytes) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _dispatch(self) -> None:
+        fake = self.server.fake
+        url = urlsplit(self.path)
+        body = self._body()
+        fake.delay()
+
+        if url.path == "/_fake/stats":
+            self._send(200, {"Content-Type": "application/json"}, _dump(fake.stats()))
+            return
+        if m := re.match(r"^/_fake/forms/([^/]+)/responses$", url.path):
+            try:
+                response = fake.submit_response(m[1], json.loads(body or b"{}"))
+                self._send(200, {"Content-Type": "application/json"}, _dump(response))
+            except ApiError as e:
+                self._send(e.status, {"Content-Type": "application/json"}, _dump(e.body()))
+            return
+        if url.path == "/batch" or url.path.startswith("/batch/"):
+            self._batch(body)
+            return
+
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        status, headers, payload = fake.handle(
+            self.command, url.path, query, json.loads(body) if body else None
+        )
+        headers.setdefault("Content-Type", "application/json; charset=UTF-8")
+        self._send(status, headers, _dump(payload))
+
+    def _batch(self, body: bytes) -> None:
+        fake = self.server.fake
+        fake._count("batches")
+        content_type = self.headers.get("Content-Type", "")
+        message = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+        )
+        if not message.is_multipart():
+            self._send(400, {"Content-Type": "text/plain"}, b"Expected multipart/mixed.")
+            return
+
+        boundary = f"batch_{_new_id()}"
+        out = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.strip().split(" ", 2)
+            inner = Parser().parsestr(rest)
+            inner_body = inner.get_payload()
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, headers, payload = fake.handle(
+                method, url.path, query, json.loads(inner_body) if inner_body.strip() else None
+            )
+            fake._count("batch_parts")
+            reason = self.responses.get(status, ("",))[0]
+            lines = [
+                f"HTTP/1.1 {status} {reason}",
+                "Content-Type: application/json; charset=UTF-8",
+                *(f"{name}: {value}" for name, value in headers.items()),
+                "",
+                _dump(payload).decode("utf-8"),
+            ]
+            # Long Content-IDs arrive folded over several lines
+            content_id = " ".join(part.get("Content-ID", "<>").split())
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n" + "\r\n".join(lines)
+            )
+        content = "\r\n".join(out) + f"\r\n--{boundary}--\r\n"
+        self._send(
+            200,
+            {"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            content.encode("utf-8"),
+        )
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: FakeGoogle
+
+
+class FakeGoogleServer:
+    """Serves a FakeGoogle over HTTP from a background thread."""
+
+    def __init__(self, fake: FakeGoogle | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.fake = fake or FakeGoogle()
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self.fake
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Root URL to pass as GOOGLE_API_ROOT, e.g. "http://127.0.0.1:8085/"."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FakeGoogleServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGoogleServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+def _submit_responses(fake: FakeGoogle, rate: float) -> None:
+    """Submits `rate` responses per second to random forms, forever."""
+    while True:
+        time.sleep(1 / rate)
+        with fake._lock:
+            form_ids = list(fake.forms)
+        if form_ids:
+            fake.submit_response(random.choice(form_ids))
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8085,
+    response_rate: float = 0.0,
+    **options: Any,
+) -> None:
+    """Runs the fake until interrupted; `options` are passed to FakeGoogle."""
+    server = FakeGoogleServer(FakeGoogle(**options), host, port)
+    if response_rate:
+        threading.Thread(
+            target=_submit_responses, args=(server.fake, response_rate), daemon=True
+        ).start()
+    print(f"Fake Google APIs on {server.url} (set GOOGLE_API_ROOT={server.url})")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
@@ -0,0 +1,507 @@
+"""
+Fetches new form responses into data/ as one JSON file per response.
+
+Two modes are available:
+
+* pubsub (default): registers a Forms API watch for RESPONSES events on every
+  form, publishing to a Pub/Sub topic, and fetches only the forms named in the
+  notifications. The Forms service account
+  (forms-notifications@system.gserviceaccount.com) must be allowed to publish
+  to the topic. Setting PUBSUB_EMULATOR_HOST points the subscriber at a local
+  Pub/Sub emulator.
+* poll: checks every form every `interval` seconds.
+* async: polls thousands of forms concurrently from one event loop, with
+  adaptive per-form intervals (see AsyncFormPoller).
+
+    python main.py watch --topic projects/p/topics/forms --subscription projects/p/subscriptions/forms-watcher
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from googleapiclient.errors import HttpError
+
+import jsonl
+from google_clients import get_service
+from request_executor import RequestExecutor, get_executor, parse_time
+from state_store import STATE_DB, FormState, StateStore
+
+FORMS_WATCH_TOPIC = os.environ.get("FORMS_WATCH_TOPIC")
+FORMS_WATCH_SUBSCRIPTION = os.environ.get("FORMS_WATCH_SUBSCRIPTION")
+
+# Watches expire seven days after creation; renew them a day ahead.
+WATCH_RENEW_MARGIN = timedelta(days=1)
+WATCH_CHECK_INTERVAL = 3600
+
+# Notifications arriving within this window are coalesced into one fetch.
+COALESCE_SECONDS = 1.0
+
+POLL_INTERVAL = 600
+
+# Async poller: concurrent requests, request rate and per-form interval bounds.
+# The default rate stays below the Forms API read quota of 975 requests per
+# minute per user; raise FORMS_READ_QPS if the project has a higher quota.
+ASYNC_CONCURRENCY = int(os.environ.get("WATCH_CONCURRENCY", "64"))
+FORMS_READ_QPS = float(os.environ.get("FORMS_READ_QPS", "15"))
+MIN_POLL_INTERVAL = 15.0
+MAX_POLL_INTERVAL = 900.0
+RELOAD_INTERVAL = 60.0
+
+
+class PubSubSubscriber:
+    """Streaming-pull subscriber on a real (or emulated) Pub/Sub subscription."""
+
+    def __init__(self, subscription: str):
+        # Imported here so the poll mode never loads the gRPC stack
+        from google.cloud import pubsub_v1
+
+        self.subscription = subscription
+        self._client = pubsub_v1.SubscriberClient()
+        self._future = None
+
+    def subscribe(self, callback: Callable[[Any], None]) -> None:
+        self._future = self._client.subscribe(self.subscription, callback=callback)
+
+    def close(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+        self._client.close()
+
+
+class FakeMessage:
+    """Stand-in for a Pub/Sub message, recording whether it was acked."""
+
+    def __init__(self, attributes: dict[str, str]):
+        self.attributes = attributes
+        self.acked = False
+        self.nacked = False
+
+    def ack(self) -> None:
+        self.acked = True
+
+    def nack(self) -> None:
+        self.nacked = True
+
+
+class FakeSubscriber:
+    """
+    In-process subscriber for tests and local runs without Pub/Sub.
+
+    `publish` delivers a notification shaped like the ones Forms API watches
+    send, synchronously, to the subscribed callback.
+    """
+
+    def __init__(self):
+        self._callback = None
+        self.messages: list[FakeMessage] = []
+
+    def subscribe(self, callback: Callable[[Any], None]) -> None:
+        self._callback = callback
+
+    def publish(self, form_id: str, event_type: str = "RESPONSES") -> FakeMessage:
+        message = FakeMessage({"formId": form_id, "eventType": event_type})
+        self.messages.append(message)
+        if self._callback is not None:
+            self._callback(message)
+        return message
+
+    def close(self) -> None:
+        self._callback = None
+
+
+class FormWatcher:
+    """Keeps data/ up to date with the responses of all forms in the state store."""
+
+    def __init__(
+        self,
+        state: StateStore,
+        output_dir: str = "data",
+        executor: RequestExecutor | None = None,
+    ):
+        self.state = state
+        self.output_dir = output_dir
+        self.executor = executor or get_executor()
+        self._notifications: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        # Form id -> logical name, rebuilt by form_ids
+        self._names: dict[str, str] = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def form_ids(self) -> list[str]:
+        """Returns the ids of all forms, re-reading the store to pick up new ones."""
+        self.state.reload()
+        self._names = {
+            record.form_id: record.name for record in self.state.all().values() if record.form_id
+        }
+        return list(self._names)
+
+    def _record(self, form_id: str) -> FormState | None:
+        name = self._names.get(form_id)
+        if name is None:
+            # A form added to the store since the last form_ids call
+            self.form_ids()
+            name = self._names.get(form_id)
+        return self.state.get(name) if name else None
+
+    def _write_response(self, form_id: str, response: dict[str, Any]) -> None:
+        path = os.path.join(self.output_dir, f"{response['responseId']}.json")
+        # Written next to the target and renamed, so combine_data never sees
+        # a half-written *.json file
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(dict(response, formId=form_id), f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _iter_responses(self, form_id: str, watermark: str | None, executor: RequestExecutor):
+        """Lazily pages through the responses submitted at or after `watermark`."""
+        responses = get_service("forms", "v1").forms().responses()
+        request_filter = f"timestamp >= {watermark}" if watermark else None
+        page_token = None
+        while True:
+            result = executor.execute(
+                responses.list(formId=form_id, filter=request_filter, pageToken=page_token)
+            )
+            yield from result.get("responses", [])
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+
+    def fetch_responses(self, form_id: str, executor: RequestExecutor | None = None) -> int:
+        """
+        Downloads the responses of one form submitted since the last fetch.
+
+        The form's high-water mark (the newest lastSubmittedTime seen) is kept
+        in the state store and passed to the API as a timestamp filter, so
+        each call transfers only the delta. The filter is inclusive so that
+        responses sharing the boundary timestamp are never missed; the ones
+        already saved at the boundary are skipped. The mark only advances
+        after all pages were saved.
+
+        Args:
+            form_id (str): The form to fetch.
+            executor (RequestExecutor | None): Executor for the API requests;
+                                               defaults to the watcher's.
+
+        Returns:
+            int: The number of responses written.
+        """
+        record = self._record(form_id)
+        watermark = record.responses_watermark if record else None
+        newest = watermark
+        new = 0
+        for response in self._iter_responses(form_id, watermark, executor or self.executor):
+            submitted = response.get("lastSubmittedTime")
+            path = os.path.join(self.output_dir, f"{response['responseId']}.json")
+            if submitted is not None and submitted == watermark and os.path.exists(path):
+                continue
+            self._write_response(form_id, response)
+            new += 1
+            if submitted is not None and (
+                newest is None or parse_time(submitted) > parse_time(newest)
+            ):
+                newest = submitted
+
+        if record is not None and newest != watermark:
+            self.state.update(record.name, responses_watermark=newest)
+        if new:
+            print(f"Saved {new} new responses of form {form_id}")
+        return new
+
+    def ensure_watches(self, topic: str) -> None:
+        """Creates or renews a RESPONSES watch publishing to `topic` on every form."""
+        watches = get_service("forms", "v1").forms().watches()
+        now = datetime.now(timezone.utc)
+        for form_id in self.form_ids():
+            try:
+                existing = [
+                    watch
+                    for watch in self.executor.execute(
+                        watches.list(formId=form_id)
+                    ).get("watches", [])
+                    if watch.get("eventType") == "RESPONSES"
+                    and watch.get("target", {}).get("topic", {}).get("topicName") == topic
+                ]
+                if not existing:
+                    body = {
+                        "watch": {
+                            "target": {"topic": {"topicName": topic}},
+                            "eventType": "RESPONSES",
+                        }
+                    }
+                    self.executor.execute(watches.create(formId=form_id, body=body))
+                    print(f"Watching form {form_id}")
+                    continue
+                watch = existing[0]
+                if (
+                    watch.get("state") != "ACTIVE"
+                    or parse_time(watch["expireTime"]) - now < WATCH_RENEW_MARGIN
+                ):
+                    self.executor.execute(
+                        watches.renew(formId=form_id, watchId=watch["id"], body={})
+                    )
+                    print(f"Renewed watch on form {form_id}")
+            except Exception as e:
+                print(f"Failed to watch form {form_id}: {e}")
+
+    def _on_message(self, message) -> None:
+        attributes = message.attributes
+        if attributes.get("eventType") != "RESPONSES" or "formId" not in attributes:
+            message.ack()
+            return
+        self._notifications.put((attributes["formId"], message))
+
+    def process_notifications(self, timeout: float | None = None) -> int:
+        """
+        Handles queued notifications once, fetching each changed form once.
+
+        Waits up to `timeout` seconds for the first notification, then
+        collects everything arriving within COALESCE_SECONDS. Messages are
+        acked after their form was fetched and nacked (redelivered) on error.
+
+        Returns:
+            int: The number of forms fetched.
+        """
+        try:
+            first = self._notifications.get(timeout=timeout)
+        except queue.Empty:
+            return 0
+        pending: dict[str, list[Any]] = {first[0]: [first[1]]}
+        deadline = time.monotonic() + COALESCE_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                form_id, message = self._notifications.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.setdefault(form_id, []).append(message)
+
+        for form_id, messages in pending.items():
+            try:
+                self.fetch_responses(form_id)
+            except Exception as e:
+                print(f"Failed to fetch responses of form {form_id}: {e}")
+                for message in messages:
+                    message.nack()
+                continue
+            for message in messages:
+                message.ack()
+        return len(pending)
+
+    def run_pubsub(self, subscriber, topic: str) -> None:
+        """Fetches forms as their notifications arrive, until `stop` is called."""
+        self.ensure_watches(topic)
+        # Catch up on responses submitted while the watcher was not running
+        for form_id in self.form_ids():
+            try:
+                self.fetch_responses(form_id)
+            except Exception as e:
+                print(f"Failed to fetch responses of form {form_id}: {e}")
+
+        subscriber.subscribe(self._on_message)
+        next_check = time.monotonic() + WATCH_CHECK_INTERVAL
+        try:
+            while not self._stop.is_set():
+                self.process_notifications(timeout=1.0)
+                if time.monotonic() >= next_check:
+                    self.ensure_watches(topic)
+                    next_check = time.monotonic() + WATCH_CHECK_INTERVAL
+        finally:
+            subscriber.close()
+
+    def run_poll(self, interval: float = POLL_INTERVAL) -> None:
+        """Fetches every form every `interval` seconds, until `stop` is called."""
+        while not self._stop.is_set():
+            for form_id in self.form_ids():
+                try:
+                    self.fetch_responses(form_id)
+                except Exception as e:
+                    print(f"Failed to fetch responses of form {form_id}: {e}")
+            self._stop.wait(interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class AsyncFormPoller:
+    """
+    Polls many forms concurrently on one asyncio event loop.
+
+    Every form has its own polling interval: it halves (down to
+    MIN_POLL_INTERVAL) whenever a poll finds new responses and grows by half
+    (up to MAX_POLL_INTERVAL) when it finds none, so busy forms are checked
+    often and quiet ones rarely. Due times get +-10% jitter to spread load.
+    At most `concurrency` polls run at once and the poller's own executor
+    keeps its request rate within `qps`. Forms whose calendar event (the end_date in
+    forms.jsonl) is over, that stopped accepting responses or that were
+    deleted are retired and never polled again.
+    """
+
+    def __init__(
+        self,
+        watcher: FormWatcher,
+        forms_file: str = "forms.jsonl",
+        concurrency: int = ASYNC_CONCURRENCY,
+        qps: float = FORMS_READ_QPS,
+    ):
+        self.watcher = watcher
+        self.forms_file = forms_file
+        self.concurrency = concurrency
+        # Throttling happens on the worker threads, in an executor of its own
+        # so that the rate does not apply to other users of the process-wide one
+        self.executor = RequestExecutor({"forms": qps})
+        self.intervals: dict[str, float] = {}
+        self.retired: set[str] = set()
+        self._schedule: list[tuple[float, str]] = []
+        self._end_dates: dict[str, datetime] = {}
+        self._stop = asyncio.Event()
+
+    def _jitter(self, interval: float) -> float:
+        return interval * random.uniform(0.9, 1.1)
+
+    def _load_end_dates(self) -> None:
+        """Maps responder URIs to the end of their calendar event."""
+        if not os.path.exists(self.forms_file):
+            return
+        self._end_dates = {
+            row["url"]: parse_time(row["end_date"])
+            for row in jsonl.stream_load(self.forms_file)
+            if row.get("url") and row.get("end_date")
+        }
+
+    def _expired(self, form_id: str) -> bool:
+        record = self.watcher._record(form_id)
+        end = self._end_dates.get(record.responder_uri) if record else None
+        return end is not None and end < datetime.now(timezone.utc)
+
+    def _refresh_forms(self) -> None:
+        """Schedules forms that appeared in the state store since the last call."""
+        self._load_end_dates()
+        now = time.monotonic()
+        for form_id in self.watcher.form_ids():
+            if form_id in self.intervals or form_id in self.retired:
+                continue
+            self.intervals[form_id] = MIN_POLL_INTERVAL
+            # Spread the first polls over one interval instead of a burst
+            heapq.heappush(
+                self._schedule, (now + random.uniform(0, MIN_POLL_INTERVAL), form_id)
+            )
+
+    def _retire(self, form_id: str, reason: str) -> None:
+        self.retired.add(form_id)
+        self.intervals.pop(form_id, None)
+        print(f"Retired form {form_id}: {reason}")
+
+    def _accepting_responses(self, form_id: str) -> bool:
+        form = self.executor.execute(
+            get_service("forms", "v1").forms().get(formId=form_id)
+        )
+        state = form.get("publishSettings", {}).get("publishState", {})
+        return state.get("isAcceptingResponses", True)
+
+    async def _poll(self, form_id: str, slots: asyncio.Semaphore) -> None:
+        new = 0
+        try:
+            if self._expired(form_id):
+                self._retire(form_id, "its event has ended")
+                return
+
+            new = await asyncio.to_thread(self.watcher.fetch_responses, form_id, self.executor)
+            if not new and self.intervals[form_id] >= MAX_POLL_INTERVAL:
+                # Idle for long; check whether the form was closed
+                if not await asyncio.to_thread(self._accepting_responses, form_id):
+                    self._retire(form_id, "it no longer accepts responses")
+        except Exception as e:
+            if isinstance(e, HttpError) and e.resp.status == 404:
+                self._retire(form_id, "it was deleted")
+            else:
+                print(f"Failed to poll form {form_id}: {e}")
+        finally:
+            # Any other failure only backs off; the form is polled again later
+            if form_id not in self.retired:
+                self._reschedule(form_id, new)
+            slots.release()
+
+    def _reschedule(self, form_id: str, new: int) -> None:
+        interval = self.intervals.get(form_id, MIN_POLL_INTERVAL)
+        if new:
+            interval = max(MIN_POLL_INTERVAL, interval / 2)
+        else:
+            interval = min(MAX_POLL_INTERVAL, interval * 1.5)
+        self.intervals[form_id] = interval
+        heapq.heappush(self._schedule, (time.monotonic() + self._jitter(interval), form_id))
+
+    async def run(self) -> None:
+        """Polls forms as they become due, until `stop` is called."""
+        loop = asyncio.get_running_loop()
+        # Blocking API calls run on a pool sized to the concurrency limit
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        next_reload = 0.0
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_reload:
+                self._refresh_forms()
+                next_reload = now + RELOAD_INTERVAL
+
+            if not self._schedule or self._schedule[0][0] > now:
+                delay = self._schedule[0][0] - now if self._schedule else 1.0
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=min(delay, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, form_id = heapq.heappop(self._schedule)
+            if form_id in self.retired:
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(self._poll(form_id, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def watch(
+    mode: str = "pubsub",
+    topic: str | None = FORMS_WATCH_TOPIC,
+    subscription: str | None = FORMS_WATCH_SUBSCRIPTION,
+    output_dir: str = "data",
+    state_db: str = STATE_DB,
+    interval: float = POLL_INTERVAL,
+    forms_file: str = "forms.jsonl",
+    concurrency: int = ASYNC_CONCURRENCY,
+    qps: float = FORMS_READ_QPS,
+) -> None:
+    """Runs the watcher in the given mode until interrupted."""
+    watcher = FormWatcher(StateStore(state_db), output_dir)
+    try:
+        if mode == "poll":
+            watcher.run_poll(interval)
+        elif mode == "async":
+            asyncio.run(AsyncFormPoller(watcher, forms_file, concurrency, qps).run())
+        else:
+            if not topic or not subscription:
+                raise ValueError(
+                    "The pubsub mode needs a topic and a subscription "
+                    "(FORMS_WATCH_TOPIC / FORMS_WATCH_SUBSCRIPTION)."
+                )
+            watcher.run_pubsub(PubSubSubscriber(subscription), topic)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    watch()
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import threading
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httplib2
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build_from_document
+
+# A token.json granted fewer scopes than these is replaced by rerunning the
+# consent flow, so adding a scope here only asks for one more login.
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/forms.body",
+    "https://www.googleapis.com/auth/forms.responses.readonly",
+]
+
+cred_path = (
+    Path(os.getcwd()) / ".." / "client_secret.apps.googleusercontent.com.json"
+).resolve()
+
+TOKEN_PATH = "token.json"
+
+# Credentials are refreshed once they are this close to expiring.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+HTTP_TIMEOUT = 60
+
+# Root URL replacing https://*.googleapis.com/ in every client, e.g. that of
+# a local fake_google server. No credentials are sent when it is set.
+API_ROOT = os.environ.get("GOOGLE_API_ROOT")
+
+# Discovery documents shipped with the project, one `<api>.<version>.json`
+# per API, so building a client never has to fetch them over the network.
+DISCOVERY_DIR = Path(__file__).resolve().parent / "discovery"
+DISCOVERY_URLS = {
+    ("forms", "v1"): "https://forms.googleapis.com/$discovery/rest?version=v1",
+    ("calendar", "v3"): "https://www.googleapis.com/discovery/v1/apis/calendar/v3/rest",
+}
+
+_discovery_documents: dict[tuple[str, str], str] = {}
+_discovery_lock = threading.Lock()
+
+
+def load_discovery_document(api: str, version: str) -> str:
+    """Returns the local discovery document of an API, read once per process."""
+    with _discovery_lock:
+        if (api, version) not in _discovery_documents:
+            path = DISCOVERY_DIR / f"{api}.{version}.json"
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"No discovery document for {api} {version} in {DISCOVERY_DIR}; "
+                    "run `python google_clients.py refresh-discovery`."
+                )
+            _discovery_documents[api, version] = path.read_text(encoding="utf-8")
+        return _discovery_documents[api, version]
+
+
+def refresh_discovery_documents(apis=None) -> None:
+    """Downloads the current discovery documents into DISCOVERY_DIR."""
+    DISCOVERY_DIR.mkdir(exist_ok=True)
+    for api, version in apis or DISCOVERY_URLS:
+        url = DISCOVERY_URLS[api, version]
+        with urllib.request.urlopen(url, timeout=HTTP_TIMEOUT) as response:
+            document = response.read().decode("utf-8")
+        revision = json.loads(document)["revision"]
+
+        path = DISCOVERY_DIR / f"{api}.{version}.json"
+        old_revision = None
+        if path.exists():
+            old_revision = json.loads(path.read_text(encoding="utf-8"))["revision"]
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(document, encoding="utf-8")
+        os.replace(tmp_path, path)
+        with _discovery_lock:
+            _discovery_documents.pop((api, version), None)
+        print(f"{api} {version}: revision {old_revision} -> {revision}")
+
+
+def get_credentials(c_path: os.PathLike = cred_path, token_path: str = TOKEN_PATH):
+    """
+    Gets user credentials from a local file.
+
+    The consent flow is run again when the file is missing or was granted
+    fewer scopes than SCOPES, e.g. a token.json from before a scope was added.
+    """
+    creds = None
+    if os.path.exists(token_path):
+        # Loaded without SCOPES so that has_scopes checks the scopes actually granted
+        creds = Credentials.from_authorized_user_file(token_path)
+        if not creds.has_scopes(SCOPES):
+            print(f"{token_path} lacks some of the required scopes; asking for consent again.")
+            creds = None
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(c_path, SCOPES)
+            creds = flow.run_local_server(port=0)
+        with open(token_path, "w") as token:
+            token.write(creds.to_json())
+    return creds
+
+
+class ClientFactory:
+    """
+    Process-wide source of credentials and Google API service objects.
+
+    Credentials are loaded once and refreshed ahead of expiry under a lock,
+    so concurrent workers never race on token.json or refresh twice. Service
+    objects wrap an httplib2 connection, which is not thread-safe, so every
+    thread gets its own keep-alive transport and its own services built on
+    top of it; within a thread both are reused for every call. Clients are
+    built from the discovery documents in DISCOVERY_DIR, never fetched.
+    With `api_root` set, all clients (batch requests included) talk to that
+    server instead of Google, anonymously.
+
+    Usage:
+        forms = get_service("forms", "v1")
+        forms.forms().get(formId=form_id).execute()
+    """
+
+    def __init__(
+        self,
+        c_path: os.PathLike = cred_path,
+        token_path: str = TOKEN_PATH,
+        credentials=None,
+        api_root: str | None = API_ROOT,
+    ):
+        self.c_path = c_path
+        self.token_path = token_path
+        self.api_root = api_root
+        if api_root and credentials is None:
+            credentials = AnonymousCredentials()
+        self._creds = credentials
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def credentials(self) -> Credentials:
+        """Returns cached credentials, refreshing them if they expire soon."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = get_credentials(self.c_path, self.token_path)
+            elif self._expires_soon(self._creds) and self._creds.refresh_token:
+                self._creds.refresh(Request())
+                with open(self.token_path, "w") as token:
+                    token.write(self._creds.to_json())
+            return self._creds
+
+    @staticmethod
+    def _expires_soon(creds: Credentials) -> bool:
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = creds.expiry.replace(tzinfo=timezone.utc)
+        return expiry - datetime.now(timezone.utc) < REFRESH_MARGIN
+
+    def authorized_http(self) -> AuthorizedHttp:
+        """Returns this thread's authorized keep-alive HTTP transport."""
+        creds = self.credentials()
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            self._local.http = http
+            self._local.services = {}
+        return http
+
+    def service(self, api: str, version: str):
+        """Returns this thread's service object for an API, building it once."""
+        http = self.authorized_http()
+        services = self._local.services
+        if (api, version) not in services:
+            document = load_discovery_document(api, version)
+            if self.api_root:
+                # The batch endpoint is derived from rootUrl, so rewriting the
+                # document redirects batches too, unlike client_options
+                document = json.loads(document)
+                document["rootUrl"] = self.api_root
+                document["baseUrl"] = self.api_root + document["servicePath"]
+                document.pop("mtlsRootUrl", None)
+            services[api, version] = build_from_document(document, http=http)
+        return services[api, version]
+
+
+_factory = None
+_factory_lock = threading.Lock()
+
+
+def get_factory() -> ClientFactory:
+    """Returns the process-wide ClientFactory."""
+    global _factory
+    with _factory_lock:
+        if _factory is None:
+            _factory = ClientFactory()
+        return _factory
+
+
+def get_service(api: str, version: str):
+    """Shortcut for `get_factory().service(api, version)`."""
+    return get_factory().service(api, version)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google API client utilities.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "refresh-discovery", help="download the latest discovery documents"
+    )
+    args = parser.parse_args()
+    if args.command == "refresh-discovery":
+        refresh_discovery_documents()
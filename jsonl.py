@@ -1,40 +1,567 @@
 # jsonl.py
 
 import json
-from typing import List, Dict, Any, Union, Generator
+import mmap
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Dict, Any, Union, Generator, Optional, Tuple
 
-def dump(data: List[Dict[str, Any]], file_path: str, mode: str = 'w') -> None:
+# Suffix of the sidecar byte-offset index kept next to a JSONL file.
+INDEX_SUFFIX = '.idx'
+
+_MISSING = object()
+
+
+class _Index:
+    """In-memory view of a sidecar index: record offsets plus a key lookup."""
+
+    def __init__(self, key_field: Optional[str]):
+        self.key_field = key_field
+        self.entries: List[Tuple[int, int]] = []
+        self.keys: Dict[Any, int] = {}
+        self.idx_size = 0
+        self.idx_mtime = 0
+        # Key of the last record and data file mtime when it was last checked
+        self.last_key = None
+        self.data_mtime = None
+
+    @property
+    def end(self) -> int:
+        if not self.entries:
+            return 0
+        offset, length = self.entries[-1]
+        return offset + length
+
+    def insert(self, key: Any, offset: int, length: int) -> None:
+        if key is not None:
+            try:
+                self.keys[key] = len(self.entries)
+            except TypeError:
+                pass  # Unhashable keys (lists, dicts) are simply not indexed.
+        self.entries.append((offset, length))
+        self.last_key = key
+
+
+# Indexes already loaded by this process, keyed by absolute data file path.
+_INDEX_CACHE: Dict[str, _Index] = {}
+
+
+def _index_path(file_path: str) -> str:
+    return file_path + INDEX_SUFFIX
+
+
+def _encode(item: Dict[str, Any]) -> bytes:
+    return (json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _record_key(item: Dict[str, Any], key_field: Optional[str]) -> Any:
+    if key_field is None or not isinstance(item, dict):
+        return None
+    return item.get(key_field)
+
+
+def _index_lines(entries: List[Tuple[Any, int, int]]) -> bytes:
+    return b''.join(
+        (json.dumps(list(entry), ensure_ascii=False) + '\n').encode('utf-8')
+        for entry in entries
+    )
+
+
+def _read_index_header(idx_path: str) -> Optional[str]:
+    with open(idx_path, 'rb') as f:
+        return json.loads(f.readline()).get('key_field')
+
+
+def _index_tail_end(idx_path: str) -> int:
+    """Returns the data offset right after the last record in a sidecar index."""
+    with open(idx_path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        chunk = b''
+        # Read backwards until the chunk holds a newline before the last line;
+        # keys can be arbitrarily long strings.
+        while end > 0 and b'\n' not in chunk.rstrip(b'\n'):
+            start = max(0, end - 4096)
+            chunk = os.pread(f.fileno(), end - start, start) + chunk
+            end = start
+    last = chunk.rstrip(b'\n').rsplit(b'\n', 1)[-1]
+    entry = json.loads(last)
+    if isinstance(entry, dict):  # Only the header, no records yet.
+        return 0
+    return entry[1] + entry[2]
+
+
+def _write_index(file_path: str, key_field: Optional[str],
+                 entries: List[Tuple[Any, int, int]], mode: str) -> None:
+    """
+    Writes ('w') or extends ('a') the sidecar index of a JSONL file.
+
+    Appends are only recorded when the sidecar is in sync with the data file,
+    i.e. its last entry ends exactly where the new records start. Otherwise
+    the sidecar is left as is and the gap is indexed lazily on the next read.
+    """
+    idx_path = _index_path(file_path)
+    if mode == 'a':
+        if entries and _index_tail_end(idx_path) != entries[0][1]:
+            return
+        payload = _index_lines(entries)
+    else:
+        payload = (json.dumps({'key_field': key_field}) + '\n').encode('utf-8')
+        payload += _index_lines(entries)
+    with open(idx_path, mode + 'b') as f:
+        f.write(payload)
+    if mode == 'w':
+        _INDEX_CACHE.pop(os.path.abspath(file_path), None)
+
+
+def _append_records(data: List[Dict[str, Any]], file_path: str, mode: str,
+                    index_key: Optional[str]) -> None:
+    idx_path = _index_path(file_path)
+    indexed = index_key is not None or os.path.exists(idx_path)
+    if mode == 'a' and index_key is None and indexed:
+        index_key = _read_index_header(idx_path)
+
+    entries = []
+    with open(file_path, mode + 'b') as f:
+        offset = f.seek(0, os.SEEK_END)
+        chunks = []
+        for item in data:
+            line = _encode(item)
+            chunks.append(line)
+            entries.append((_record_key(item, index_key), offset, len(line)))
+            offset += len(line)
+        f.write(b''.join(chunks))
+
+    if not indexed:
+        return
+    if mode == 'a' and os.path.exists(idx_path):
+        _write_index(file_path, index_key, entries, 'a')
+    elif mode == 'w':
+        _write_index(file_path, index_key, entries, 'w')
+    else:
+        build_index(file_path, index_key)
+
+
+def dump(data: List[Dict[str, Any]], file_path: str, mode: str = 'w',
+         index_key: Optional[str] = None) -> None:
     """
     Writes a list of dictionaries to a JSONL file.
 
     Each dictionary in the list is serialized to a JSON string and written
-    as a new line in the specified file.
+    as a new line in the specified file. If the file has a sidecar index
+    (see `build_index`) or `index_key` is given, the index is kept in sync.
 
     Args:
         data (List[Dict[str, Any]]): A list of dictionaries to write.
         file_path (str): The path to the output JSONL file.
         mode (str): The file writing mode. 'w' to overwrite the file (default),
                     'a' to append to the file.
+        index_key (Optional[str]): Record field used as lookup key by `get`.
+                                   Creates the sidecar index if missing.
     """
     if mode not in ['w', 'a']:
         raise ValueError("Mode must be 'w' (write) or 'a' (append).")
-    
-    with open(file_path, mode, encoding='utf-8') as f:
-        for item in data:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    if mode == 'w' and index_key is None and os.path.exists(_index_path(file_path)):
+        index_key = _read_index_header(_index_path(file_path))
+
+    _append_records(data, file_path, mode, index_key)
 
-def add(item: Dict[str, Any], file_path: str) -> None:
+def add(item: Dict[str, Any], file_path: str, index_key: Optional[str] = None) -> None:
     """
     Appends a single dictionary to a JSONL file.
 
     The dictionary is serialized to a JSON string and appended as a new line.
+    The sidecar index, if present, gets the new record's offset appended.
 
     Args:
         item (Dict[str, Any]): The dictionary to append.
         file_path (str): The path to the JSONL file.
+        index_key (Optional[str]): Record field used as lookup key by `get`.
+                                   Creates the sidecar index if missing.
+    """
+    _append_records([item], file_path, 'a', index_key)
+
+class JsonlWriter:
+    """
+    Buffered, thread-safe appender for JSONL files.
+
+    Keeps the file handle open and accumulates serialized lines in memory,
+    writing them out in one call once `buffer_size` bytes are pending or
+    `flush_interval` seconds have passed since the last flush. With `fsync`
+    enabled every flushed batch is synced to disk (group commit). The sidecar
+    index is updated once per batch, like `dump`/`add` would. Callers that
+    must know their records are on disk pass the offset returned by `write`
+    to `sync`; concurrent callers share a flush.
+
+    Usage:
+        with JsonlWriter('responses.jsonl') as writer:
+            for row in rows:
+                writer.write(row)
+    """
+
+    def __init__(self, file_path: str, mode: str = 'a', buffer_size: int = 1024 * 1024,
+                 flush_interval: Optional[float] = 1.0, fsync: bool = False,
+                 index_key: Optional[str] = None):
+        """
+        Args:
+            file_path (str): The path to the JSONL file.
+            mode (str): 'a' to append (default), 'w' to truncate the file first.
+            buffer_size (int): Pending bytes that trigger a flush.
+            flush_interval (Optional[float]): Maximum seconds a record stays
+                                              buffered; None disables the timer.
+            fsync (bool): Sync every flushed batch to disk.
+            index_key (Optional[str]): Record field used as lookup key by `get`.
+                                       Creates the sidecar index if missing.
+        """
+        if mode not in ['w', 'a']:
+            raise ValueError("Mode must be 'w' (write) or 'a' (append).")
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        idx_path = _index_path(file_path)
+        if index_key is None and os.path.exists(idx_path):
+            index_key = _read_index_header(idx_path)
+        self.index_key = index_key
+        self._indexed = index_key is not None or os.path.exists(idx_path)
+
+        # _lock guards the buffer, _io_lock the file; a flush takes the buffer
+        # and writes it out without blocking writers (always _io_lock first)
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._chunks: List[bytes] = []
+        self._entries: List[Tuple[Any, int, int]] = []
+        self._pending = 0
+        self._file = open(file_path, mode + 'b')
+        self._offset = self._file.seek(0, os.SEEK_END)
+        # End of the data written out by the last flush
+        self._flushed = self._offset
+        if self._indexed:
+            if mode == 'w':
+                _write_index(file_path, index_key, [], 'w')
+            elif not os.path.exists(idx_path):
+                build_index(file_path, index_key)
+        self._last_flush = time.monotonic()
+
+        self._closed = threading.Event()
+        self._timer = None
+        if flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._timer.start()
+
+    def write(self, item: Dict[str, Any]) -> int:
+        """
+        Buffers one record, flushing if a threshold has been reached.
+
+        Returns:
+            int: The file offset right after the record, for `sync`.
+        """
+        return self.write_many([item])
+
+    def write_many(self, items: List[Dict[str, Any]]) -> int:
+        """Buffers several records under a single lock acquisition; returns like `write`."""
+        lines = [(_record_key(item, self.index_key), _encode(item)) for item in items]
+        with self._lock:
+            for key, line in lines:
+                self._buffer_locked(key, line)
+            offset = self._offset
+            due = self._flush_due_locked()
+        if due:
+            self.flush()
+        return offset
+
+    def write_encoded(self, line: bytes, key: Any = None) -> None:
+        """
+        Buffers a record that was already serialized, e.g. by a worker process.
+
+        Args:
+            line (bytes): One UTF-8 encoded JSON document ending with a newline.
+            key (Any): Its index key, if the file is indexed.
+        """
+        with self._lock:
+            self._buffer_locked(key, line)
+            due = self._flush_due_locked()
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes out all buffered records."""
+        with self._io_lock:
+            self._flush_io_locked()
+
+    def sync(self, offset: int) -> None:
+        """
+        Returns once the data up to `offset` is written out (and synced with `fsync`).
+
+        Flushes only if no other flush covered it yet, so callers that wrote
+        while another thread was flushing are committed together by the next.
+        """
+        with self._io_lock:
+            if self._flushed < offset:
+                self._flush_io_locked()
+
+    def close(self) -> None:
+        """Flushes pending records and closes the file."""
+        with self._io_lock:
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                # Rejects further writes, so the flush below takes everything
+                self._closed.set()
+            self._flush_io_locked()
+            self._file.close()
+        if self._timer is not None:
+            self._timer.join()
+
+    def _buffer_locked(self, key: Any, line: bytes) -> None:
+        if self._closed.is_set():
+            raise ValueError("Write to a closed JsonlWriter.")
+        self._chunks.append(line)
+        self._entries.append((key, self._offset, len(line)))
+        self._offset += len(line)
+        self._pending += len(line)
+
+    def _flush_due_locked(self) -> bool:
+        return self._pending >= self.buffer_size or self._interval_elapsed()
+
+    def _interval_elapsed(self) -> bool:
+        return (self.flush_interval is not None
+                and time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _flush_io_locked(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            chunks, entries, pending, end = self._chunks, self._entries, self._pending, self._offset
+            self._chunks, self._entries, self._pending = [], [], 0
+        if chunks:
+            try:
+                self._file.write(b''.join(chunks))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except BaseException:
+                # Keep the records for the next flush rather than losing them
+                with self._lock:
+                    self._chunks = chunks + self._chunks
+                    self._entries = entries + self._entries
+                    self._pending += pending
+                raise
+            if self._indexed:
+                _write_index(self.file_path, self.index_key, entries, 'a')
+        self._flushed = end
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            with self._io_lock:
+                if not self._closed.is_set() and self._interval_elapsed():
+                    self._flush_io_locked()
+
+    def __enter__(self) -> 'JsonlWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+def build_index(file_path: str, key_field: Optional[str] = None) -> None:
     """
-    with open(file_path, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    Scans a JSONL file once and writes its sidecar byte-offset index.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        key_field (Optional[str]): Record field used as lookup key by `get`.
+                                   Without it only positional `seek` works.
+    """
+    entries = []
+    offset = 0
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # A partially written trailing record.
+            if line.strip():
+                entries.append((_record_key(json.loads(line), key_field), offset, len(line)))
+            offset += len(line)
+    _write_index(file_path, key_field, entries, 'w')
+
+def reindex(file_path: str) -> None:
+    """
+    Rebuilds the sidecar index of a file rewritten in place, if it has one.
+
+    The key field recorded in the existing index is kept.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+    """
+    idx_path = _index_path(file_path)
+    if os.path.exists(idx_path):
+        build_index(file_path, _read_index_header(idx_path))
+
+def _index_matches(file_path: str, index: _Index) -> bool:
+    """Checks that the last indexed record is still a whole line with the same key."""
+    if not index.entries:
+        return True
+    offset, length = index.entries[-1]
+    start = max(offset - 1, 0)
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        raw = os.pread(fd, length + offset - start, start)
+    finally:
+        os.close(fd)
+    if len(raw) != length + offset - start or not raw.endswith(b'\n'):
+        return False
+    if offset and raw[:1] != b'\n':
+        return False
+    try:
+        record = json.loads(raw[offset - start:])
+    except ValueError:
+        return False
+    return _record_key(record, index.key_field) == index.last_key
+
+def _load_index(file_path: str) -> _Index:
+    """
+    Returns the up-to-date index of a JSONL file.
+
+    Only the part of the sidecar written since the last call is parsed, and
+    records appended to the data file without updating the sidecar are
+    indexed from the last known offset onwards. Whenever the data file's
+    mtime changed, the last indexed record is checked against the data, and
+    the index is rebuilt if the file was rewritten in place.
+    """
+    abs_path = os.path.abspath(file_path)
+    idx_path = _index_path(abs_path)
+    if not os.path.exists(idx_path):
+        build_index(abs_path)
+
+    stat = os.stat(idx_path)
+    index = _INDEX_CACHE.get(abs_path)
+    if index is None or stat.st_size < index.idx_size:
+        index = _Index(_read_index_header(idx_path))
+    if (stat.st_size, stat.st_mtime_ns) != (index.idx_size, index.idx_mtime):
+        with open(idx_path, 'rb') as f:
+            if index.idx_size == 0:
+                f.readline()  # Header.
+            else:
+                f.seek(index.idx_size)
+            for line in f:
+                key, offset, length = json.loads(line)
+                index.insert(key, offset, length)
+            index.idx_size = f.tell()
+        index.idx_mtime = stat.st_mtime_ns
+
+    data_stat = os.stat(abs_path)
+    data_size = data_stat.st_size
+    if data_size < index.end or (data_stat.st_mtime_ns != index.data_mtime
+                                 and not _index_matches(abs_path, index)):
+        # The data file was rewritten behind our back; start over.
+        build_index(abs_path, index.key_field)
+        return _load_index(abs_path)
+    index.data_mtime = data_stat.st_mtime_ns
+    if data_size > index.end:
+        new_entries = []
+        with open(abs_path, 'rb') as f:
+            f.seek(index.end)
+            offset = index.end
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    key = _record_key(json.loads(line), index.key_field)
+                    new_entries.append((key, offset, len(line)))
+                offset += len(line)
+        if new_entries:
+            _write_index(abs_path, index.key_field, new_entries, 'a')
+            for key, offset, length in new_entries:
+                index.insert(key, offset, length)
+            stat = os.stat(idx_path)
+            index.idx_size, index.idx_mtime = stat.st_size, stat.st_mtime_ns
+
+    _INDEX_CACHE[abs_path] = index
+    return index
+
+def _read_record(file_path: str, offset: int, length: int) -> Dict[str, Any]:
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        return json.loads(os.pread(fd, length, offset))
+    finally:
+        os.close(fd)
+
+def get(file_path: str, key: Any, default: Any = _MISSING) -> Dict[str, Any]:
+    """
+    Reads the record whose index key equals `key` without parsing the file.
+
+    The lookup goes through the sidecar index (built on first use) and reads
+    only the bytes of the matching record. When several records share a key,
+    the most recently appended one wins.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        key (Any): Value of the index key field to look up.
+        default (Any): Returned when no record has the key. If omitted,
+                       a KeyError is raised instead.
+
+    Returns:
+        Dict[str, Any]: The matching record.
+
+    Raises:
+        ValueError: If the index of the file has no key field.
+    """
+    index = _load_index(file_path)
+    if index.key_field is None:
+        raise ValueError(f"{file_path} is indexed without a key field; "
+                         f"call build_index(file_path, key_field) first.")
+    position = index.keys.get(key)
+    if position is None:
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+    return _read_record(file_path, *index.entries[position])
+
+def seek(file_path: str, n: int) -> Dict[str, Any]:
+    """
+    Reads the n-th record of a JSONL file (negative values count from the end).
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        n (int): Zero-based record number.
+
+    Returns:
+        Dict[str, Any]: The record at that position.
+    """
+    index = _load_index(file_path)
+    return _read_record(file_path, *index.entries[n])
+
+def count(file_path: str) -> int:
+    """
+    Returns the number of records in a JSONL file using its sidecar index.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+    """
+    return len(_load_index(file_path).entries)
+
+def truncate(file_path: str, n: int) -> None:
+    """
+    Drops every record after the first n, along with a partially written tail.
+
+    Used to roll a file back to a known record count, e.g. after a crash
+    between writing records and committing their count elsewhere. The
+    sidecar index is rebuilt if anything was cut.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        n (int): Number of records to keep.
+    """
+    entries = _load_index(file_path).entries
+    if n > len(entries):
+        raise ValueError(f"{file_path} has only {len(entries)} records, not {n}.")
+    end = sum(entries[n - 1]) if n > 0 else 0
+    if os.path.getsize(file_path) == end:
+        return
+    with open(file_path, 'r+b') as f:
+        f.truncate(end)
+    reindex(file_path)
 
 def load(file_path: str) -> List[Dict[str, Any]]:
     """
@@ -71,6 +598,74 @@ def stream_load(file_path: str) -> Generator[Dict[str, Any], None, None]:
         for line in f:
             yield json.loads(line)
 
+def _chunk_bounds(file_path: str, chunk_size: int) -> Generator[Tuple[int, int], None, None]:
+    """Splits a file into byte ranges of roughly `chunk_size` ending on a newline."""
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                newline = mm.find(b'\n', min(start + chunk_size, size) - 1)
+                end = size if newline == -1 else newline + 1
+                yield start, end
+                start = end
+
+def _decode_chunk(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Worker side of `parallel_load`: decodes the records in one byte range."""
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [json.loads(line) for line in mm[start:end].splitlines() if line.strip()]
+
+def parallel_load(file_path: str, workers: Optional[int] = None,
+                  chunk_size: int = 16 * 1024 * 1024,
+                  ordered: bool = True) -> Generator[Dict[str, Any], None, None]:
+    """
+    Reads a large JSONL file by decoding newline-aligned chunks on a process pool.
+
+    The file is memory-mapped and split into byte ranges; each worker maps the
+    file itself and decodes only its range, so no raw data is pickled between
+    processes. At most two chunks per worker are in flight, which bounds memory
+    to roughly `2 * workers * chunk_size` worth of decoded records.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        workers (Optional[int]): Number of worker processes (default: CPU count).
+        chunk_size (int): Approximate number of bytes decoded per task.
+        ordered (bool): Yield records in file order (default). With False,
+                        chunks are yielded as soon as they are decoded.
+
+    Yields:
+        Generator[Dict[str, Any], None, None]: A generator that yields one
+                                               dictionary at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    bounds = _chunk_bounds(file_path, chunk_size)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in bounds:
+            pending.append(executor.submit(_decode_chunk, file_path, start, end))
+            if len(pending) < max_pending:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+        while pending:
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+
 # --- Example Usage ---
 if __name__ == '__main__':
     # Define some sample data
@@ -86,7 +681,7 @@ if __name__ == '__main__':
     file = 'users.jsonl'
     
     print(f"--- Writing initial data to '{file}' using dump() ---")
-    dump(users_batch_1, file, mode='w') # Use 'w' to create/overwrite the file
+    dump(users_batch_1, file, mode='w', index_key='id') # Use 'w' to create/overwrite the file
 
     print(f"--- Appending more data to '{file}' using dump() ---")
     dump(users_batch_2, file, mode='a') # Use 'a' to append
@@ -101,6 +696,10 @@ if __name__ == '__main__':
     # Expected output:
     # [{'id': 1, ...}, {'id': 2, ...}, {'id': 3, ...}, {'id': 4, ...}, {'id': 5, ...}]
 
+    print("\n--- Looking up single records using get() and seek() ---")
+    print(get(file, 3))
+    print(seek(file, -1))
+
     print(f"\n--- Reading data from '{file}' as a stream using stream_load() ---")
     for record in stream_load(file):
         print(f"  - Loaded record ID: {record.get('id')}")
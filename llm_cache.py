@@ -0,0 +1,208 @@
+# llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Default location and limits of the LLM response cache.
+LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB", "llm_cache.db")
+MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+TTL = float(os.environ.get("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600
+
+# Evict at most this often (in puts), since eviction scans the whole table.
+EVICT_EVERY = 1000
+
+
+def normalize(text: str) -> str:
+    """Canonical form of an input: NFC, collapsed whitespace, no outer blanks."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, template_version: Any, text: str) -> str:
+    """
+    Content address of one model input.
+
+    Args:
+        model (str): Model name, e.g. "gemini-2.5-flash".
+        template_version: Version of the prompt template the input goes into.
+        text (str): The input; normalized before hashing, so whitespace-only
+                    changes still hit the cache.
+    """
+    payload = json.dumps([model, template_version, normalize(text)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache of LLM answers.
+
+    Entries live in a SQLite database in WAL mode, so several processes can
+    share one cache file. Lookups refresh an entry's last use; entries older
+    than `ttl` seconds are treated as missing, and once the stored answers
+    exceed `max_bytes` the least recently used ones are evicted. Hits and
+    misses are counted per instance (`hits`, `misses`) and in total across
+    all processes (`stats`).
+
+    Usage:
+        cache = LLMCache()
+        key = cache_key(MODEL, PROMPT_VERSION, candidate_text)
+        answer = cache.get(key)
+        if answer is None:
+            answer = call_model(...)
+            cache.put(key, answer)
+    """
+
+    def __init__(self, path: str = LLM_CACHE_DB, max_bytes: int = MAX_BYTES, ttl: float = TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+
+    def _count(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+        self._conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [("hits", hits), ("misses", misses)],
+        )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Returns the cached answers of those `keys` that are cached and fresh."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found: Dict[str, str] = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders}) "
+                    "AND created_at >= ?",
+                    [*chunk, now - self.ttl],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET used_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            self._count(len(found), len(keys) - len(found))
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached answer for `key`, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Stores several answers in one transaction."""
+        now = time.time()
+        rows = [(key, value, len(value.encode("utf-8")), now, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created_at, used_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._puts += len(rows)
+            due = self._puts >= EVICT_EVERY
+        if due:
+            self.evict()
+
+    def put(self, key: str, value: str) -> None:
+        """Stores the answer for `key`."""
+        self.put_many([(key, value)])
+
+    def evict(self) -> int:
+        """
+        Drops expired entries, then least recently used ones until the cache
+        fits in `max_bytes`.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            self._puts = 0
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    # Walk from the least recently used entry until enough is freed
+                    excess, stale = total - self.max_bytes, []
+                    for key, size in self._conn.execute(
+                        "SELECT key, size FROM entries ORDER BY used_at"
+                    ):
+                        if excess <= 0:
+                            break
+                        stale.append((key,))
+                        excess -= size
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+                    removed += len(stale)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Returns entry count, stored bytes and hit/miss totals of all processes."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'LLMCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
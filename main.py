@@ -0,0 +1,317 @@
+"""
+Single entry point for all jobs of the project.
+
+    python main.py provision --count 10
+    python main.py combine data syntetic_data.jsonl --incremental
+    python main.py watch --mode poll
+    python main.py analyze "Explain how AI works in a few words"
+    python main.py screen syntetic_data.jsonl analysis.jsonl
+    python main.py semantic-index
+    python main.py semantic-search "praca ze zwierzętami" --kind form
+    python main.py text-index
+    python main.py text-search "wolontariat schronisko" --kind form
+    python main.py refresh-discovery
+    python main.py fake-google --latency 0.05
+    python main.py serve --host 0.0.0.0 --workers 4
+
+Subcommands import their modules only when they run, so e.g. `combine`
+never loads the Google client stack, Faker or google-genai.
+"""
+
+import argparse
+import os
+import sys
+
+from state_store import STATE_DB  # standard library only
+
+
+def provision(args):
+    import create_google_form
+
+    create_google_form.provision(
+        create_google_form.build_form_specs(args.count),
+        output_file=args.output,
+        state_db=args.state_db,
+        concurrency=args.concurrency,
+        forms_qps=args.forms_qps,
+        calendar_qps=args.calendar_qps,
+        attendee_email=args.attendee or None,
+    )
+
+
+def combine(args):
+    import combine_data
+
+    combine_data.combine_json_to_jsonl(
+        args.input_dir,
+        args.output,
+        incremental=args.incremental,
+        workers=args.workers,
+        ordered=not args.unordered,
+        quarantine_dir=args.quarantine_dir,
+        columnar_path=args.columnar,
+    )
+    if args.compact:
+        combine_data.compact(args.output)
+
+
+def watch(args):
+    import form_watcher
+
+    form_watcher.watch(
+        mode=args.mode,
+        topic=args.topic,
+        subscription=args.subscription,
+        output_dir=args.output_dir,
+        state_db=args.state_db,
+        interval=args.interval,
+        forms_file=args.forms_file,
+        concurrency=args.concurrency,
+        qps=args.qps,
+    )
+
+
+def analyze(args):
+    import ai
+
+    print(ai.ask(args.prompt, model=args.model))
+
+
+def screen(args):
+    import ai
+    from llm_cache import LLMCache
+
+    cache = None if args.no_cache else LLMCache(args.cache_db)
+    ai.screen(
+        args.input,
+        args.output,
+        model=ai.StubModel() if args.stub else ai.GeminiModel(args.model),
+        token_budget=args.token_budget,
+        max_batch=args.max_batch,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        cache=cache,
+    )
+    if cache is not None:
+        cache.evict()
+        print("LLM cache: {entries} entries, {bytes} bytes, {hits} hits, {misses} misses".format(**cache.stats()))
+        cache.close()
+
+
+def semantic_index(args):
+    import semantic_index
+
+    embedder = None
+    if args.embedder == "gemini":
+        embedder = semantic_index.GeminiEmbedder()
+    semantic_index.build(
+        args.path,
+        forms_file=args.forms_file,
+        responses_file=args.responses_file,
+        embedder=embedder,
+        quantize=args.quantize,
+    )
+
+
+def semantic_search(args):
+    import semantic_index
+
+    index = semantic_index.SemanticIndex(args.path)
+    for hit in index.search(args.query, k=args.k, kind=args.kind):
+        text = " ".join((hit.get("title") or hit.get("snippet", "")).split())
+        print(f"{hit['score']:.3f}  {hit['key']}  {text}")
+
+
+def text_index(args):
+    import text_index
+
+    text_index.update(
+        args.path,
+        forms_file=args.forms_file,
+        responses_file=args.responses_file or None,
+        merge=args.merge,
+    )
+
+
+def text_search(args):
+    import text_index
+
+    index = text_index.TextIndex(args.path)
+    for hit in index.search(args.query, k=args.k, kind=args.kind):
+        text = " ".join((hit.get("title") or hit.get("snippet", "")).split())
+        print(f"{hit['score']:.3f}  {hit['key']}  {text}")
+
+
+def serve(args):
+    import server
+
+    server.serve(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        forms_file=args.forms_file,
+        text_index_dir=args.text_index,
+        semantic_index_dir=args.semantic_index,
+        submissions_file=args.submissions_file,
+    )
+
+
+def refresh_discovery(args):
+    import google_clients
+
+    google_clients.refresh_discovery_documents()
+
+
+def fake_google(args):
+    import fake_google
+
+    fake_google.serve(
+        host=args.host,
+        port=args.port,
+        response_rate=args.response_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        quotas={"forms": args.forms_qps, "calendar": args.calendar_qps},
+        seed=args.seed,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Automatyzacja procesu rekrutacyjnego (HackYeah 2025)."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Defaults of provision mirror create_google_form's environment-based
+    # settings; they are spelled out here to avoid importing it for --help.
+    p = subparsers.add_parser("provision", help="create or update forms and events")
+    p.add_argument("--count", type=int, default=10, help="number of random forms")
+    p.add_argument("--output", default="forms.jsonl")
+    p.add_argument("--state-db", default=STATE_DB)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--forms-qps", type=float, default=5.0)
+    p.add_argument("--calendar-qps", type=float, default=10.0)
+    p.add_argument(
+        "--attendee", default="enter@example.com", help="empty to skip attendees"
+    )
+    p.set_defaults(func=provision)
+
+    p = subparsers.add_parser("combine", help="combine data/*.json into one JSONL file")
+    p.add_argument("input_dir", nargs="?", default="data")
+    p.add_argument("output", nargs="?", default="syntetic_data.jsonl")
+    p.add_argument("--incremental", action="store_true")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--unordered", action="store_true")
+    p.add_argument("--quarantine-dir", default=None)
+    p.add_argument("--columnar", default=None, help="also export a columnar copy here")
+    p.add_argument("--compact", action="store_true", help="drop superseded records")
+    p.set_defaults(func=combine)
+
+    p = subparsers.add_parser("watch", help="fetch new form responses into data/")
+    p.add_argument("--mode", choices=["pubsub", "poll", "async"], default="pubsub")
+    p.add_argument("--topic", default=os.environ.get("FORMS_WATCH_TOPIC"))
+    p.add_argument(
+        "--subscription", default=os.environ.get("FORMS_WATCH_SUBSCRIPTION")
+    )
+    p.add_argument("--output-dir", default="data")
+    p.add_argument("--state-db", default=STATE_DB)
+    p.add_argument("--interval", type=float, default=600, help="poll mode only")
+    p.add_argument("--forms-file", default="forms.jsonl", help="async mode only")
+    p.add_argument("--concurrency", type=int, default=64, help="async mode only")
+    p.add_argument("--qps", type=float, default=15.0, help="async mode only")
+    p.set_defaults(func=watch)
+
+    p = subparsers.add_parser("analyze", help="ask Gemini a question")
+    p.add_argument("prompt")
+    p.add_argument("--model", default="gemini-2.5-flash")
+    p.set_defaults(func=analyze)
+
+    p = subparsers.add_parser("screen", help="score all applications with Gemini")
+    p.add_argument("input", nargs="?", default="syntetic_data.jsonl")
+    p.add_argument("output", nargs="?", default="analysis.jsonl")
+    p.add_argument("--model", default="gemini-2.5-flash")
+    p.add_argument("--token-budget", type=int, default=8000, help="tokens per prompt")
+    p.add_argument("--max-batch", type=int, default=25, help="candidates per prompt")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--rpm", type=float, default=1000.0, help="requests per minute")
+    p.add_argument("--stub", action="store_true", help="use a local stub model")
+    p.add_argument("--cache-db", default="llm_cache.db", help="shared cache of model answers")
+    p.add_argument("--no-cache", action="store_true")
+    p.set_defaults(func=screen)
+
+    p = subparsers.add_parser(
+        "refresh-discovery", help="download the latest discovery documents"
+    )
+    p.set_defaults(func=refresh_discovery)
+
+    p = subparsers.add_parser(
+        "semantic-index", help="embed forms and paragraph answers for semantic search"
+    )
+    p.add_argument("--path", default="semantic_index")
+    p.add_argument("--forms-file", default="forms.jsonl")
+    p.add_argument("--responses-file", default="syntetic_data.jsonl")
+    p.add_argument("--embedder", choices=["hashing", "gemini"], default="hashing",
+                   help="used for a new index; an existing one keeps its embedder")
+    p.add_argument("--quantize", action="store_true", help="store int8 vectors (new index only)")
+    p.set_defaults(func=semantic_index)
+
+    p = subparsers.add_parser("semantic-search", help="find forms or answers similar to a query")
+    p.add_argument("query")
+    p.add_argument("-k", type=int, default=10)
+    p.add_argument("--kind", choices=["form", "answer"], default=None)
+    p.add_argument("--path", default="semantic_index")
+    p.set_defaults(func=semantic_search)
+
+    p = subparsers.add_parser("text-index", help="update the full-text index of forms and answers")
+    p.add_argument("--path", default="text_index")
+    p.add_argument("--forms-file", default="forms.jsonl")
+    p.add_argument("--responses-file", default="syntetic_data.jsonl", help="empty to skip answers")
+    p.add_argument("--merge", action="store_true", help="merge all segments into one")
+    p.set_defaults(func=text_index)
+
+    p = subparsers.add_parser("text-search", help="full-text search over forms and answers")
+    p.add_argument("query")
+    p.add_argument("-k", type=int, default=10)
+    p.add_argument("--kind", choices=["form", "answer"], default=None)
+    p.add_argument("--path", default="text_index")
+    p.set_defaults(func=text_search)
+
+    p = subparsers.add_parser("serve", help="run the offer search and submission API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    p.add_argument("--forms-file", default="forms.jsonl")
+    p.add_argument("--text-index", default="text_index")
+    p.add_argument("--semantic-index", default="semantic_index")
+    p.add_argument("--submissions-file", default="submissions.jsonl")
+    p.set_defaults(func=serve)
+
+    p = subparsers.add_parser(
+        "fake-google", help="serve fake Forms and Calendar APIs on localhost"
+    )
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8085)
+    p.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    p.add_argument("--jitter", type=float, default=0.0, help="extra random latency")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--error-status", type=int, default=503)
+    p.add_argument("--forms-qps", type=float, default=0.0, help="0 for no quota")
+    p.add_argument("--calendar-qps", type=float, default=0.0, help="0 for no quota")
+    p.add_argument(
+        "--response-rate", type=float, default=0.0, help="fake responses per second"
+    )
+    p.add_argument("--seed", type=int, default=None)
+    p.set_defaults(func=fake_google)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
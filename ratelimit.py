@@ -0,0 +1,78 @@
+# ratelimit.py
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second up to `burst`;
+    `acquire` blocks until enough tokens are available.
+
+    Usage:
+        forms_limiter = TokenBucket(rate=5, burst=10)
+        forms_limiter.acquire()
+        form_service.forms().get(formId=form_id).execute()
+
+    From a coroutine, `await forms_limiter.wait()` does the same without
+    blocking the event loop.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            burst (float | None): Bucket capacity (default: one second of rate,
+                                  but at least one token).
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes tokens if available.
+
+        Returns:
+            float: 0 on success, otherwise the seconds to wait before retrying.
+        """
+        # Requests larger than the bucket wait for a full bucket and leave it
+        # in debt, so batches of many calls still average out to `rate`
+        needed = min(tokens, self.burst)
+        with self._lock:
+            self._refill()
+            if self._tokens >= needed:
+                self._tokens -= tokens
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Blocks until `tokens` tokens have been taken from the bucket."""
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def penalize(self, seconds: float) -> None:
+        """Empties the bucket so that nobody gets a token for `seconds`."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    async def wait(self, tokens: float = 1.0) -> None:
+        """Asynchronous `acquire`: sleeps on the event loop instead of the thread."""
+        while delay := self.try_acquire(tokens):
+            await asyncio.sleep(delay)
@@ -0,0 +1,234 @@
+# request_executor.py
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any
+
+from googleapiclient.errors import HttpError
+
+from ratelimit import TokenBucket
+
+# Default request rates per API (requests per second), shared by all threads.
+API_QPS = {
+    "forms": float(os.environ.get("FORMS_QPS", "5")),
+    "calendar": float(os.environ.get("CALENDAR_QPS", "10")),
+}
+DEFAULT_QPS = 5.0
+
+MAX_ATTEMPTS = int(os.environ.get("API_MAX_ATTEMPTS", "6"))
+BASE_DELAY = 1.0
+MAX_DELAY = 64.0
+
+# Error classes returned by `classify`.
+OK = "ok"
+THROTTLED = "throttled"  # over quota: slow down every caller of the API
+TRANSIENT = "transient"  # server or network hiccup: retry this request
+FATAL = "fatal"  # client error: retrying cannot help
+
+# 403 reasons the Calendar API uses for rate limiting instead of 429.
+_RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+
+def _error_reason(exception: HttpError) -> str | None:
+    try:
+        error = json.loads(exception.content)["error"]
+        return (error.get("errors") or [{}])[0].get("reason") or error.get("status")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def classify(exception: BaseException | None) -> str:
+    """Sorts the outcome of a request into OK, THROTTLED, TRANSIENT or FATAL."""
+    if exception is None:
+        return OK
+    if isinstance(exception, HttpError):
+        status = exception.resp.status
+        if status == 429:
+            return THROTTLED
+        if status == 403 and _error_reason(exception) in _RATE_LIMIT_REASONS:
+            return THROTTLED
+        if status >= 500 or status == 408:
+            return TRANSIENT
+        return FATAL
+    if isinstance(exception, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    return FATAL
+
+
+def parse_time(value: str) -> datetime:
+    """Parses an RFC 3339 timestamp as sent by the Google APIs ('Z' suffix included)."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def retry_after(exception: BaseException | None) -> float | None:
+    """Returns the delay requested by a Retry-After header, in seconds."""
+    if not isinstance(exception, HttpError):
+        return None
+    value = exception.resp.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestExecutor:
+    """
+    Executes Google API requests with throttling, retries and accounting.
+
+    Every request first takes tokens from its API's token bucket, which all
+    threads share, so the process as a whole stays within `qps`. Failures are
+    classified: throttling errors (429, rate-limit 403s) put the whole API's
+    bucket in debt for the Retry-After period (or the backoff delay), so
+    every thread backs off, not just the one that was told to; transient
+    errors (5xx, timeouts, dropped connections) are retried with exponential
+    backoff and full jitter; anything else is raised at once. Per-API
+    counters are available from `stats`.
+
+    Usage:
+        executor = get_executor()
+        form = executor.execute(forms.forms().get(formId=form_id))
+    """
+
+    def __init__(
+        self,
+        qps: dict[str, float] | None = None,
+        max_attempts: int = MAX_ATTEMPTS,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._stats: dict[str, dict[str, Any]] = {}
+        self._recent: dict[str, deque] = {}
+        for api, rate in {**API_QPS, **(qps or {})}.items():
+            self.set_rate(api, rate)
+
+    def set_rate(self, api: str, qps: float) -> None:
+        """Replaces the request rate of an API."""
+        with self._lock:
+            self._buckets[api] = TokenBucket(qps)
+
+    def bucket(self, api: str) -> TokenBucket:
+        with self._lock:
+            if api not in self._buckets:
+                self._buckets[api] = TokenBucket(DEFAULT_QPS)
+            return self._buckets[api]
+
+    def _count(self, api: str, key: str, amount: int = 1) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(
+                api, {"requests": 0, "retries": 0, "throttled": 0, "failed": 0}
+            )
+            stats[key] += amount
+            if key == "requests":
+                recent = self._recent.setdefault(api, deque())
+                now = time.monotonic()
+                recent.append((now, amount))
+                while recent and recent[0][0] < now - 60:
+                    recent.popleft()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Returns per-API counters, including requests sent in the last minute."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                api: dict(
+                    stats,
+                    last_minute=sum(
+                        n for t, n in self._recent.get(api, ()) if t >= now - 60
+                    ),
+                )
+                for api, stats in self._stats.items()
+            }
+
+    def backoff(self, attempt: int, exception: BaseException | None = None) -> float:
+        """Delay before retry number `attempt` (from 0): full jitter, at least Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(delay, retry_after(exception) or 0.0)
+
+    def record_failure(self, api: str, exception: BaseException, attempt: int) -> float:
+        """
+        Accounts for a failed request that will be retried.
+
+        Throttling errors also put the API's bucket in debt, pausing all
+        threads using it.
+
+        Returns:
+            float: The seconds to wait before retrying.
+        """
+        delay = self.backoff(attempt, exception)
+        self._count(api, "retries")
+        if classify(exception) == THROTTLED:
+            self._count(api, "throttled")
+            self.bucket(api).penalize(delay)
+        return delay
+
+    @staticmethod
+    def _api_of(request) -> str:
+        # googleapiclient HttpRequests carry e.g. "forms.forms.get"
+        method_id = getattr(request, "methodId", None)
+        if not method_id:
+            raise ValueError("Cannot tell the API of this request; pass api=.")
+        return method_id.split(".", 1)[0]
+
+    def execute(self, request, api: str | None = None, tokens: float = 1.0) -> Any:
+        """
+        Executes a request (anything with `.execute()`) and returns its result.
+
+        Args:
+            request: A googleapiclient HttpRequest or BatchHttpRequest.
+            api (str | None): API name for quota accounting; derived from the
+                              request's method id if omitted.
+            tokens (float): Quota units the request uses (e.g. batch size).
+
+        Raises:
+            The last error once it is not retryable or attempts run out.
+        """
+        api = api or self._api_of(request)
+        bucket = self.bucket(api)
+        for attempt in range(self.max_attempts):
+            bucket.acquire(tokens)
+            self._count(api, "requests", int(tokens))
+            try:
+                return request.execute()
+            except Exception as e:
+                if classify(e) == FATAL or attempt + 1 >= self.max_attempts:
+                    self._count(api, "failed")
+                    raise
+                delay = self.record_failure(api, e, attempt)
+                print(f"{api} request failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> RequestExecutor:
+    """Returns the process-wide RequestExecutor."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RequestExecutor()
+        return _executor
+
+
+def execute(request, api: str | None = None, tokens: float = 1.0) -> Any:
+    """Shortcut for `get_executor().execute(request, api, tokens)`."""
+    return get_executor().execute(request, api, tokens)
@@ -0,0 +1,469 @@
+# semantic_index.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+import jsonl
+
+# Default location of the index and the files inside it.
+INDEX_DIR = 'semantic_index'
+META_FILE = 'meta.json'
+VECTORS_FILE = 'vectors.bin'
+SCALES_FILE = 'scales.bin'
+FLAGS_FILE = 'flags.bin'
+ITEMS_FILE = 'items.jsonl'
+
+# Kinds of indexed texts; a row's flag byte holds the position of its kind.
+KINDS = ('form', 'answer')
+DELETED = 0xFF
+
+# Rows scored per block, bounding the temporary memory of a search.
+BLOCK_ROWS = 16384
+
+# Answers shorter than this many words (names, ages, e-mails) are not indexed.
+MIN_PARAGRAPH_WORDS = 8
+
+EMBEDDING_MODEL = 'gemini-embedding-001'
+
+_WORD = re.compile(r'\w+')
+
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder using the hashing trick.
+
+    Every word and every character n-gram of a word (so inflected Polish
+    forms such as "schronisko"/"schroniska" share most features) is hashed
+    to one of `dim` signed buckets. Counts are dampened with log1p and the
+    vector is L2-normalised, so cosine similarity is a dot product.
+    """
+
+    def __init__(self, dim: int = 256, ngram: int = 4):
+        self.dim = dim
+        self.ngram = ngram
+        self._features = lru_cache(maxsize=200_000)(self._token_features)
+
+    def config(self) -> Dict[str, Any]:
+        return {"kind": "hashing", "dim": self.dim, "ngram": self.ngram}
+
+    def _token_features(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        padded = f'<{token}>'
+        grams = [token] + [padded[i:i + self.ngram]
+                           for i in range(max(1, len(padded) - self.ngram + 1))]
+        hashes = np.array([zlib.crc32(gram.encode('utf-8')) for gram in grams], dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return (hashes % self.dim).astype(np.intp), signs
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = [self._features(token) for token in _WORD.findall(text.casefold())]
+            if not features:
+                continue
+            buckets = np.concatenate([f[0] for f in features])
+            signs = np.concatenate([f[1] for f in features])
+            vector = np.bincount(buckets, weights=signs, minlength=self.dim)
+            vectors[row] = np.sign(vector) * np.log1p(np.abs(vector))
+        return _normalize(vectors)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+class GeminiEmbedder:
+    """
+    Embeddings from the Gemini API (`GEMINI_API_KEY`), sent `batch_size`
+    texts per request. Documents and queries use the matching task types.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dim: int = 768, batch_size: int = 100):
+        from google import genai
+
+        self.model = model
+        self.dim = dim
+        self.batch_size = batch_size
+        self._client = genai.Client()
+
+    def config(self) -> Dict[str, Any]:
+        return {"kind": "gemini", "model": self.model, "dim": self.dim}
+
+    def _embed(self, texts: List[str], task_type: str) -> np.ndarray:
+        from google.genai import types
+
+        config = types.EmbedContentConfig(task_type=task_type, output_dimensionality=self.dim)
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            result = self._client.models.embed_content(
+                model=self.model, contents=texts[start:start + self.batch_size], config=config
+            )
+            vectors.extend(embedding.values for embedding in result.embeddings)
+        # Only the full-size Gemini embeddings come normalised
+        return _normalize(np.array(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self._embed(texts, 'RETRIEVAL_DOCUMENT')
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed([text], 'RETRIEVAL_QUERY')[0]
+
+
+def make_embedder(config: Dict[str, Any]):
+    """Recreates the embedder described by its `config()`."""
+    options = {key: value for key, value in config.items() if key != 'kind'}
+    if config["kind"] == 'hashing':
+        return HashingEmbedder(**options)
+    if config["kind"] == 'gemini':
+        return GeminiEmbedder(**options)
+    raise ValueError(f"Unknown embedder: {config['kind']}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns codes and scales."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class SemanticIndex:
+    """
+    Append-only vector index stored in a directory.
+
+    Vectors are kept in a raw row-major file that is memory-mapped for
+    searching, as float32 or, with `quantize`, as int8 codes plus one
+    float32 scale per row (4x smaller). `items.jsonl` holds each row's key
+    and payload, `flags.bin` its kind or DELETED once a newer version of
+    the same key was added. Searches score the rows block by block with
+    BLAS matrix products, in parallel threads, and keep the top k.
+
+    Usage:
+        index = SemanticIndex()
+        index.add(form_entries('forms.jsonl'))
+        for hit in index.search('praca ze zwierzętami', k=5, kind='form'):
+            print(hit["score"], hit["title"])
+    """
+
+    def __init__(self, path: str = INDEX_DIR, embedder=None, quantize: bool = False,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            path (str): Index directory (created on first `add`).
+            embedder: Object with `dim`, `config()`, `embed(texts)` and
+                      `embed_query(text)`. Defaults to the embedder the index
+                      was built with, or a HashingEmbedder for a new index.
+            quantize (bool): Store int8 codes instead of float32 (new index only).
+            workers (Optional[int]): Threads scoring blocks (default: CPU count).
+        """
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        meta_path = os.path.join(path, META_FILE)
+        self._meta_stamp = None
+        if os.path.exists(meta_path):
+            self._meta_stamp = self._stat_meta()
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+            if embedder is None:
+                embedder = make_embedder(self.meta["embedder"])
+            elif embedder.config() != self.meta["embedder"]:
+                raise ValueError(f"Index {path} was built with {self.meta['embedder']}, "
+                                 f"not {embedder.config()}")
+        else:
+            embedder = embedder or HashingEmbedder()
+            self.meta = {"embedder": embedder.config(), "dim": embedder.dim,
+                         "dtype": 'int8' if quantize else 'float32', "count": 0}
+        self.embedder = embedder
+        self._mapped_count = -1
+        self._vectors = self._scales = self._flags = None
+        self._local = threading.local()
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    @property
+    def quantized(self) -> bool:
+        return self.meta["dtype"] == 'int8'
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _write_meta(self) -> None:
+        tmp_path = self._file(META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._file(META_FILE))
+        self._meta_stamp = self._stat_meta()
+
+    def _stat_meta(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._file(META_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def stamp(self) -> Optional[Tuple[int, int]]:
+        """Version of the loaded metadata (mtime and size of meta.json)."""
+        return self._meta_stamp
+
+    def refresh(self) -> None:
+        """Reloads the metadata if another process added rows or rebuilt the index."""
+        stamp = self._stat_meta()
+        if stamp is None or stamp == self._meta_stamp:
+            return
+        with open(self._file(META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta["embedder"] != self.embedder.config():
+            self.embedder = make_embedder(meta["embedder"])
+        self.meta, self._meta_stamp = meta, stamp
+        # Rebuilt indexes may keep the row count; map the files again anyway
+        self._mapped_count = -1
+
+    def _files(self) -> List[Tuple[str, int]]:
+        """Returns (file, bytes per row) of the per-row binary files."""
+        files = [(VECTORS_FILE, self.dim * (1 if self.quantized else 4)), (FLAGS_FILE, 1)]
+        if self.quantized:
+            files.append((SCALES_FILE, 4))
+        return files
+
+    def add(self, entries: Iterable[Tuple[str, str, Dict[str, Any]]], batch_size: int = 1024) -> int:
+        """
+        Embeds and appends entries, skipping those already indexed unchanged.
+
+        Args:
+            entries (Iterable[Tuple[str, str, Dict[str, Any]]]): (key, text,
+                payload) triples; payload["kind"] must be one of KINDS. A key
+                whose text changed gets a new row and its old row is deleted.
+            batch_size (int): Texts embedded per call.
+
+        Returns:
+            int: The number of rows added.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # Drop rows a crashed run wrote after the last saved count, so that
+        # row numbers and items.jsonl line numbers stay aligned
+        for name, row_size in self._files():
+            with open(self._file(name), 'ab') as f:
+                f.truncate(len(self) * row_size)
+        items_path = self._file(ITEMS_FILE)
+        if os.path.exists(items_path):
+            jsonl.truncate(items_path, len(self))
+
+        added = 0
+        batch = []
+        for key, text, payload in entries:
+            text_hash = _text_hash(text)
+            previous = jsonl.get(items_path, key, None) if len(self) else None
+            if previous is not None and previous["hash"] == text_hash:
+                continue
+            batch.append((key, text, payload, text_hash, previous))
+            if len(batch) >= batch_size:
+                added += self._append(batch)
+                batch = []
+        if batch:
+            added += self._append(batch)
+        return added
+
+    def _append(self, batch: List[tuple]) -> int:
+        vectors = self.embedder.embed([text for _, text, _, _, _ in batch]).astype(np.float32)
+        flags = np.array([KINDS.index(payload["kind"]) for _, _, payload, _, _ in batch], dtype=np.uint8)
+        if self.quantized:
+            codes, scales = _quantize(vectors)
+            data = {VECTORS_FILE: codes, SCALES_FILE: scales, FLAGS_FILE: flags}
+        else:
+            data = {VECTORS_FILE: vectors, FLAGS_FILE: flags}
+        for name, array in data.items():
+            with open(self._file(name), 'ab') as f:
+                f.write(array.tobytes())
+
+        start = len(self)
+        items = [
+            {"key": key, "row": start + i, "hash": text_hash, **payload}
+            for i, (key, _, payload, text_hash, _) in enumerate(batch)
+        ]
+        jsonl.dump(items, self._file(ITEMS_FILE), mode='a', index_key='key')
+
+        # Older versions of re-added keys no longer match
+        stale = [previous["row"] for *_, previous in batch if previous is not None]
+        if stale:
+            with open(self._file(FLAGS_FILE), 'r+b') as f:
+                for row in stale:
+                    f.seek(row)
+                    f.write(bytes([DELETED]))
+
+        self.meta["count"] = start + len(batch)
+        self._write_meta()
+        return len(batch)
+
+    def _map(self) -> None:
+        if self._mapped_count == len(self):
+            return
+        count = len(self)
+        dtype = np.int8 if self.quantized else np.float32
+        self._vectors = np.memmap(self._file(VECTORS_FILE), dtype=dtype, mode='r', shape=(count, self.dim))
+        self._flags = np.memmap(self._file(FLAGS_FILE), dtype=np.uint8, mode='r', shape=(count,))
+        if self.quantized:
+            self._scales = np.memmap(self._file(SCALES_FILE), dtype=np.float32, mode='r', shape=(count,))
+        self._mapped_count = count
+
+    def _score_block(self, start: int, queries: np.ndarray, k: int,
+                     kind: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        end = min(start + BLOCK_ROWS, len(self))
+        block = self._vectors[start:end]
+        if self.quantized:
+            # Decode into a reused per-thread buffer instead of a new array per block
+            buffer = getattr(self._local, 'buffer', None)
+            if buffer is None or buffer.shape[1] != self.dim:
+                buffer = self._local.buffer = np.empty((BLOCK_ROWS, self.dim), dtype=np.float32)
+            decoded = buffer[:end - start]
+            np.copyto(decoded, block, casting='unsafe')
+            scores = decoded @ queries.T
+            scores *= self._scales[start:end, None]
+        else:
+            scores = np.asarray(block) @ queries.T
+        flags = self._flags[start:end]
+        excluded = flags == DELETED if kind is None else flags != kind
+        scores[excluded] = -np.inf
+
+        # Top k of the block per query, as (queries, k) scores and rows
+        k = min(k, end - start)
+        top = np.argpartition(-scores, k - 1, axis=0)[:k].T
+        return np.take_along_axis(scores.T, top, axis=1), top + start
+
+    def search_vectors(self, queries: np.ndarray, k: int = 10,
+                       kind: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k rows most similar to each query vector.
+
+        Args:
+            queries (np.ndarray): (n, dim) or (dim,) normalised query vectors;
+                                  several queries share one pass over the data.
+            k (int): Number of results per query.
+            kind (Optional[str]): Restrict results to one of KINDS.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Cosine scores and row numbers, each
+            (n, k) and sorted best first; rows excluded by `kind` or deleted
+            are left out (score -inf, row -1) when fewer than k remain.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        self.refresh()
+        self._map()
+        if not len(self):
+            return np.empty((len(queries), 0), np.float32), np.empty((len(queries), 0), np.intp)
+        kind_code = None if kind is None else KINDS.index(kind)
+        starts = range(0, len(self), BLOCK_ROWS)
+        if self.workers > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(self.workers) as pool:
+                parts = list(pool.map(lambda s: self._score_block(s, queries, k, kind_code), starts))
+        else:
+            parts = [self._score_block(start, queries, k, kind_code) for start in starts]
+
+        scores = np.concatenate([part[0] for part in parts], axis=1)
+        rows = np.concatenate([part[1] for part in parts], axis=1)
+        order = np.argsort(-scores, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        rows = np.where(np.isfinite(scores), np.take_along_axis(rows, order, axis=1), -1)
+        return scores, rows
+
+    def search(self, query: Union[str, np.ndarray], k: int = 10,
+               kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the payloads of the k entries most similar to `query`.
+
+        Args:
+            query (Union[str, np.ndarray]): Query text or vector.
+            k (int): Number of results.
+            kind (Optional[str]): Restrict results to one of KINDS.
+
+        Returns:
+            List[Dict[str, Any]]: Items (key, payload and "score"), best first.
+        """
+        if isinstance(query, str):
+            # Embedded with the embedder of the current index version
+            self.refresh()
+            query = self.embedder.embed_query(query)
+        scores, rows = self.search_vectors(query, k, kind)
+        items_path = self._file(ITEMS_FILE)
+        results = []
+        for score, row in zip(scores[0], rows[0]):
+            if row < 0:
+                break
+            item = jsonl.seek(items_path, int(row))
+            item["score"] = round(float(score), 4)
+            results.append(item)
+        return results
+
+
+def form_entries(forms_file: str = 'forms.jsonl') -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yields an index entry (title and description) for every form in `forms_file`."""
+    if not os.path.exists(forms_file):
+        return
+    for form in jsonl.stream_load(forms_file):
+        text = f"{form.get('title', '')}\n{form.get('description', '')}"
+        payload = {"kind": 'form', "url": form.get("url"), "title": form.get("title", "")}
+        yield f"form:{form.get('url')}", text, payload
+
+
+def answer_entries(responses_file: str = 'syntetic_data.jsonl') -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Yields an index entry for every paragraph answer in `responses_file`.
+
+    Answers of at least MIN_PARAGRAPH_WORDS words count as paragraphs; short
+    ones (names, ages, e-mails) carry no meaning worth searching.
+    """
+    if not os.path.exists(responses_file):
+        return
+    for record in jsonl.stream_load(responses_file):
+        for question_id, answer in record.get("answers", {}).items():
+            values = [a.get("value", "") for a in answer.get("textAnswers", {}).get("answers", [])]
+            text = "\n".join(values)
+            if len(text.split()) < MIN_PARAGRAPH_WORDS:
+                continue
+            payload = {
+                "kind": 'answer',
+                "responseId": record.get("responseId"),
+                "formId": record.get("formId"),
+                "questionId": question_id,
+                "snippet": text[:200],
+            }
+            yield f"answer:{record.get('responseId')}:{question_id}", text, payload
+
+
+def build(path: str = INDEX_DIR, forms_file: str = 'forms.jsonl',
+          responses_file: str = 'syntetic_data.jsonl', embedder=None,
+          quantize: bool = False) -> SemanticIndex:
+    """Indexes new or changed forms and paragraph answers into the index at `path`."""
+    index = SemanticIndex(path, embedder, quantize)
+    forms = index.add(form_entries(forms_file))
+    answers = index.add(answer_entries(responses_file))
+    print(f"Indexed {forms} forms and {answers} answers ({len(index)} rows in {path})")
+    return index
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    index = build()
+    for hit in index.search('opieka nad zwierzętami w schronisku', k=5):
+        print(hit["score"], hit["key"], hit.get("title") or hit.get("snippet"))
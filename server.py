@@ -0,0 +1,356 @@
+"""
+HTTP service for the search front end: offer search, offer details and
+candidate submissions, backed by the local stores (forms.jsonl, text_index,
+semantic_index) instead of cloud services.
+
+    python main.py serve --workers 4
+    curl 'http://127.0.0.1:8000/api/offers/search?q=wolontariat+schronisko'
+
+Responses are encoded once and kept in an in-process LRU cache, keyed (like
+the ETag) by the versions of forms.jsonl and the index that produced them,
+so index updates show up at once; every JSON response carries an ETag and
+answers a matching If-None-Match with 304. Bodies are gzipped. Endpoints are
+plain functions, run on uvicorn's thread pool, since they read files and
+wait for fsync.
+Each uvicorn worker is a separate process with its own caches and index
+handles; the supervisor process keeps the text index up to date with
+forms.jsonl (the indexes allow a single writer and many readers).
+
+Settings are read from the environment so that every worker sees them:
+FORMS_FILE, TEXT_INDEX_DIR, SEMANTIC_INDEX_DIR, SUBMISSIONS_FILE,
+SEARCH_CACHE_SIZE and SEARCH_CACHE_TTL.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Literal
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+import jsonl
+import text_index
+
+FORMS_FILE = os.environ.get("FORMS_FILE", "forms.jsonl")
+TEXT_INDEX_DIR = os.environ.get("TEXT_INDEX_DIR", text_index.INDEX_DIR)
+SEMANTIC_INDEX_DIR = os.environ.get("SEMANTIC_INDEX_DIR", "semantic_index")
+SUBMISSIONS_FILE = os.environ.get("SUBMISSIONS_FILE", "submissions.jsonl")
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "10000"))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "10"))
+
+# Seconds between checks of forms.jsonl for changes, per worker.
+RELOAD_INTERVAL = 1.0
+# Seconds between text index updates done by the `serve` supervisor.
+INDEX_REFRESH_INTERVAL = 10.0
+
+INDEX_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.html")
+
+
+def offer_id(url: str) -> str:
+    """Short stable id of an offer, derived from its form URL."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+class LRUCache:
+    """Least recently used cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class OfferStore:
+    """The rows of forms.jsonl by offer id, reloaded when the file changes."""
+
+    def __init__(self, forms_file: str = FORMS_FILE):
+        self.forms_file = forms_file
+        self.generation = 0
+        self._offers: dict[str, dict[str, Any]] = {}
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Reloads the offers if forms.jsonl changed (checked at most once per RELOAD_INTERVAL)."""
+        now = time.monotonic()
+        if now - self._checked < RELOAD_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.forms_file)
+            except FileNotFoundError:
+                return
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self._stamp:
+                return
+            offers = {}
+            for row in jsonl.stream_load(self.forms_file):
+                if row.get("url"):
+                    offers[offer_id(row["url"])] = {"id": offer_id(row["url"]), **row}
+            self._offers, self._stamp = offers, stamp
+            self.generation += 1
+
+    def get(self, offer: str) -> dict[str, Any] | None:
+        self.refresh()
+        return self._offers.get(offer)
+
+
+class CandidateSubmission(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
+    email: str = Field(pattern=r"^[^@\s]+@[^@\s]+$", max_length=320)
+    age: int | None = Field(default=None, ge=0, le=130)
+    # Answers to the offer's questions, keyed by question title
+    answers: dict[str, str] = Field(default_factory=dict, max_length=50)
+
+
+def _encode(data: Any, version: tuple = ()) -> tuple[bytes, str]:
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha1(repr(version).encode("utf-8") + body).hexdigest()[:20]
+    return body, f'W/"{digest}"'
+
+
+def _respond(request: Request, encoded: tuple[bytes, str], max_age: int) -> Response:
+    body, etag = encoded
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _offer_summary(hit: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": offer_id(hit["url"]),
+        "url": hit["url"],
+        "title": hit.get("title", ""),
+        "description": hit.get("description", ""),
+        "start_date": hit.get("start_date"),
+        "end_date": hit.get("end_date"),
+        "score": hit["score"],
+    }
+
+
+def _response_record(offer: dict[str, Any], submission: CandidateSubmission) -> dict[str, Any]:
+    """A submission in the shape of a Forms API response, as read by ai.screen."""
+    values = {"name": submission.name, "email": submission.email}
+    if submission.age is not None:
+        values["age"] = str(submission.age)
+    values.update(submission.answers)
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "responseId": uuid.uuid4().hex,
+        "formId": offer["id"],
+        "formUrl": offer["url"],
+        "createTime": now,
+        "lastSubmittedTime": now,
+        "answers": {
+            question: {"questionId": question, "textAnswers": {"answers": [{"value": value}]}}
+            for question, value in values.items()
+        },
+    }
+
+
+def create_app(
+    forms_file: str | None = None,
+    text_index_dir: str | None = None,
+    semantic_index_dir: str | None = None,
+    submissions_file: str | None = None,
+) -> FastAPI:
+    """
+    Builds the application; one instance per worker process.
+
+    Paths left out are read from the environment when the app is built,
+    which is how `serve` configures its workers.
+    """
+    forms_file = forms_file or os.environ.get("FORMS_FILE", FORMS_FILE)
+    text_index_dir = text_index_dir or os.environ.get("TEXT_INDEX_DIR", TEXT_INDEX_DIR)
+    semantic_index_dir = semantic_index_dir or os.environ.get("SEMANTIC_INDEX_DIR", SEMANTIC_INDEX_DIR)
+    submissions_file = submissions_file or os.environ.get("SUBMISSIONS_FILE", SUBMISSIONS_FILE)
+    offers = OfferStore(forms_file)
+    texts = text_index.TextIndex(text_index_dir)
+    cache = LRUCache()
+    semantic = {}
+    semantic_lock = threading.Lock()
+    writer = {}
+
+    def semantic_index():
+        with semantic_lock:
+            if "index" not in semantic:
+                if not os.path.exists(os.path.join(semantic_index_dir, "meta.json")):
+                    raise HTTPException(503, "Semantic index not built (python main.py semantic-index).")
+                import semantic_index as module
+
+                semantic["index"] = module.SemanticIndex(semantic_index_dir)
+        index = semantic["index"]
+        # Picks up rows added (or a rebuild) by another process, like TextIndex.search
+        index.refresh()
+        return index
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Workers share the file; every submission is synced before it is
+        # acknowledged, in batches with the ones that arrived meanwhile
+        writer["jsonl"] = jsonl.JsonlWriter(submissions_file, flush_interval=None, fsync=True)
+        try:
+            yield
+        finally:
+            writer["jsonl"].close()
+
+    app = FastAPI(title="HackYeah 2025 offers", lifespan=lifespan)
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    def cached(key: tuple, build: Callable[[], Any]) -> tuple[bytes, str]:
+        encoded = cache.get(key)
+        if encoded is None:
+            encoded = _encode(build(), key)
+            cache.put(key, encoded)
+        return encoded
+
+    @app.get("/", include_in_schema=False)
+    async def index_page():
+        return FileResponse(INDEX_HTML, headers={"Cache-Control": "public, max-age=300"})
+
+    @app.get("/api/offers/search")
+    def search_offers(
+        request: Request,
+        q: str = Query(min_length=1, max_length=200),
+        k: int = Query(10, ge=1, le=100),
+        mode: Literal["text", "semantic"] = "text",
+    ):
+        if mode == "semantic":
+            index = semantic_index()
+        else:
+            index = texts
+            index.refresh()
+
+        def build():
+            hits = index.search(q, k, "form")
+            return {"query": q, "mode": mode, "results": [_offer_summary(hit) for hit in hits]}
+
+        # A changed forms.jsonl or index invalidates cached results and their ETags
+        offers.refresh()
+        key = ("search", " ".join(q.casefold().split()), k, mode, offers.generation, index.stamp)
+        return _respond(request, cached(key, build), max_age=30)
+
+    @app.get("/api/offers/{offer}")
+    def get_offer(request: Request, offer: str):
+        data = offers.get(offer)
+        if data is None:
+            raise HTTPException(404, "Offer not found.")
+        return _respond(request, cached(("offer", offer, offers.generation), lambda: data), max_age=60)
+
+    @app.post("/api/offers/{offer}/candidates", status_code=201)
+    def submit_candidate(offer: str, submission: CandidateSubmission):
+        data = offers.get(offer)
+        if data is None:
+            raise HTTPException(404, "Offer not found.")
+        record = _response_record(data, submission)
+        # May wait for another request's fsync, which then covers this record too
+        submissions = writer["jsonl"]
+        submissions.sync(submissions.write(record))
+        return {"responseId": record["responseId"], "offer": offer}
+
+    @app.get("/api/stats")
+    def stats():
+        return {
+            "pid": os.getpid(),
+            "cache": {"entries": len(cache), "hits": cache.hits, "misses": cache.misses},
+            "offers_generation": offers.generation,
+            "indexed_documents": len(texts),
+        }
+
+    return app
+
+
+def _keep_index_fresh(path: str, forms_file: str, interval: float) -> None:
+    index = text_index.TextIndex(path)
+    while True:
+        time.sleep(interval)
+        try:
+            index.update({forms_file: "form"})
+            index.wait()
+        except (OSError, ValueError) as e:
+            print(f"Text index update failed: {e}")
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int | None = None,
+    forms_file: str = FORMS_FILE,
+    text_index_dir: str = TEXT_INDEX_DIR,
+    semantic_index_dir: str = SEMANTIC_INDEX_DIR,
+    submissions_file: str = SUBMISSIONS_FILE,
+) -> None:
+    """
+    Runs the service with uvicorn in `workers` processes (default: one per CPU).
+
+    Before the workers start, the text index is brought up to date with
+    `forms_file`; afterwards this process re-indexes new forms every
+    INDEX_REFRESH_INTERVAL seconds and the workers pick them up.
+    """
+    import uvicorn
+
+    os.environ.update(
+        FORMS_FILE=forms_file,
+        TEXT_INDEX_DIR=text_index_dir,
+        SEMANTIC_INDEX_DIR=semantic_index_dir,
+        SUBMISSIONS_FILE=submissions_file,
+    )
+    text_index.TextIndex(text_index_dir).update({forms_file: "form"})
+    threading.Thread(
+        target=_keep_index_fresh,
+        args=(text_index_dir, forms_file, INDEX_REFRESH_INTERVAL),
+        daemon=True,
+    ).start()
+    workers = workers or os.cpu_count() or 1
+    uvicorn.run(
+        # Every worker process builds its own app, configured through the environment
+        "server:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        # Per-request access logging costs more than a cached response
+        access_log=False,
+        log_level="warning",
+        backlog=2048,
+        timeout_keep_alive=30,
+    )
+
+
+if __name__ == "__main__":
+    serve()
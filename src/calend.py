@@ -1,53 +1,24 @@
 import datetime
-import os.path
+import sys
+from pathlib import Path
 from pprint import pprint
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from google_calendar_dataclasses import CalendarEvents, CalendarListEntry
-
-# If modifying these scopes, delete the file token.json.
-SCOPES = [
-    "https://www.googleapis.com/auth/calendar.readonly",
-    # "https://www.googleapis.com/auth/calendar.events.owned",
-    "https://www.googleapis.com/auth/forms.body",
-]
+if __package__ in (None, ""):
+    # Run as a script (`python src/calend.py`): make the repository root importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from pathlib import Path
-import os
-
-cred_path = (
-    Path(os.getcwd()) / ".." / "client_secret.apps.googleusercontent.com.json"
-).resolve()
+from google_clients import get_service
+from src.google_calendar_dataclasses import CalendarEvents, CalendarListEntry
 
 
 def main():
     """Shows basic usage of the Google Calendar API.
     Prints the start and name of the next 10 events on the user's calendar.
     """
-    creds = None
-    # The file token.json stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
     try:
-        service = build("calendar", "v3", credentials=creds)
+        service = get_service("calendar", "v3")
 
         calendar = CalendarListEntry.from_dict(
             service.calendarList()
@@ -1,7 +1,9 @@
-with open(".env") as f:
-    api_key = f.read()
-
-print(api_key)
+def main():
+    with open(".env") as f:
+        api_key = f.read()
 
+    print(api_key)
 
 
+if __name__ == "__main__":
+    main()
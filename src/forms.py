@@ -1,33 +1,14 @@
+import sys
+from pathlib import Path
 from pprint import pprint
 from typing import TypedDict
-from apiclient import discovery
-from httplib2 import Http
-from oauth2client import client, file, tools
-
-from google_dataclases import GoogleForm
-
-SCOPES = "https://www.googleapis.com/auth/forms.body"
-DISCOVERY_DOC = "https://forms.googleapis.com/$discovery/rest?version=v1"
-
-
-from pathlib import Path
-import os
 
-cred_path = (Path(os.getcwd()) / ".." / "client_secret.apps.googleusercontent.com.json").resolve()
+if __package__ in (None, ""):
+    # Run as a script (`python src/forms.py`): make the repository root importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-store = file.Storage("token.json")
-creds = None
-if not creds or creds.invalid:
-  flow = client.flow_from_clientsecrets(cred_path, SCOPES)
-  creds = tools.run_flow(flow, store)
-
-form_service = discovery.build(
-    "forms",
-    "v1",
-    http=creds.authorize(Http()),
-    discoveryServiceUrl=DISCOVERY_DOC,
-    static_discovery=False,
-)
+from google_clients import get_service
+from src.google_dataclases import GoogleForm
 
 # Request body for creating a form
 NEW_FORM = {
@@ -70,17 +51,27 @@ NEW_QUESTION = {
 
 # Creates the initial form
 def create_form():
+    form_service = get_service("forms", "v1")
     result = form_service.forms().create(body=NEW_FORM).execute()
 
-
-# Adds the question to the form
+    # Adds the question to the form
     question_setting = (
         form_service.forms()
         .batchUpdate(formId=result["formId"], body=NEW_QUESTION)
         .execute()
     )
+    return result["formId"]
+
+
+def main():
+    form_id = create_form()
+
+    # Prints the result to show the question has been added
+    get_result: GoogleForm = (
+        get_service("forms", "v1").forms().get(formId=form_id).execute()
+    )
+    pprint(get_result)
 
 
-# Prints the result to show the question has been added
-get_result : GoogleForm  = form_service.forms().get(formId=form_id).execute()
-pprint(get_result)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
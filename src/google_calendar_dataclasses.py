@@ -1,39 +1,52 @@
 from dataclasses import dataclass, field
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
+
+from src.lazy_model import LazyList, LazyView, RawField
 
 # This file contains dataclasses that model the JSON response structure
 # from the Google Calendar API for a list of events.
+#
+# All classes are slotted and frozen, so equal sub-objects (an organizer,
+# an attendee, the reminder settings) can be shared between events. `from_dict(data,
+# lazy=True)` returns read-only views over the raw dicts instead, which
+# build nested objects (items, attendees) only when they are accessed.
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DefaultReminder:
     """Represents a default reminder for the calendar."""
     method: str
     minutes: int
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Creator:
     """Represents the creator of an event."""
     email: str
     self: Optional[bool] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EventDateTime:
     """Represents the start or end time of an event."""
-    dateTime: str
-    timeZone: str
+    dateTime: Optional[str] = None
+    timeZone: Optional[str] = None
+    # Set instead of dateTime for all-day events
+    date: Optional[str] = None
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict) -> 'EventDateTime':
+        return cls(data.get('dateTime'), data.get('timeZone'), data.get('date'))
+
+@dataclass(slots=True, frozen=True)
 class Organizer:
     """Represents the organizer of an event."""
     email: str
     self: Optional[bool] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Reminders:
     """Represents reminder settings for an event."""
     useDefault: bool
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Attendee:
     """Represents an attendee of an event."""
     email: str
@@ -42,12 +55,68 @@ class Attendee:
     organizer: Optional[bool] = None
     self: Optional[bool] = None
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Attendee':
+        return cls(
+            data.get('email', ''),
+            data.get('responseStatus', 'needsAction'),
+            data.get('displayName'),
+            data.get('organizer'),
+            data.get('self'),
+        )
+
+
+def _attendees(data: list) -> List[Attendee]:
+    return [Attendee.from_dict(attendee) for attendee in data]
+
+
+class _Interner:
+    """Returns one shared instance per distinct value of a small frozen class."""
+
+    def __init__(self):
+        self._creators: Dict[tuple, Creator] = {}
+        self._organizers: Dict[tuple, Organizer] = {}
+        self._reminders: Dict[bool, Reminders] = {}
+        self._attendees: Dict[tuple, Attendee] = {}
+
+    def creator(self, data: dict) -> Creator:
+        key = (data.get('email', ''), data.get('self'))
+        if key not in self._creators:
+            self._creators[key] = Creator(*key)
+        return self._creators[key]
+
+    def organizer(self, data: dict) -> Organizer:
+        key = (data.get('email', ''), data.get('self'))
+        if key not in self._organizers:
+            self._organizers[key] = Organizer(*key)
+        return self._organizers[key]
+
+    def attendees(self, data: list) -> List[Attendee]:
+        # The same people are usually invited to many events
+        attendees = []
+        for attendee in data:
+            get = attendee.get
+            key = (get('email', ''), get('responseStatus', 'needsAction'),
+                   get('displayName'), get('organizer'), get('self'))
+            shared = self._attendees.get(key)
+            if shared is None:
+                shared = self._attendees[key] = Attendee(*key)
+            attendees.append(shared)
+        return attendees
+
+    def reminders(self, data: dict) -> Reminders:
+        key = data.get('useDefault', False)
+        if key not in self._reminders:
+            self._reminders[key] = Reminders(key)
+        return self._reminders[key]
+
+
+@dataclass(slots=True, frozen=True)
 class EventItem:
     """Represents a single event item in the calendar."""
     kind: str
     etag: str
-    _id: str
+    id: str
     status: str
     htmlLink: str
     created: str
@@ -67,8 +136,90 @@ class EventItem:
     guestsCanInviteOthers: Optional[bool] = None
     guestsCanSeeOtherGuests: Optional[bool] = None
 
+    @classmethod
+    def from_dict(cls, item: dict, lazy: bool = False, _interner: Optional[_Interner] = None):
+        """Creates an EventItem (or, if `lazy`, a LazyEventItem) from an events resource."""
+        if lazy:
+            return LazyEventItem(item)
+        interner = _interner or _Interner()
+        get = item.get
+        return cls(
+            get('kind', 'calendar#event'),
+            get('etag', ''),
+            item['id'],
+            get('status', 'confirmed'),
+            get('htmlLink', ''),
+            get('created', ''),
+            get('updated', ''),
+            get('summary', ''),
+            interner.creator(get('creator', {})),
+            interner.organizer(get('organizer', {})),
+            EventDateTime.from_dict(get('start', {})),
+            EventDateTime.from_dict(get('end', {})),
+            get('iCalUID', ''),
+            get('sequence', 0),
+            interner.reminders(get('reminders', {})),
+            get('eventType', 'default'),
+            get('description'),
+            get('location'),
+            interner.attendees(get('attendees', ())),
+            get('guestsCanInviteOthers'),
+            get('guestsCanSeeOtherGuests'),
+        )
+
+    @classmethod
+    def from_dicts(cls, items: List[dict], lazy: bool = False) -> list:
+        """
+        Creates many events at once, e.g. a whole events.list page.
+
+        Creators, organizers, attendees and reminder settings are shared
+        between the events instead of being built once per event. With
+        `lazy` the result is a LazyList converting each event on first access.
+        """
+        if lazy:
+            return LazyList(items, LazyEventItem)
+        interner = _Interner()
+        from_dict = cls.from_dict
+        return [from_dict(item, False, interner) for item in items]
+
+
+class LazyEventItem(LazyView):
+    """EventItem-compatible read-only view over a raw events resource."""
+
+    __slots__ = ()
+
+    # Defaults match EventItem.from_dict, so sparse events read the same either way
+    kind = RawField('kind', default='calendar#event')
+    etag = RawField('etag', default='')
+    id = RawField('id')
+    status = RawField('status', default='confirmed')
+    htmlLink = RawField('htmlLink', default='')
+    created = RawField('created', default='')
+    updated = RawField('updated', default='')
+    summary = RawField('summary', default='')
+    creator = RawField('creator', lambda data: Creator(data.get('email', ''), data.get('self')),
+                       default={})
+    organizer = RawField('organizer', lambda data: Organizer(data.get('email', ''), data.get('self')),
+                         default={})
+    start = RawField('start', EventDateTime.from_dict, default={})
+    end = RawField('end', EventDateTime.from_dict, default={})
+    iCalUID = RawField('iCalUID', default='')
+    sequence = RawField('sequence', default=0)
+    reminders = RawField('reminders', lambda data: Reminders(data.get('useDefault', False)),
+                         default={})
+    eventType = RawField('eventType', default='default')
+    description = RawField('description')
+    location = RawField('location')
+    attendees = RawField('attendees', _attendees, default=())
+    guestsCanInviteOthers = RawField('guestsCanInviteOthers')
+    guestsCanSeeOtherGuests = RawField('guestsCanSeeOtherGuests')
+
+    def materialize(self) -> EventItem:
+        """Builds the equivalent eager EventItem."""
+        return EventItem.from_dict(self._data)
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class CalendarEvents:
     """Represents the top-level structure for a list of calendar events."""
     kind: str
@@ -80,36 +231,66 @@ class CalendarEvents:
     description: Optional[str] = None
     defaultReminders: List[DefaultReminder] = field(default_factory=list)
     items: List[EventItem] = field(default_factory=list)
+    nextPageToken: Optional[str] = None
 
     @classmethod
-    def from_dict(cls, data: dict):
-        """Creates a CalendarEvents object from a dictionary."""
-        items_data = data.get('items', [])
-        items = [EventItem(
-            attendees=[Attendee(**attendee) for attendee in item.get('attendees', [])],
-            creator=Creator(**item.get('creator', {})),
-            organizer=Organizer(**item.get('organizer', {})),
-            start=EventDateTime(**item.get('start', {})),
-            end=EventDateTime(**item.get('end', {})),
-            reminders=Reminders(**item.get('reminders', {})),
-            **{k: v for k, v in item.items() if k not in ['attendees', 'creator', 'organizer', 'start', 'end', 'reminders']}
-        ) for item in items_data]
-
-        default_reminders_data = data.get('defaultReminders', [])
-        default_reminders = [DefaultReminder(**reminder) for reminder in default_reminders_data]
+    def from_dict(cls, data: dict, lazy: bool = False):
+        """
+        Creates a CalendarEvents object from an events.list response.
 
+        With `lazy=True` returns a LazyCalendarEvents view of `data`, whose
+        events are only converted when accessed.
+        """
+        if lazy:
+            return LazyCalendarEvents(data)
         return cls(
-            items=items,
-            defaultReminders=default_reminders,
-            **{k: v for k, v in data.items() if k not in ['items', 'defaultReminders']}
+            kind=data.get('kind', 'calendar#events'),
+            etag=data.get('etag', ''),
+            summary=data.get('summary', ''),
+            updated=data.get('updated', ''),
+            timeZone=data.get('timeZone', ''),
+            accessRole=data.get('accessRole', ''),
+            description=data.get('description'),
+            defaultReminders=[
+                DefaultReminder(reminder['method'], reminder['minutes'])
+                for reminder in data.get('defaultReminders', ())
+            ],
+            items=EventItem.from_dicts(data.get('items', ())),
+            nextPageToken=data.get('nextPageToken'),
         )
 
-@dataclass
+
+class LazyCalendarEvents(LazyView):
+    """CalendarEvents-compatible read-only view over a raw events.list response."""
+
+    __slots__ = ()
+
+    kind = RawField('kind', default='calendar#events')
+    etag = RawField('etag', default='')
+    summary = RawField('summary', default='')
+    updated = RawField('updated', default='')
+    timeZone = RawField('timeZone', default='')
+    accessRole = RawField('accessRole', default='')
+    description = RawField('description')
+    defaultReminders = RawField(
+        'defaultReminders',
+        lambda data: [DefaultReminder(r['method'], r['minutes']) for r in data],
+        default=(),
+    )
+    items = RawField('items', lambda data: EventItem.from_dicts(data, lazy=True), default=())
+    nextPageToken = RawField('nextPageToken')
+
+    def materialize(self) -> CalendarEvents:
+        """Builds the equivalent eager CalendarEvents."""
+        return CalendarEvents.from_dict(self._data)
+
+
+@dataclass(slots=True, frozen=True)
 class ConferenceProperties:
     """Represents the conference properties for the calendar."""
     allowedConferenceSolutionTypes: List[str]
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CalendarListEntry:
     """Represents a single entry from a user's calendar list."""
     kind: str
@@ -128,9 +309,18 @@ class CalendarListEntry:
     def from_dict(cls, data: dict):
         """Creates a CalendarListEntry object from a dictionary."""
         conference_props_data = data.get('conferenceProperties', {})
-        conference_props = ConferenceProperties(**conference_props_data)
-
         return cls(
-            conferenceProperties=conference_props,
-            **{k: v for k, v in data.items() if k != 'conferenceProperties'}
+            kind=data.get('kind', 'calendar#calendarListEntry'),
+            etag=data.get('etag', ''),
+            id=data['id'],
+            summary=data.get('summary', ''),
+            timeZone=data.get('timeZone', ''),
+            colorId=data.get('colorId', ''),
+            backgroundColor=data.get('backgroundColor', ''),
+            foregroundColor=data.get('foregroundColor', ''),
+            accessRole=data.get('accessRole', ''),
+            conferenceProperties=ConferenceProperties(
+                conference_props_data.get('allowedConferenceSolutionTypes', [])
+            ),
+            defaultReminders=data.get('defaultReminders', []),
         )
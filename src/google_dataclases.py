@@ -1,116 +1,166 @@
-import json
 from dataclasses import dataclass
-from pprint import pprint
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-# Define dataclasses from the most nested part outwards
+from src.lazy_model import LazyList, LazyView, RawField
 
-@dataclass
+# Define dataclasses from the most nested part outwards. All of them are
+# slotted and frozen; `GoogleForm.from_dict(data, lazy=True)` returns a
+# LazyGoogleForm view instead, which builds nested objects only on access.
+
+@dataclass(slots=True, frozen=True)
 class Option:
     value: str
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Option':
+        return cls(value=data["value"])
+
+@dataclass(slots=True, frozen=True)
 class ChoiceQuestion:
     type: str
     options: List[Option]
     shuffle: bool
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChoiceQuestion':
+        return cls(
+            type=data["type"],
+            options=[Option(opt["value"]) for opt in data.get("options", ())],
+            shuffle=data.get("shuffle", False)
+        )
+
+@dataclass(slots=True, frozen=True)
+class TextQuestion:
+    paragraph: bool
+
+@dataclass(slots=True, frozen=True)
 class Question:
     question_id: str
     required: bool
-    choice_question: ChoiceQuestion
+    choice_question: Optional[ChoiceQuestion] = None
+    text_question: Optional[TextQuestion] = None
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Question':
+        cq_data = data.get("choiceQuestion")
+        tq_data = data.get("textQuestion")
+        return cls(
+            question_id=data["questionId"],
+            required=data.get("required", False),
+            choice_question=ChoiceQuestion.from_dict(cq_data) if cq_data is not None else None,
+            text_question=TextQuestion(tq_data.get("paragraph", False)) if tq_data is not None else None
+        )
+
+@dataclass(slots=True, frozen=True)
 class QuestionItem:
     question: Question
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Item:
     item_id: str
     title: str
-    question_item: QuestionItem
+    question_item: Optional[QuestionItem]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Item':
+        qi_data = data.get("questionItem")
+        return cls(
+            item_id=data["itemId"],
+            title=data.get("title", ""),
+            question_item=QuestionItem(Question.from_dict(qi_data["question"])) if qi_data is not None else None
+        )
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Info:
     title: str
     document_title: str
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Info':
+        return cls(title=data["title"], document_title=data.get("documentTitle", ""))
+
+@dataclass(slots=True, frozen=True)
 class Settings:
     email_collection_type: str
-    
-@dataclass
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Settings':
+        return cls(email_collection_type=data.get("emailCollectionType", ""))
+
+@dataclass(slots=True, frozen=True)
 class PublishState:
     is_published: bool
     is_accepting_responses: bool
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PublishSettings:
     publish_state: PublishState
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PublishSettings':
+        state = data.get("publishState", {})
+        return cls(
+            publish_state=PublishState(
+                is_published=state.get("isPublished", False),
+                is_accepting_responses=state.get("isAcceptingResponses", False)
+            )
+        )
+
 # Main dataclass for the entire form
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GoogleForm:
     form_id: str
     info: Info
-    settings: Settings
+    settings: Optional[Settings]
     revision_id: str
     responder_uri: str
     items: List[Item]
-    publish_settings: PublishSettings
-    
+    publish_settings: Optional[PublishSettings]
+
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'GoogleForm':
+    def from_dict(cls, data: Dict[str, Any], lazy: bool = False):
         """
-        Manually creates a GoogleForm instance from a dictionary.
+        Creates a GoogleForm instance from a forms.get response.
+
+        With `lazy=True` returns a LazyGoogleForm wrapping `data` instead;
+        its nested objects are only built when first accessed.
         """
-        # Create nested items by processing the dictionary data
-        info_obj = Info(
-            title=data["info"]["title"], 
-            document_title=data["info"]["documentTitle"]
-        )
-        
-        settings_obj = Settings(
-            email_collection_type=data["settings"]["emailCollectionType"]
-        )
-        
-        items_list = []
-        for item_data in data["items"]:
-            q_data = item_data["questionItem"]["question"]
-            cq_data = q_data["choiceQuestion"]
-            
-            item_obj = Item(
-                item_id=item_data["itemId"],
-                title=item_data["title"],
-                question_item=QuestionItem(
-                    question=Question(
-                        question_id=q_data["questionId"],
-                        required=q_data["required"],
-                        choice_question=ChoiceQuestion(
-                            type=cq_data["type"],
-                            options=[Option(value=opt["value"]) for opt in cq_data["options"]],
-                            shuffle=cq_data["shuffle"]
-                        )
-                    )
-                )
-            )
-            items_list.append(item_obj)
-        
-        publish_settings_obj = PublishSettings(
-            publish_state=PublishState(
-                is_published=data["publishSettings"]["publishState"]["isPublished"],
-                is_accepting_responses=data["publishSettings"]["publishState"]["isAcceptingResponses"]
-            )
-        )
-        
-        # Instantiate the main class
+        if lazy:
+            return LazyGoogleForm(data)
+        settings = data.get("settings")
+        publish_settings = data.get("publishSettings")
         return cls(
             form_id=data["formId"],
-            info=info_obj,
-            settings=settings_obj,
+            info=Info.from_dict(data["info"]),
+            settings=Settings.from_dict(settings) if settings is not None else None,
             revision_id=data["revisionId"],
             responder_uri=data["responderUri"],
-            items=items_list,
-            publish_settings=publish_settings_obj
+            items=[Item.from_dict(item) for item in data.get("items", ())],
+            publish_settings=PublishSettings.from_dict(publish_settings) if publish_settings is not None else None
         )
+
+    @classmethod
+    def from_dicts(cls, forms: List[Dict[str, Any]], lazy: bool = False) -> list:
+        """Builds many forms at once; lazily wrapped if `lazy`."""
+        if lazy:
+            return [LazyGoogleForm(data) for data in forms]
+        from_dict = cls.from_dict
+        return [from_dict(data) for data in forms]
+
+
+class LazyGoogleForm(LazyView):
+    """GoogleForm-compatible read-only view over a raw forms.get response."""
+
+    __slots__ = ()
+
+    form_id = RawField("formId")
+    info = RawField("info", Info.from_dict)
+    settings = RawField("settings", Settings.from_dict)
+    revision_id = RawField("revisionId")
+    responder_uri = RawField("responderUri")
+    items = RawField("items", lambda raw: LazyList(raw, Item.from_dict), default=())
+    publish_settings = RawField("publishSettings", PublishSettings.from_dict)
+
+    def materialize(self) -> GoogleForm:
+        """Builds the equivalent eager GoogleForm."""
+        return GoogleForm.from_dict(self._data)
@@ -0,0 +1,83 @@
+from collections.abc import Sequence
+from typing import Any, Callable, Optional
+
+# Read-through views over raw API response dicts, used by the lazy mode of
+# the models in google_dataclases and google_calendar_dataclasses.
+
+
+class LazyList(Sequence):
+    """List of raw dicts whose elements are converted on first access."""
+
+    __slots__ = ("_raw", "_factory", "_items")
+
+    def __init__(self, raw: Sequence, factory: Callable[[Any], Any]):
+        self._raw = raw
+        self._factory = factory
+        self._items: Optional[list] = None
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._raw)))]
+        if self._items is None:
+            self._items = [None] * len(self._raw)
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._factory(self._raw[index])
+        return item
+
+    def __repr__(self) -> str:
+        return f"LazyList({len(self._raw)} items)"
+
+
+class RawField:
+    """
+    Attribute of a LazyView read from the wrapped dict.
+
+    Plain values are returned straight from the dict. Values with a
+    `convert` function are converted on first access and cached.
+    """
+
+    __slots__ = ("key", "convert", "default", "name")
+
+    def __init__(self, key: str, convert: Optional[Callable[[Any], Any]] = None,
+                 default: Any = None):
+        self.key = key
+        self.convert = convert
+        self.default = default
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        if self.convert is None:
+            return view._data.get(self.key, self.default)
+        cache = view._cache
+        if cache is None:
+            cache = view._cache = {}
+        if self.name not in cache:
+            value = view._data.get(self.key, self.default)
+            cache[self.name] = None if value is None else self.convert(value)
+        return cache[self.name]
+
+
+class LazyView:
+    """Read-only view of a raw API dict; subclasses declare RawFields."""
+
+    __slots__ = ("_data", "_cache")
+
+    def __init__(self, data: dict):
+        self._data = data
+        self._cache: Optional[dict] = None
+
+    @property
+    def raw(self) -> dict:
+        """The wrapped response dict."""
+        return self._data
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
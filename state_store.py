@@ -0,0 +1,169 @@
+# state_store.py
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Default location of the provisioning state database.
+STATE_DB = os.environ.get("STATE_DB", "state.db")
+
+
+@dataclass(frozen=True)
+class FormState:
+    """Everything known about one provisioned form, keyed by its logical name."""
+    name: str
+    form_id: Optional[str] = None
+    responder_uri: Optional[str] = None
+    revision_id: Optional[str] = None
+    event_id: Optional[str] = None
+    content_hash: Optional[str] = None
+    # lastSubmittedTime of the newest response already downloaded
+    responses_watermark: Optional[str] = None
+    updated_at: float = 0.0
+
+
+_COLUMNS = [f.name for f in fields(FormState)]
+
+
+class StateStore:
+    """
+    Durable mapping of logical form names to their Google ids.
+
+    Backed by a single SQLite database in WAL mode. The whole mapping is
+    loaded with one query when the store is opened and served from memory;
+    every update is an atomic upsert, so a crash never leaves a half-written
+    record behind. Safe to share between threads.
+
+    Usage:
+        state = StateStore("state.db")
+        state.update("animal_shelter", form_id="1FAIpQL...")
+        state.get("animal_shelter").form_id
+    """
+
+    def __init__(self, path: str = STATE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS forms (
+                name TEXT PRIMARY KEY,
+                form_id TEXT,
+                responder_uri TEXT,
+                revision_id TEXT,
+                event_id TEXT,
+                content_hash TEXT,
+                responses_watermark TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        # Databases created by older versions lack the newer columns
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(forms)")}
+        for column in _COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE forms ADD COLUMN {column} TEXT")
+        self._records: Dict[str, FormState] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """Re-reads the whole mapping, picking up changes made by other processes."""
+        rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM forms").fetchall()
+        with self._lock:
+            self._records = {row[0]: FormState(*row) for row in rows}
+
+    def get(self, name: str) -> Optional[FormState]:
+        """Returns the state of a form, or None if it was never provisioned."""
+        return self._records.get(name)
+
+    def all(self) -> Dict[str, FormState]:
+        """Returns a snapshot of the whole mapping."""
+        return dict(self._records)
+
+    def update(self, name: str, **changes: Any) -> FormState:
+        """Atomically sets some fields of a form's state and returns the new state."""
+        return self.update_many([(name, changes)])[name]
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, FormState]:
+        """
+        Applies several updates in one transaction.
+
+        Only the changed columns are written, so that processes sharing the
+        database (the provisioner and the watcher) never overwrite each
+        other's fields. The affected rows are then re-read from the database.
+        """
+        merged: Dict[str, Dict[str, Any]] = {}
+        for name, changes in updates:
+            unknown = set(changes) - set(_COLUMNS[1:-1])
+            if unknown:
+                raise TypeError(f"Unknown FormState fields: {', '.join(sorted(unknown))}")
+            merged.setdefault(name, {}).update(changes)
+        if not merged:
+            return {}
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, changes in merged.items():
+                    columns = ["name", *changes, "updated_at"]
+                    placeholders = ', '.join('?' for _ in columns)
+                    assignments = ', '.join(f"{column}=excluded.{column}" for column in columns[1:])
+                    self._conn.execute(
+                        f"INSERT INTO forms ({', '.join(columns)}) VALUES ({placeholders}) "
+                        f"ON CONFLICT(name) DO UPDATE SET {assignments}",
+                        (name, *changes.values(), now),
+                    )
+                names = list(merged)
+                rows = []
+                # Stay well below SQLite's limit on bound parameters
+                for i in range(0, len(names), 500):
+                    chunk = names[i:i + 500]
+                    rows += self._conn.execute(
+                        f"SELECT {', '.join(_COLUMNS)} FROM forms "
+                        f"WHERE name IN ({', '.join('?' for _ in chunk)})",
+                        chunk,
+                    ).fetchall()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            new_records = {row[0]: FormState(*row) for row in rows}
+            self._records.update(new_records)
+            return new_records
+
+    def import_legacy_files(self, directory: str = ".") -> int:
+        """
+        Imports ids from the old per-form text files into the store.
+
+        Reads `form_id_<name>.txt` and `event_id_<name>.txt`, so that forms
+        created before the store existed keep being updated in place.
+
+        Returns:
+            int: The number of forms imported.
+        """
+        updates: Dict[str, Dict[str, Any]] = {}
+        for prefix, field_name in (("form_id_", "form_id"), ("event_id_", "event_id")):
+            for id_file in glob.glob(os.path.join(directory, f"{prefix}*.txt")):
+                name = os.path.basename(id_file)[len(prefix):-len(".txt")]
+                with open(id_file, "r") as f:
+                    value = f.read().strip()
+                if value:
+                    updates.setdefault(name, {})[field_name] = value
+        self.update_many(updates.items())
+        return len(updates)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'StateStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
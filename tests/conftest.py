@@ -0,0 +1,12 @@
+import pytest
+
+import google_clients
+from fake_google import FakeGoogle, FakeGoogleServer
+
+
+@pytest.fixture
+def fake_google(monkeypatch):
+    """Points every Google client of this process at a fresh FakeGoogleServer."""
+    with FakeGoogleServer(FakeGoogle()) as server:
+        monkeypatch.setattr(google_clients, "_factory", google_clients.ClientFactory(api_root=server.url))
+        yield server.fake
@@ -0,0 +1,218 @@
+import asyncio
+
+import pytest
+
+import ai
+import jsonl
+from llm_cache import LLMCache, cache_key
+
+
+def make_record(i: int, text: str | None = None) -> dict:
+    return {
+        "responseId": f"r{i}",
+        "answers": {
+            "q1": {"textAnswers": {"answers": [{"value": text or f"Odpowiedź kandydata {i}"}]}},
+        },
+    }
+
+
+def screen(input_file, output_file, model, **kwargs):
+    kwargs.setdefault("requests_per_minute", 60000)
+    return asyncio.run(ai.screen_async(str(input_file), str(output_file), model, **kwargs))
+
+
+class CountingModel(ai.StubModel):
+    """StubModel that records how many prompts were in flight at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().generate(prompt)
+        finally:
+            self.in_flight -= 1
+
+
+class FlakyModel(ai.StubModel):
+    """StubModel whose first `failures` calls raise errors with the given status code."""
+
+    def __init__(self, failures: int, code: int = 503):
+        super().__init__(latency=0)
+        self.failures = failures
+        self.code = code
+
+    async def generate(self, prompt: str) -> str:
+        if self.failures:
+            self.failures -= 1
+            self.calls += 1
+            error = ai.StubModelError("Injected failure.")
+            error.code = self.code
+            raise error
+        return await super().generate(prompt)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Records the backoff windows instead of sleeping through them."""
+    windows = []
+
+    def uniform(low, high):
+        windows.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(ai.random, "uniform", uniform)
+    return windows
+
+
+def test_pack_batches_respects_max_batch():
+    batches = list(ai.pack_batches((make_record(i) for i in range(60)), max_batch=25))
+
+    assert [len(batch) for batch in batches] == [25, 25, 10]
+    assert [c["responseId"] for batch in batches for c in batch] == [f"r{i}" for i in range(60)]
+
+
+def test_pack_batches_respects_token_budget():
+    records = [make_record(i, "słowo " * 200) for i in range(20)]
+    budget = 1000
+
+    batches = list(ai.pack_batches(records, token_budget=budget, max_batch=100))
+
+    assert len(batches) > 1
+    for batch in batches:
+        assert ai.estimate_tokens(ai.build_prompt(batch)) <= budget + 10 * len(batch)
+
+
+def test_pack_batches_truncates_oversized_answers_and_skips_missing_ids():
+    records = [make_record(0, "x" * 100_000), {"answers": {}}, make_record(1)]
+
+    batches = list(ai.pack_batches(records, token_budget=1000))
+
+    assert [[c["responseId"] for c in batch] for batch in batches] == [["r0"], ["r1"]]
+    assert ai.estimate_tokens(ai.build_prompt(batches[0])) <= 1000 + 10
+
+
+def test_screen_writes_one_row_per_application(tmp_path):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(200)], str(input_file))
+    model = CountingModel(latency=0.01)
+
+    stats = screen(input_file, output_file, model, max_batch=10, concurrency=8)
+
+    rows = jsonl.load(str(output_file))
+    assert stats["screened"] == 200 and stats["failed"] == 0
+    assert stats["prompts"] == model.calls == 20
+    assert sorted(row["responseId"] for row in rows) == sorted(f"r{i}" for i in range(200))
+    assert all(row["score"] == ai._stub_score(row["responseId"]) for row in rows)
+    assert 1 < model.max_in_flight <= 8
+
+
+def test_screen_resume_skips_finished_applications(tmp_path):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(50)], str(input_file))
+    screen(input_file, output_file, ai.StubModel(latency=0), max_batch=10)
+
+    jsonl.dump([make_record(i) for i in range(50, 60)], str(input_file), mode="a")
+    model = ai.StubModel(latency=0)
+    stats = screen(input_file, output_file, model, max_batch=10)
+
+    assert stats["skipped"] == 50 and stats["screened"] == 10
+    assert model.calls == 1
+    assert len(jsonl.load(str(output_file))) == 60
+
+
+def test_screen_retries_transient_errors_with_backoff(tmp_path, no_backoff):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(5)], str(input_file))
+    model = FlakyModel(failures=3)
+
+    stats = screen(input_file, output_file, model, max_attempts=5)
+
+    assert stats["screened"] == 5 and stats["failed"] == 0
+    assert model.calls == 4
+    assert no_backoff == [(0, 1), (0, 2), (0, 4)]
+
+
+def test_screen_gives_up_after_max_attempts(tmp_path, no_backoff):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(5)], str(input_file))
+    model = FlakyModel(failures=10)
+
+    stats = screen(input_file, output_file, model, max_attempts=3)
+
+    assert stats["failed"] == 5 and stats["screened"] == 0
+    assert model.calls == 3
+    assert not output_file.exists() or jsonl.load(str(output_file)) == []
+
+
+def test_screen_does_not_retry_client_errors(tmp_path, no_backoff):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(5)], str(input_file))
+    model = FlakyModel(failures=1, code=400)
+
+    stats = screen(input_file, output_file, model, max_attempts=5)
+
+    assert stats["failed"] == 5
+    assert model.calls == 1 and no_backoff == []
+
+
+def test_screen_survives_random_failures(tmp_path, no_backoff):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i) for i in range(100)], str(input_file))
+    model = ai.StubModel(latency=0, failure_rate=0.3, seed=1)
+
+    stats = screen(input_file, output_file, model, max_batch=10, max_attempts=20)
+
+    assert stats["screened"] == 100 and stats["failed"] == 0
+    assert model.calls > stats["prompts"]
+    rows = jsonl.load(str(output_file))
+    assert sorted(row["responseId"] for row in rows) == sorted(f"r{i}" for i in range(100))
+
+
+def test_screen_keeps_the_last_line_of_a_repeated_response(tmp_path):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(1, "stara"), make_record(2), make_record(1, "nowa")], str(input_file))
+
+    stats = screen(input_file, output_file, ai.StubModel(latency=0))
+
+    rows = jsonl.load(str(output_file))
+    assert stats["screened"] == 2 and stats["failed"] == 0
+    assert sorted(row["responseId"] for row in rows) == ["r1", "r2"]
+    row = next(row for row in rows if row["responseId"] == "r1")
+    assert row["input_key"] == cache_key("stub", ai.PROMPT_VERSION, "nowa")
+
+
+def test_screen_shares_one_call_between_identical_answers(tmp_path):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(i, "ta sama odpowiedź") for i in range(5)], str(input_file))
+    model = ai.StubModel(latency=0)
+
+    with LLMCache(str(tmp_path / "cache.db")) as cache:
+        stats = screen(input_file, output_file, model, cache=cache)
+
+    rows = jsonl.load(str(output_file))
+    assert stats["screened"] == 5 and model.calls == 1
+    assert sorted(row["responseId"] for row in rows) == [f"r{i}" for i in range(5)]
+    assert len({(row["score"], row["input_key"]) for row in rows}) == 1
+
+
+def test_screen_resume_writes_new_responses_with_known_answers(tmp_path):
+    input_file, output_file = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    jsonl.dump([make_record(1, "ta sama odpowiedź")], str(input_file))
+    with LLMCache(str(tmp_path / "cache.db")) as cache:
+        screen(input_file, output_file, ai.StubModel(latency=0), cache=cache)
+
+        jsonl.dump([make_record(2, "ta sama odpowiedź"), make_record(1, "zmieniona")],
+                   str(input_file), mode="a")
+        model = ai.StubModel(latency=0)
+        stats = screen(input_file, output_file, model, cache=cache)
+
+    assert stats == dict(stats, cached=1, screened=1, skipped=0)
+    assert model.calls == 1
+    rows = jsonl.load(str(output_file))
+    assert [row["responseId"] for row in rows].count("r2") == 1
+    assert all(row["input_key"] for row in rows)
@@ -0,0 +1,35 @@
+import create_google_form
+from request_executor import RequestExecutor
+from state_store import StateStore
+
+BODIES = [{"title": "Dlaczego chcesz zostać wolontariuszem?", "paragraph": True}]
+
+
+def provision(state, bodies=BODIES):
+    return create_google_form.create_or_update_form(
+        "Schronisko", bodies, "shelter", state, executor=RequestExecutor({})
+    )
+
+
+def test_unchanged_form_is_read_but_not_written(tmp_path, fake_google):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        provision(state)
+        before = fake_google.stats()
+
+        provision(state)
+
+        # Only the forms().get, no batchUpdate
+        assert fake_google.stats()["forms.requests"] == before["forms.requests"] + 1
+
+
+def test_form_deleted_in_google_is_recreated(tmp_path, fake_google):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        provision(state)
+        old_id = state.get("shelter").form_id
+        fake_google.forms.clear()
+
+        provision(state)
+
+        new_id = state.get("shelter").form_id
+        assert new_id != old_id and new_id in fake_google.forms
+        assert [item["title"] for item in fake_google.forms[new_id]["items"]] == [BODIES[0]["title"]]
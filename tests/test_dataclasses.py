@@ -0,0 +1,27 @@
+from dataclasses import fields
+
+from src.google_calendar_dataclasses import CalendarEvents, EventItem
+
+
+def assert_same(lazy, eager):
+    """Compares every field but the nested events, whose types differ by design."""
+    for f in fields(eager):
+        if f.name == "items":
+            continue
+        value = getattr(lazy, f.name)
+        if f.name in ("attendees", "defaultReminders"):
+            value = list(value)
+        assert value == getattr(eager, f.name), f.name
+
+
+def test_lazy_views_read_sparse_payloads_like_eager_objects():
+    payload = {"items": [{"id": "e1"}, {"id": "e2", "summary": "Spotkanie", "attendees": [{}]}]}
+
+    lazy = CalendarEvents.from_dict(payload, lazy=True)
+    eager = CalendarEvents.from_dict(payload)
+
+    assert_same(lazy, eager)
+    for lazy_item, eager_item in zip(lazy.items, eager.items):
+        assert_same(lazy_item, eager_item)
+        assert lazy_item.materialize() == eager_item
+    assert EventItem.from_dict({"id": "e3"}, lazy=True).status == "confirmed"
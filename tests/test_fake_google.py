@@ -0,0 +1,75 @@
+import pytest
+from googleapiclient.errors import HttpError
+
+from fake_google import FakeGoogle, FakeGoogleServer
+from google_clients import ClientFactory
+
+
+@pytest.fixture
+def server():
+    with FakeGoogleServer(FakeGoogle()) as server:
+        yield server
+
+
+@pytest.fixture
+def service(server):
+    return ClientFactory(api_root=server.url).service("forms", "v1")
+
+
+@pytest.fixture
+def forms(service):
+    return service.forms()
+
+
+def question(title):
+    return {"title": title, "questionItem": {"question": {"textQuestion": {}}}}
+
+
+def test_forms_create_get_batch_update_round_trip(forms):
+    created = forms.create(body={"info": {"title": "Schronisko"}}).execute()
+    form_id = created["formId"]
+
+    result = forms.batchUpdate(
+        formId=form_id,
+        body={
+            "requests": [
+                {"createItem": {"item": question("Imię"), "location": {"index": 0}}},
+                {"createItem": {"item": question("Motywacja"), "location": {"index": 1}}},
+            ],
+            "writeControl": {"requiredRevisionId": created["revisionId"]},
+        },
+    ).execute()
+    form = forms.get(formId=form_id).execute()
+
+    assert form["info"]["title"] == "Schronisko"
+    assert [item["title"] for item in form["items"]] == ["Imię", "Motywacja"]
+    assert all(item["questionItem"]["question"]["questionId"] for item in form["items"])
+    assert form["revisionId"] == result["writeControl"]["requiredRevisionId"] != created["revisionId"]
+
+    with pytest.raises(HttpError) as stale:
+        forms.batchUpdate(
+            formId=form_id,
+            body={
+                "requests": [{"deleteItem": {"location": {"index": 0}}}],
+                "writeControl": {"requiredRevisionId": created["revisionId"]},
+            },
+        ).execute()
+    assert stale.value.resp.status == 400
+    assert len(forms.get(formId=form_id).execute()["items"]) == 2
+
+
+def test_batch_request_answers_every_part(server, service, forms):
+    form_ids = [forms.create(body={"info": {"title": f"F{i}"}}).execute()["formId"] for i in range(3)]
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[request_id] = exception.resp.status if exception else response["formId"]
+
+    batch = service.new_batch_http_request(callback=callback)
+    for form_id in [*form_ids, "missing"]:
+        batch.add(forms.get(formId=form_id), request_id=form_id)
+    batch.execute()
+
+    assert results == {**{form_id: form_id for form_id in form_ids}, "missing": 404}
+    stats = server.fake.stats()
+    assert stats["batches"] == 1 and stats["batch_parts"] == 4
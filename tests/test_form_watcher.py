@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+import form_watcher
+from form_watcher import FakeSubscriber, FormWatcher
+from request_executor import RequestExecutor
+from state_store import StateStore
+
+
+@pytest.fixture
+def state(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        yield state
+
+
+@pytest.fixture
+def watcher(tmp_path, state, monkeypatch):
+    monkeypatch.setattr(form_watcher, "COALESCE_SECONDS", 0.05)
+    return FormWatcher(state, str(tmp_path / "data"), executor=RequestExecutor({}))
+
+
+def add_form(fake_google, state, name):
+    form = fake_google.create_form({"info": {"title": name}})
+    state.update(name, form_id=form["formId"], responder_uri=form["responderUri"])
+    return form["formId"]
+
+
+def saved_ids(watcher):
+    return sorted(name[:-len(".json")] for name in os.listdir(watcher.output_dir))
+
+
+def test_notification_fetches_only_the_notified_form(fake_google, state, watcher):
+    first, second = add_form(fake_google, state, "a"), add_form(fake_google, state, "b")
+    responses = [fake_google.submit_response(first)["responseId"] for _ in range(3)]
+    fake_google.submit_response(second)
+    subscriber = FakeSubscriber()
+    subscriber.subscribe(watcher._on_message)
+
+    messages = [subscriber.publish(first), subscriber.publish(first)]
+    fetched = watcher.process_notifications(timeout=1)
+
+    assert fetched == 1
+    assert saved_ids(watcher) == sorted(responses)
+    assert all(m.acked and not m.nacked for m in messages)
+    newest = fake_google.responses[first][-1]["lastSubmittedTime"]
+    assert state.get("a").responses_watermark == newest
+    assert state.get("b").responses_watermark is None
+
+
+def test_failed_fetch_nacks_and_other_forms_continue(fake_google, state, watcher, monkeypatch):
+    broken, working = add_form(fake_google, state, "a"), add_form(fake_google, state, "b")
+    fake_google.submit_response(working)
+    fetch = watcher.fetch_responses
+
+    def fetch_responses(form_id, executor=None):
+        if form_id == broken:
+            raise RuntimeError("Injected failure.")
+        return fetch(form_id, executor)
+
+    monkeypatch.setattr(watcher, "fetch_responses", fetch_responses)
+    subscriber = FakeSubscriber()
+    subscriber.subscribe(watcher._on_message)
+
+    failed, ok = subscriber.publish(broken), subscriber.publish(working)
+    assert watcher.process_notifications(timeout=1) == 2
+
+    assert failed.nacked and not failed.acked
+    assert ok.acked and len(saved_ids(watcher)) == 1
+
+
+def test_run_pubsub_picks_up_forms_added_after_start(fake_google, state, watcher, tmp_path):
+    add_form(fake_google, state, "a")
+    subscriber = FakeSubscriber()
+    thread = threading.Thread(target=watcher.run_pubsub, args=(subscriber, "projects/p/topics/t"))
+    thread.start()
+    try:
+        while subscriber._callback is None:
+            time.sleep(0.01)
+        # Provisioned by another process while the watcher runs
+        with StateStore(str(tmp_path / "state.db")) as provisioner:
+            form = fake_google.create_form({"info": {"title": "b"}})
+            provisioner.update("b", form_id=form["formId"])
+        response = fake_google.submit_response(form["formId"])
+
+        message = subscriber.publish(form["formId"])
+        deadline = time.monotonic() + 5
+        while not message.acked and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+        thread.join()
+
+    assert message.acked
+    assert saved_ids(watcher) == [response["responseId"]]
+    state.reload()
+    assert state.get("b").responses_watermark == response["lastSubmittedTime"]
+
+
+def poll_once(poller, form_id):
+    async def run():
+        slots = asyncio.Semaphore(1)
+        await slots.acquire()
+        await poller._poll(form_id, slots)
+
+    poller.intervals[form_id] = form_watcher.MIN_POLL_INTERVAL
+    asyncio.run(run())
+
+
+def test_async_poller_backs_off_on_errors_and_retires_deleted_forms(
+    fake_google, state, watcher, tmp_path
+):
+    flaky, deleted = add_form(fake_google, state, "a"), add_form(fake_google, state, "b")
+    poller = form_watcher.AsyncFormPoller(watcher, str(tmp_path / "forms.jsonl"))
+
+    watcher.fetch_responses = lambda *args: 1 / 0
+    poll_once(poller, flaky)
+    del watcher.fetch_responses
+    fake_google.forms.pop(deleted)
+    poll_once(poller, deleted)
+
+    assert [form_id for _, form_id in poller._schedule] == [flaky]
+    assert poller.intervals[flaky] > form_watcher.MIN_POLL_INTERVAL
+    assert poller.retired == {deleted}
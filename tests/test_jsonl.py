@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+import jsonl
+
+
+def test_get_rebuilds_index_after_same_size_rewrite(tmp_path):
+    data = str(tmp_path / "data.jsonl")
+    jsonl.dump([{"id": f"a{i}", "v": i} for i in range(5)], data)
+    jsonl.build_index(data, "id")
+    assert jsonl.get(data, "a3") == {"id": "a3", "v": 3}
+    size = os.path.getsize(data)
+
+    jsonl.dump([{"id": f"b{i}", "v": i} for i in range(5)], data)
+    os.utime(data, ns=(0, 0))
+
+    assert os.path.getsize(data) == size
+    assert jsonl.get(data, "b3") == {"id": "b3", "v": 3}
+    assert jsonl.get(data, "a3", None) is None
+
+
+def test_get_requires_a_key_field(tmp_path):
+    data = str(tmp_path / "data.jsonl")
+    jsonl.dump([{"id": 1}], data)
+
+    with pytest.raises(ValueError):
+        jsonl.get(data, 1)
@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import jsonl
+import semantic_index
+import server
+import text_index
+
+
+def offer(i, title):
+    return {"url": f"https://forms.example/{i}", "title": title, "description": "Wolontariat w schronisku."}
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    # Checked on every request instead of once per second
+    monkeypatch.setattr(server, "RELOAD_INTERVAL", 0)
+    paths = {
+        "forms_file": str(tmp_path / "forms.jsonl"),
+        "text_index_dir": str(tmp_path / "text_index"),
+        "semantic_index_dir": str(tmp_path / "semantic_index"),
+        "submissions_file": str(tmp_path / "submissions.jsonl"),
+    }
+    jsonl.dump([offer(0, "Opieka nad psami")], paths["forms_file"])
+    return paths
+
+
+def search_titles(client, **params):
+    response = client.get("/api/offers/search", params=params)
+    return response, [hit["title"] for hit in response.json()["results"]]
+
+
+def test_text_search_sees_index_updates_despite_the_cache(paths):
+    texts = text_index.TextIndex(paths["text_index_dir"])
+    texts.update({paths["forms_file"]: "form"})
+    with TestClient(server.create_app(**paths)) as client:
+        first, titles = search_titles(client, q="psami")
+        assert titles == ["Opieka nad psami"]
+        assert client.get("/api/offers/search", params={"q": "psami"},
+                          headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+        # Another process indexes a new offer; forms.jsonl itself is not reloaded
+        other = str(paths["forms_file"]) + ".new"
+        jsonl.dump([offer(1, "Spacery z psami")], other)
+        texts.update({other: "form"})
+        texts.wait()
+
+        second, titles = search_titles(client, q="psami")
+        assert sorted(titles) == ["Opieka nad psami", "Spacery z psami"]
+        assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_semantic_search_reloads_the_index(paths):
+    index = semantic_index.SemanticIndex(paths["semantic_index_dir"])
+    index.add(semantic_index.form_entries(paths["forms_file"]))
+    with TestClient(server.create_app(**paths)) as client:
+        assert search_titles(client, q="psy", mode="semantic")[1] == ["Opieka nad psami"]
+
+        index.add([("form:x", "Spacery z psami", {"kind": "form", "url": "https://forms.example/1",
+                                                  "title": "Spacery z psami"})])
+
+        assert len(search_titles(client, q="psy", mode="semantic")[1]) == 2
+
+
+def test_submission_is_on_disk_when_acknowledged(paths):
+    with TestClient(server.create_app(**paths)) as client:
+        offer_id = server.offer_id(offer(0, "")["url"])
+        response = client.post(f"/api/offers/{offer_id}/candidates",
+                               json={"name": "Ala", "email": "ala@example.com", "answers": {"Dlaczego?": "Lubię psy."}})
+
+        assert response.status_code == 201
+        rows = jsonl.load(paths["submissions_file"])
+        assert [row["responseId"] for row in rows] == [response.json()["responseId"]]
+        assert client.post("/api/offers/missing/candidates",
+                           json={"name": "Ala", "email": "ala@example.com"}).status_code == 404
@@ -0,0 +1,27 @@
+from state_store import StateStore
+
+
+def test_processes_sharing_a_database_keep_each_others_columns(tmp_path):
+    path = str(tmp_path / "state.db")
+    with StateStore(path) as provisioner, StateStore(path) as watcher:
+        provisioner.update("shelter", form_id="f1", content_hash="h1")
+        watcher.reload()
+        watcher.update("shelter", responses_watermark="2025-10-04T10:00:00Z")
+
+        # The provisioner's in-memory copy predates the watermark
+        record = provisioner.update("shelter", revision_id="r2", content_hash="h2")
+
+        assert record.responses_watermark == "2025-10-04T10:00:00Z"
+        assert (record.form_id, record.revision_id, record.content_hash) == ("f1", "r2", "h2")
+        watcher.reload()
+        assert watcher.get("shelter") == record
+
+
+def test_update_many_creates_missing_rows(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        records = state.update_many([("a", {"form_id": "f1"}), ("b", {"event_id": "e1"}),
+                                     ("a", {"revision_id": "r1"})])
+
+        assert (records["a"].form_id, records["a"].revision_id) == ("f1", "r1")
+        assert records["b"].event_id == "e1" and records["b"].form_id is None
+        assert state.all() == records
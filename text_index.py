@@ -0,0 +1,609 @@
+# text_index.py
+
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import jsonl
+
+# Default location of the index and its manifest of live segments.
+INDEX_DIR = 'text_index'
+MANIFEST_FILE = 'manifest.json'
+
+# Kinds of indexed documents; stored per document as the position in KINDS.
+KINDS = ('form', 'answer')
+
+# Adding a segment beyond this many starts a background merge.
+MAX_SEGMENTS = 8
+
+# BM25 parameters; title terms count TITLE_WEIGHT times.
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+
+# Bytes at the start of a source file whose hash detects that it was rewritten.
+HEAD_BYTES = 4096
+
+_WORD = re.compile(r'\w+')
+_FOLD = str.maketrans('łđø', 'ldo')
+
+# Inflectional endings stripped by `stem` (after diacritic folding), longest first.
+_SUFFIXES = sorted([
+    'ami', 'ach', 'owie', 'ego', 'emu', 'ych', 'ymi', 'ich', 'imi', 'osci', 'osc',
+    'owa', 'owe', 'owy', 'owi', 'ow', 'om', 'em', 'ej', 'ie', 'iu', 'ia',
+    'a', 'e', 'i', 'o', 'u', 'y',
+], key=len, reverse=True)
+MIN_STEM = 3
+
+STOPWORDS = frozenset(
+    'a aby ale bez by czy dla do i ich in jak jest je jego jej lub na nad nie o od oraz '
+    'po pod przez przy sie sa tak to ten ta te w we z za ze zas'.split()
+)
+
+
+def fold(text: str) -> str:
+    """Lowercases text and strips Polish (and other) diacritics: "Łódź" -> "lodz"."""
+    text = text.casefold().translate(_FOLD)
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=200_000)
+def stem(token: str) -> str:
+    """Strips the longest known ending, keeping at least MIN_STEM characters."""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """Splits text into folded, stemmed terms without stopwords."""
+    return [stem(token) for token in _WORD.findall(fold(text)) if token not in STOPWORDS]
+
+
+def _smallest(values: np.ndarray, dtypes: Tuple[type, ...]) -> np.ndarray:
+    """Casts non-negative integers to the first dtype that holds them."""
+    top = int(values.max()) if len(values) else 0
+    for dtype in dtypes:
+        if top <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values
+
+
+def _write_segment(path: str, terms: List[str], offsets: np.ndarray, docs: np.ndarray,
+                   freqs: np.ndarray, lengths: np.ndarray, kinds: np.ndarray,
+                   stored: Iterable[Dict[str, Any]]) -> None:
+    """
+    Writes one immutable segment directory.
+
+    Postings of term i are docs[offsets[i]:offsets[i + 1]] (ascending
+    document numbers) with their term frequencies in `freqs`. Every array is
+    saved with the smallest integer type that fits. The directory is written
+    under a temporary name and renamed, so it appears complete or not at all.
+    """
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    with open(os.path.join(tmp_path, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(terms, f, ensure_ascii=False)
+    np.save(os.path.join(tmp_path, 'offsets.npy'), _smallest(offsets, (np.uint32, np.uint64)))
+    np.save(os.path.join(tmp_path, 'docs.npy'), _smallest(docs, (np.uint16, np.uint32)))
+    np.save(os.path.join(tmp_path, 'freqs.npy'), _smallest(freqs, (np.uint8, np.uint16, np.uint32)))
+    np.save(os.path.join(tmp_path, 'lengths.npy'), _smallest(lengths, (np.uint16, np.uint32)))
+    np.save(os.path.join(tmp_path, 'kinds.npy'), kinds.astype(np.uint8))
+    jsonl.dump(list(stored), os.path.join(tmp_path, 'stored.jsonl'), index_key='key')
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """Read-only view of a segment directory; arrays are memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'terms.json'), 'r', encoding='utf-8') as f:
+            self.term_list: List[str] = json.load(f)
+        self.terms = {term: i for i, term in enumerate(self.term_list)}
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.docs = np.load(os.path.join(path, 'docs.npy'), mmap_mode='r')
+        self.freqs = np.load(os.path.join(path, 'freqs.npy'), mmap_mode='r')
+        self.lengths = np.load(os.path.join(path, 'lengths.npy'), mmap_mode='r')
+        self.kinds = np.load(os.path.join(path, 'kinds.npy'), mmap_mode='r')
+        self.total_length = int(self.lengths.sum(dtype=np.int64))
+        self.stored_path = os.path.join(path, 'stored.jsonl')
+        self._keys: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def keys(self) -> List[str]:
+        if self._keys is None:
+            self._keys = [doc["key"] for doc in jsonl.stream_load(self.stored_path)]
+        return self._keys
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = self.terms.get(term)
+        if i is None:
+            return None
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.docs[start:end], self.freqs[start:end]
+
+    def stored(self, doc: int) -> Dict[str, Any]:
+        return jsonl.seek(self.stored_path, doc)
+
+
+def _build_postings(documents: List[Tuple[str, Counter, int, Dict[str, Any]]]) -> tuple:
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    for doc, (_, counts, _, _) in enumerate(documents):
+        for term, tf in counts.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = ([], [])
+            entry[0].append(doc)
+            entry[1].append(tf)
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[term][0]) for term in terms])
+    docs = np.fromiter((d for term in terms for d in postings[term][0]), dtype=np.int64, count=offsets[-1])
+    freqs = np.fromiter((f for term in terms for f in postings[term][1]), dtype=np.int64, count=offsets[-1])
+    return terms, offsets, docs, freqs
+
+
+class TextIndex:
+    """
+    BM25 full-text index made of immutable on-disk segments.
+
+    Every `add` writes a new segment; a newer document with the same key
+    replaces the older one, which is only marked deleted in the manifest.
+    Once there are more than MAX_SEGMENTS segments they are merged into one
+    in a background thread (deleted documents are dropped then). The
+    manifest is replaced atomically, so readers in other processes see a
+    consistent set of segments and pick up changes through `refresh`
+    (called by every search). Only one process should write at a time.
+
+    Usage:
+        index = TextIndex()
+        index.update({'forms.jsonl': 'form'})
+        for hit in index.search('wolontariat schronisko', kind='form'):
+            print(hit["score"], hit["title"])
+    """
+
+    def __init__(self, path: str = INDEX_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merge_thread: Optional[threading.Thread] = None
+        self._opened: Dict[str, _Segment] = {}
+        self._manifest_stamp = None
+        self._key_map: Optional[Dict[str, Tuple[str, int]]] = None
+        self._load_manifest()
+
+    # --- Manifest and segments ---
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_FILE)
+
+    def _load_manifest(self) -> None:
+        try:
+            stat = os.stat(self._manifest_path())
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            manifest = {"segments": [], "sources": {}, "next": 0}
+            stamp = None
+        self._set_manifest(manifest, stamp)
+
+    def _set_manifest(self, manifest: Dict[str, Any], stamp=None) -> None:
+        segments = []
+        # Live document count and total length, the corpus statistics of BM25
+        corpus = [0, 0]
+        for entry in manifest["segments"]:
+            segment = self._opened.get(entry["name"])
+            if segment is None:
+                segment = self._opened[entry["name"]] = _Segment(os.path.join(self.path, entry["name"]))
+            live = np.ones(len(segment), dtype=bool)
+            live[entry["deleted"]] = False
+            segments.append((entry, segment, live))
+            deleted = np.flatnonzero(~live)
+            corpus[0] += len(segment) - len(deleted)
+            corpus[1] += segment.total_length - int(np.asarray(segment.lengths)[deleted].sum(dtype=np.int64))
+        names = {entry["name"] for entry in manifest["segments"]}
+        self._opened = {name: s for name, s in self._opened.items() if name in names}
+        # Replaced as a whole, so searches in other threads see one consistent state
+        self._state = (manifest, segments, tuple(corpus))
+        self._manifest_stamp = stamp
+        self._key_map = None
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
+        stat = os.stat(self._manifest_path())
+        self._set_manifest(manifest, (stat.st_mtime_ns, stat.st_size))
+
+    @property
+    def stamp(self) -> Optional[Tuple[int, int]]:
+        """Version of the loaded manifest (its mtime and size)."""
+        return self._manifest_stamp
+
+    def refresh(self) -> None:
+        """Reloads the manifest if another process changed it."""
+        try:
+            stat = os.stat(self._manifest_path())
+        except FileNotFoundError:
+            return
+        if (stat.st_mtime_ns, stat.st_size) != self._manifest_stamp:
+            with self._lock:
+                self._load_manifest()
+
+    def __len__(self) -> int:
+        return self._state[2][0]
+
+    def _keys(self) -> Dict[str, Tuple[str, int]]:
+        """Maps every live document key to its (segment name, document number)."""
+        if self._key_map is None:
+            key_map = {}
+            for entry, segment, live in self._state[1]:
+                for doc, key in enumerate(segment.keys):
+                    if live[doc]:
+                        key_map[key] = (entry["name"], doc)
+            self._key_map = key_map
+        return self._key_map
+
+    def _copy_manifest(self) -> Dict[str, Any]:
+        return json.loads(json.dumps(self._state[0]))
+
+    @staticmethod
+    def _mark_deleted(manifest: Dict[str, Any], locations: Iterable[Tuple[str, int]]) -> None:
+        by_name = {entry["name"]: entry for entry in manifest["segments"]}
+        for name, doc in locations:
+            by_name[name]["deleted"].append(doc)
+
+    # --- Writing ---
+
+    def add(self, documents: Iterable[Tuple[str, str, str, Dict[str, Any]]],
+            sources: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Indexes documents as a new segment.
+
+        Args:
+            documents (Iterable[Tuple[str, str, str, Dict[str, Any]]]): (key,
+                title, body, payload) tuples; payload["kind"] must be one of
+                KINDS and is stored with the key for search results.
+            sources (Optional[Dict[str, Any]]): Source file positions saved in
+                the same manifest update (used by `update`).
+
+        Returns:
+            int: The number of documents added.
+        """
+        latest: Dict[str, Tuple[str, Counter, int, Dict[str, Any]]] = {}
+        for key, title, body, payload in documents:
+            title_terms = analyze(title)
+            counts = Counter(analyze(body))
+            for term in title_terms:
+                counts[term] += TITLE_WEIGHT
+            length = sum(counts.values())
+            latest[key] = (key, counts, length, payload)
+        parsed = list(latest.values())
+
+        with self._lock:
+            manifest = self._copy_manifest()
+            if parsed:
+                name = f"seg-{manifest['next']:06d}"
+                manifest["next"] += 1
+                terms, offsets, docs, freqs = _build_postings(parsed)
+                _write_segment(
+                    os.path.join(self.path, name), terms, offsets, docs, freqs,
+                    np.array([length for _, _, length, _ in parsed], dtype=np.int64),
+                    np.array([KINDS.index(payload["kind"]) for *_, payload in parsed], dtype=np.uint8),
+                    ({"key": key, **payload} for key, _, _, payload in parsed),
+                )
+                key_map = self._keys()
+                self._mark_deleted(manifest, (key_map[key] for key in latest if key in key_map))
+                manifest["segments"].append({"name": name, "docs": len(parsed), "deleted": []})
+            if sources:
+                manifest["sources"].update(sources)
+            self._save_manifest(manifest)
+            merge_due = len(manifest["segments"]) > MAX_SEGMENTS
+
+        if merge_due:
+            self.merge(background=True)
+        return len(parsed)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        """Marks the documents with the given keys deleted; returns how many there were."""
+        with self._lock:
+            manifest = self._copy_manifest()
+            key_map = self._keys()
+            locations = [key_map[key] for key in keys if key in key_map]
+            if locations:
+                self._mark_deleted(manifest, locations)
+                self._save_manifest(manifest)
+        return len(locations)
+
+    def update(self, sources: Dict[str, str], batch_size: int = 50_000) -> int:
+        """
+        Indexes the records appended to each source file since the last update.
+
+        Only the bytes after the saved offset of a file are read, so calling
+        this after every `jsonl.add` costs time proportional to the new
+        records. A file that was rewritten (shorter than the saved offset or
+        with a different beginning) is indexed again from the start, and its
+        old documents are deleted first.
+
+        Args:
+            sources (Dict[str, str]): Source JSONL file -> kind of its records
+                                      ('form' for forms.jsonl, 'answer' for
+                                      form responses).
+            batch_size (int): Records per new segment.
+
+        Returns:
+            int: The number of documents added.
+        """
+        added = 0
+        for source, kind in sources.items():
+            if not os.path.exists(source):
+                continue
+            state = self._state[0]["sources"].get(source, {})
+            offset = state.get("offset", 0)
+            size = os.path.getsize(source)
+            if size == offset and offset and self._head_hash(source, offset) == state.get("head"):
+                continue
+            if offset and (size < offset or self._head_hash(source, offset) != state.get("head")):
+                offset = 0
+                self.delete([key for key in self._keys() if key.startswith(f"{kind}:")])
+
+            batch = []
+            for record, end in _tail(source, offset):
+                document = _document(record, kind)
+                if document is not None:
+                    batch.append(document)
+                offset = end
+                if len(batch) >= batch_size:
+                    added += self.add(batch, {source: {"offset": offset, "head": self._head_hash(source, offset)}})
+                    batch = []
+            added += self.add(batch, {source: {"offset": offset, "head": self._head_hash(source, offset)}})
+        return added
+
+    @staticmethod
+    def _head_hash(path: str, offset: int) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read(min(offset, HEAD_BYTES))).hexdigest()
+
+    def merge(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Merges all segments into one, dropping deleted documents.
+
+        Args:
+            background (bool): Run in a daemon thread and return it; searches
+                               and adds continue meanwhile (see `wait`).
+        """
+        if background:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return self._merge_thread
+            self._merge_thread = threading.Thread(target=self._merge, daemon=True)
+            self._merge_thread.start()
+            return self._merge_thread
+        self._merge()
+        return None
+
+    def wait(self) -> None:
+        """Waits for a background merge to finish."""
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+
+    def _merge(self) -> None:
+        with self._merge_lock:
+            with self._lock:
+                manifest, segments, _ = self._state
+                manifest = json.loads(json.dumps(manifest))
+                name = f"seg-{manifest['next']:06d}"
+                if len(segments) < 2 and not any(entry["deleted"] for entry, _, _ in segments):
+                    return
+                # Reserve the name before the lock is released
+                manifest["next"] += 1
+                self._save_manifest(manifest)
+
+            # New document numbers: live documents in segment order
+            remaps, base = [], 0
+            for _, segment, live in segments:
+                remap = np.full(len(segment), -1, dtype=np.int64)
+                remap[live] = np.arange(base, base + int(live.sum()))
+                remaps.append(remap)
+                base += int(live.sum())
+
+            terms = sorted(set().union(*(segment.term_list for _, segment, _ in segments)))
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            doc_parts, freq_parts = [], []
+            for i, term in enumerate(terms):
+                count = 0
+                for (_, segment, _), remap in zip(segments, remaps):
+                    postings = segment.postings(term)
+                    if postings is None:
+                        continue
+                    docs = remap[postings[0]]
+                    keep = docs >= 0
+                    doc_parts.append(docs[keep])
+                    freq_parts.append(np.asarray(postings[1])[keep])
+                    count += int(keep.sum())
+                offsets[i + 1] = offsets[i] + count
+            # Terms that only occurred in deleted documents keep empty postings
+            lengths = np.concatenate([np.asarray(s.lengths)[live] for _, s, live in segments])
+            kinds = np.concatenate([np.asarray(s.kinds)[live] for _, s, live in segments])
+            stored = (
+                doc
+                for _, segment, live in segments
+                for doc, keep in zip(jsonl.stream_load(segment.stored_path), live)
+                if keep
+            )
+            _write_segment(
+                os.path.join(self.path, name), terms, offsets,
+                np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.int64),
+                np.concatenate(freq_parts) if freq_parts else np.zeros(0, dtype=np.int64),
+                lengths, kinds, stored,
+            )
+
+            with self._lock:
+                manifest = self._copy_manifest()
+                merged = {entry["name"]: remap for (entry, _, _), remap in zip(segments, remaps)}
+                # Documents deleted while merging are carried over
+                deleted = [
+                    int(merged[entry["name"]][doc])
+                    for entry in manifest["segments"] if entry["name"] in merged
+                    for doc in entry["deleted"] if merged[entry["name"]][doc] >= 0
+                ]
+                rest = [entry for entry in manifest["segments"] if entry["name"] not in merged]
+                manifest["segments"] = [{"name": name, "docs": base, "deleted": deleted}] + rest
+                # Readers may still use the merged segments; they are removed by the next merge
+                obsolete, manifest["obsolete"] = manifest.get("obsolete", []), sorted(merged)
+                self._save_manifest(manifest)
+            for old in obsolete:
+                shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+    # --- Searching ---
+
+    def search(self, query: str, k: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the k documents ranked best for `query` by BM25.
+
+        Args:
+            query (str): Free text; analyzed like the documents, so case,
+                         diacritics and common endings do not matter.
+            k (int): Number of results.
+            kind (Optional[str]): Restrict results to one of KINDS.
+
+        Returns:
+            List[Dict[str, Any]]: Stored documents (key and payload) with
+                                  their "score", best first.
+        """
+        self.refresh()
+        _, segments, (total_docs, total_length) = self._state
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms or not total_docs:
+            return []
+
+        # Deleted documents stay in their segments until a merge but do not
+        # count towards the corpus statistics
+        average_length = total_length / total_docs
+        weights = {}
+        for term in terms:
+            df = sum(
+                int(np.count_nonzero(live[p[0]]))
+                for _, s, live in segments
+                if (p := s.postings(term)) is not None
+            )
+            if df:
+                weights[term] = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+
+        kind_code = None if kind is None else KINDS.index(kind)
+        candidates = []
+        for _, segment, live in segments:
+            scores = None
+            for term, weight in weights.items():
+                postings = segment.postings(term)
+                if postings is None:
+                    continue
+                docs = np.asarray(postings[0], dtype=np.intp)
+                tf = np.asarray(postings[1], dtype=np.float32)
+                norm = K1 * (1 - B + B * np.asarray(segment.lengths)[docs] / average_length)
+                if scores is None:
+                    scores = np.zeros(len(segment), dtype=np.float32)
+                # Document numbers within one posting list are unique
+                scores[docs] += weight * tf * (K1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            mask = live if kind_code is None else live & (np.asarray(segment.kinds) == kind_code)
+            scores[~mask] = 0
+            hits = np.flatnonzero(scores)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            candidates.extend((float(scores[doc]), segment, int(doc)) for doc in hits)
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        results = []
+        for score, segment, doc in candidates[:k]:
+            document = segment.stored(doc)
+            document["score"] = round(score, 4)
+            results.append(document)
+        return results
+
+
+def _tail(path: str, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yields (record, end offset) for complete lines after byte `offset`."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # A writer is still appending this record
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line), offset
+
+
+def _document(record: Dict[str, Any], kind: str) -> Optional[Tuple[str, str, str, Dict[str, Any]]]:
+    """Turns a forms.jsonl row or a form response into an index document."""
+    if kind == 'form':
+        if not record.get("url"):
+            return None
+        payload = {
+            "kind": 'form',
+            "url": record["url"],
+            "title": record.get("title", ""),
+            "description": record.get("description", ""),
+            "start_date": record.get("start_date"),
+            "end_date": record.get("end_date"),
+        }
+        return f"form:{record['url']}", record.get("title", ""), record.get("description", ""), payload
+    if not record.get("responseId"):
+        return None
+    values = [
+        a.get("value", "")
+        for answer in record.get("answers", {}).values()
+        for a in answer.get("textAnswers", {}).get("answers", [])
+    ]
+    body = "\n".join(values)
+    payload = {
+        "kind": 'answer',
+        "responseId": record["responseId"],
+        "formId": record.get("formId"),
+        "snippet": " ".join(body.split())[:200],
+    }
+    return f"answer:{record['responseId']}", "", body, payload
+
+
+def update(path: str = INDEX_DIR, forms_file: str = 'forms.jsonl',
+           responses_file: Optional[str] = 'syntetic_data.jsonl', merge: bool = False) -> TextIndex:
+    """Brings the index at `path` up to date with the forms and response files."""
+    index = TextIndex(path)
+    sources = {forms_file: 'form'}
+    if responses_file:
+        sources[responses_file] = 'answer'
+    added = index.update(sources)
+    if merge:
+        index.merge()
+    index.wait()
+    print(f"Indexed {added} documents ({len(index)} in {len(index._state[1])} segments)")
+    return index
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    index = update()
+    for hit in index.search('wolontariat schronisko', k=5, kind='form'):
+        print(hit["score"], hit["title"])